@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+logger = logging.getLogger("grs-admission")
+
+# Degradation steps, applied cumulatively: each level keeps the cuts of the levels below it.
+LEVEL_NAMES = ["normal", "skip_borderline_search", "cheap_model", "short_history", "defer"]
+
+
+def get_levels_env(name, default):
+    """Four ascending thresholds, one per degradation level above normal."""
+    raw = os.getenv(name, default)
+    try:
+        levels = sorted(float(item) for item in raw.split(",") if item.strip())
+    except ValueError:
+        levels = []
+    if len(levels) != len(LEVEL_NAMES) - 1:
+        logger.warning("Invalid %s=%r, using default=%s", name, raw, default)
+        levels = [float(item) for item in default.split(",")]
+    return levels
+
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# In-flight answers per process. The defaults are sized for bot_async (up to
+# ASYNC_MAX_IN_FLIGHT concurrent updates); a sync gunicorn worker answers one update
+# at a time, so there only latency and queue age move the level unless these are
+# lowered to the worker's thread count.
+ADMISSION_IN_FLIGHT_LEVELS = get_levels_env("ADMISSION_IN_FLIGHT_LEVELS", "16,24,32,48")
+ADMISSION_LATENCY_LEVELS_SEC = get_levels_env("ADMISSION_LATENCY_LEVELS_SEC", "20,30,45,60")
+ADMISSION_QUEUE_AGE_LEVELS_SEC = get_levels_env("ADMISSION_QUEUE_AGE_LEVELS_SEC", "10,20,40,60")
+# Latency and queue age are the p90 over this sliding window.
+ADMISSION_WINDOW_SEC = float(os.getenv("ADMISSION_WINDOW_SEC", "60"))
+ADMISSION_DEGRADED_MODEL = (os.getenv("OPENAI_DEGRADED_MODEL") or "gpt-4.1-mini").strip()
+ADMISSION_DEGRADED_HISTORY_MESSAGES = int(os.getenv("ADMISSION_DEGRADED_HISTORY_MESSAGES", "4"))
+# Deferred questions are stored in deferred_answers (see bot_grs); this caps the queue.
+ADMISSION_MAX_DEFERRED = int(os.getenv("ADMISSION_MAX_DEFERRED", "200"))
+# A deferred message is answered (in the cheapest mode) after this long even if pressure persists.
+ADMISSION_DEFER_MAX_WAIT_SEC = float(os.getenv("ADMISSION_DEFER_MAX_WAIT_SEC", "300"))
+DEFER_LEVEL = len(LEVEL_NAMES) - 1
+
+
+def p90(samples):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+
+
+class AdmissionController:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.latencies = deque()
+        self.queue_ages = deque()
+        self.level = 0
+
+    def _prune(self, samples, now):
+        while samples and samples[0][0] < now - ADMISSION_WINDOW_SEC:
+            samples.popleft()
+
+    @contextmanager
+    def track(self):
+        with self.lock:
+            self.in_flight += 1
+        metrics.set_gauge("grs_admission_signal", self.in_flight, signal="in_flight")
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            metrics.set_gauge("grs_admission_signal", self.in_flight, signal="in_flight")
+
+    def record_latency(self, seconds):
+        with self.lock:
+            self.latencies.append((time.monotonic(), seconds))
+
+    def signals(self):
+        now = time.monotonic()
+        with self.lock:
+            self._prune(self.latencies, now)
+            self._prune(self.queue_ages, now)
+            # The deferred backlog is deliberately not a signal: a backlog older than the
+            # top queue-age threshold would hold the level at defer on its own and keep
+            # release_deferred() shut after OpenAI has recovered.
+            return {
+                "in_flight": float(self.in_flight),
+                "model_latency_p90_seconds": p90([value for _, value in self.latencies]),
+                "queue_age_p90_seconds": p90([value for _, value in self.queue_ages]),
+            }
+
+    def current_level(self):
+        signals = self.signals()
+        level, trigger = 0, "none"
+        for signal, thresholds in (
+            ("in_flight", ADMISSION_IN_FLIGHT_LEVELS),
+            ("model_latency_p90_seconds", ADMISSION_LATENCY_LEVELS_SEC),
+            ("queue_age_p90_seconds", ADMISSION_QUEUE_AGE_LEVELS_SEC),
+        ):
+            signal_level = sum(1 for threshold in thresholds if signals[signal] >= threshold)
+            if signal_level > level:
+                level, trigger = signal_level, signal
+
+        for signal, value in signals.items():
+            metrics.set_gauge("grs_admission_signal", value, signal=signal)
+        metrics.set_gauge("grs_admission_level", level)
+        if level != self.level:
+            logger.warning(
+                "Admission level %s -> %s (%s) trigger=%s signals=%s",
+                LEVEL_NAMES[self.level], LEVEL_NAMES[level], level, trigger, signals,
+            )
+            self.level = level
+        return level, trigger
+
+    def admit(self, queue_age_sec=0.0):
+        """Records the update's queueing delay and returns the answer plan for it."""
+        with self.lock:
+            self.queue_ages.append((time.monotonic(), max(0.0, queue_age_sec)))
+        if not ADMISSION_ENABLED:
+            return build_answer_plan(0)
+        level, trigger = self.current_level()
+        metrics.inc("grs_admission_decisions_total", mode=LEVEL_NAMES[level], trigger=trigger)
+        return build_answer_plan(level)
+
+    def release_deferred(self):
+        """Returns (release_all, plan) for the deferred-answer worker.
+
+        Below defer every queued question may run; at defer only those older than
+        ADMISSION_DEFER_MAX_WAIT_SEC. Either way they are answered in the cheapest
+        mode that still answers.
+        """
+        level, _trigger = self.current_level() if ADMISSION_ENABLED else (0, "none")
+        return level < DEFER_LEVEL, build_answer_plan(min(level, DEFER_LEVEL - 1))
+
+
+def build_answer_plan(level):
+    return {
+        "level": level,
+        "mode": LEVEL_NAMES[level],
+        "strict_search": level >= 1,
+        "model": ADMISSION_DEGRADED_MODEL if level >= 2 else None,
+        "history_limit": ADMISSION_DEGRADED_HISTORY_MESSAGES if level >= 3 else None,
+        "defer": level >= DEFER_LEVEL,
+    }
+
+
+controller = AdmissionController()
@@ -0,0 +1,207 @@
+"""Per-query latency of the hot SQL statements, plain vs prepared, and the
+payload size of the news_digests projections.
+
+    DATABASE_URL=postgresql://localhost/grs_bench python benchmarks/bench_db.py
+    DATABASE_URL=... python benchmarks/bench_db.py --iterations 5000 --only grs_load_history
+
+Needs a scratch database initialised with init_db.py. Rows are written under
+BENCH_CHAT_ID / BENCH_LANG and removed afterwards.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+os.environ.setdefault("TELEGRAM_TOKEN", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import logging  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+from psycopg2.extras import Json  # noqa: E402
+
+import bot_grs  # noqa: E402
+import database  # noqa: E402
+
+BENCH_CHAT_ID = 990000001
+BENCH_LANG = "bench"
+
+
+def seed(history_rows):
+    with database.get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO users (chat_id, language_code, request_count) VALUES (%s, 'ru', 0) ON CONFLICT (chat_id) DO NOTHING",
+                (BENCH_CHAT_ID,),
+            )
+            for index in range(history_rows):
+                cur.execute(
+                    "INSERT INTO chat_history (chat_id, role, content) VALUES (%s, %s, %s)",
+                    (BENCH_CHAT_ID, "user" if index % 2 == 0 else "assistant", f"Сообщение {index} " * 20),
+                )
+            items = [
+                {
+                    "country": "Испания",
+                    "title": f"Испания меняет правила выдачи ВНЖ для заявителей, выпуск {index}",
+                    "date": "1 мая 2025",
+                    "summary": "Власти объявили об изменении требований к заявителям на ВНЖ. " * 4,
+                    "source_domain": "example.org",
+                    "source_url": f"https://example.org/news/2025/{index}",
+                }
+                for index in range(bot_grs.TARGET_NEWS_ITEMS)
+            ]
+            for _ in range(3):
+                cur.execute(
+                    """
+                    INSERT INTO news_digests (language_code, status, items_json, rendered_html, raw_response, model_used)
+                    VALUES (%s, 'ready', %s, %s, %s, 'bench')
+                    """,
+                    (
+                        BENCH_LANG,
+                        Json(items),
+                        bot_grs.render_news_digest_html(items, "ru"),
+                        json.dumps({"output_text": json.dumps(items, ensure_ascii=False) * 8}, ensure_ascii=False),
+                    ),
+                )
+        conn.commit()
+
+
+def cleanup():
+    with database.get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM chat_history WHERE chat_id = %s", (BENCH_CHAT_ID,))
+            cur.execute("DELETE FROM users WHERE chat_id = %s", (BENCH_CHAT_ID,))
+            cur.execute("DELETE FROM news_digests WHERE language_code = %s", (BENCH_LANG,))
+            cur.execute("DELETE FROM news_digest_pool WHERE language_code = %s", (BENCH_LANG,))
+        conn.commit()
+
+
+def get_cases():
+    pool_params = (
+        BENCH_LANG,
+        "https://example.org/bench/article",
+        "example.org",
+        "Испания меняет правила выдачи ВНЖ",
+        "Власти Испании объявили об изменении требований к заявителям на ВНЖ.",
+        "Испания",
+        "ES",
+        "1 мая 2025",
+        None,
+    )
+    return {
+        bot_grs.GET_USER_STATEMENT: (BENCH_CHAT_ID,),
+        bot_grs.INCREMENT_REQUEST_COUNT_STATEMENT: (BENCH_CHAT_ID,),
+        bot_grs.SAVE_MESSAGE_STATEMENT: (BENCH_CHAT_ID, "user", "Как продлить ВНЖ в Сербии?"),
+        bot_grs.LOAD_HISTORY_STATEMENT: (BENCH_CHAT_ID, bot_grs.CHAT_HISTORY_CONTEXT_DAYS, bot_grs.MAX_HISTORY_MESSAGES),
+        bot_grs.LATEST_NEWS_DIGEST_STATEMENTS["render"]: (BENCH_LANG,),
+        bot_grs.UPSERT_NEWS_POOL_ITEM_STATEMENT: pool_params,
+    }
+
+
+def measure(name, params, iterations, prepared):
+    database.DB_PREPARED_STATEMENTS = prepared
+    durations = []
+    with database.get_db_connection() as conn:
+        with conn.cursor() as cur:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                database.execute_statement(cur, name, params)
+                if cur.description:
+                    cur.fetchall()
+                conn.commit()
+                durations.append(time.perf_counter() - started)
+
+    durations.sort()
+    return {
+        "mean_us": round(sum(durations) / len(durations) * 1e6, 1),
+        "p50_us": round(durations[len(durations) // 2] * 1e6, 1),
+        "p95_us": round(durations[int(len(durations) * 0.95)] * 1e6, 1),
+    }
+
+
+LEGACY_LATEST_NEWS_DIGEST_SQL = """
+    SELECT id, rendered_html, items_json, raw_response, model_used, stage_timings, created_at
+    FROM news_digests
+    WHERE language_code = %s AND status = 'ready'
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+"""
+
+
+def measure_projections(iterations):
+    cases = {"legacy_full_row": LEGACY_LATEST_NEWS_DIGEST_SQL}
+    for projection, columns in bot_grs.NEWS_DIGEST_PROJECTIONS.items():
+        cases[projection] = LEGACY_LATEST_NEWS_DIGEST_SQL.replace(
+            "id, rendered_html, items_json, raw_response, model_used, stage_timings, created_at",
+            columns,
+        )
+
+    results = {}
+    with database.get_db_connection() as conn:
+        with conn.cursor() as cur:
+            for name, sql in cases.items():
+                durations = []
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    cur.execute(sql, (BENCH_LANG,))
+                    row = cur.fetchone()
+                    durations.append(time.perf_counter() - started)
+                durations.sort()
+                results[name] = {
+                    "bytes": database.record_fetched_bytes(f"bench_{name}", [row]),
+                    "p50_us": round(durations[len(durations) // 2] * 1e6, 1),
+                }
+                print(
+                    f"latest_news_digest[{name:<15}] {results[name]['bytes']:>8} bytes  p50 {results[name]['p50_us']:>8.1f}us",
+                    flush=True,
+                )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot SQL statements with and without PREPARE.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--history-rows", type=int, default=500)
+    parser.add_argument("--only", default="", help="comma-separated statement names")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        print("DATABASE_URL is not set; point it at a scratch database.")
+        return 1
+
+    only = {name.strip() for name in args.only.split(",") if name.strip()}
+    results = {}
+    cleanup()
+    seed(args.history_rows)
+    try:
+        for name, params in get_cases().items():
+            if only and name not in only:
+                continue
+            measure(name, params, min(50, args.iterations), True)
+            plain = measure(name, params, args.iterations, False)
+            prepared = measure(name, params, args.iterations, True)
+            results[name] = {"plain": plain, "prepared": prepared}
+            print(
+                f"{name:<30} plain p50 {plain['p50_us']:>8.1f}us  prepared p50 {prepared['p50_us']:>8.1f}us  "
+                f"speedup {plain['mean_us'] / prepared['mean_us']:.2f}x",
+                flush=True,
+            )
+        if not only:
+            results["projections"] = measure_projections(min(args.iterations, 500))
+    finally:
+        cleanup()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
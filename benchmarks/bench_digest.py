@@ -0,0 +1,193 @@
+"""Offline benchmarks for the digest pipeline.
+
+    python benchmarks/bench_digest.py                      # compare against baseline.json
+    python benchmarks/bench_digest.py --update-baseline    # record a new baseline
+    python benchmarks/bench_digest.py --sizes 100 --only dedupe_digest_items
+
+baseline.json is machine-specific; regenerate it on the machine that runs the gate.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+# Offline run: placeholders keep bot_grs importable without real credentials.
+os.environ.setdefault("TELEGRAM_TOKEN", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import logging  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+from openai.types.responses import Response  # noqa: E402
+
+import bot_grs  # noqa: E402
+import synthetic  # noqa: E402
+
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def load_fixture_payloads(lang):
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, "fixtures", "*.json"))):
+        with open(path, encoding="utf-8") as handle:
+            payloads.append(json.load(handle))
+    if not payloads:
+        payloads.append(synthetic.make_responses_payload(synthetic.make_raw_pool(16, lang=lang), lang=lang))
+    return payloads
+
+
+def prepare_cases(size, lang):
+    raw_pool = synthetic.make_raw_pool(size, lang=lang)
+    pool = [item for item in (bot_grs.normalize_digest_item(item) for item in raw_pool) if item]
+    half = len(pool) // 2
+    pool_json = [item.to_json() for item in pool]
+
+    def fresh_pool():
+        # DigestItem caches its dedupe keys; rebuilt items keep those caches cold, as in a real refresh.
+        return [bot_grs.DigestItem.from_json(data) for data in pool_json]
+
+    def fresh_halves():
+        items = fresh_pool()
+        return items[:half], items[half:]
+    without_urls = [item.replace(source_url="") if index % 2 else item for index, item in enumerate(pool)]
+    fixture_payloads = load_fixture_payloads(lang)
+    rendered_html = bot_grs.render_news_digest_html(pool, lang)
+    date_strings = synthetic.make_date_strings(size)
+
+    def enrich():
+        # Fresh, unvalidated response objects so the citation index cache is part of the measured work
+        # and recorded payloads stay loadable across SDK versions.
+        for payload in fixture_payloads:
+            bot_grs.enrich_digest_items_with_citations(without_urls, Response.model_construct(**payload))
+
+    # name -> (func, units[, setup]); setup() runs untimed before each call and returns func's arguments.
+    return {
+        "normalize_digest_item": (lambda: [bot_grs.normalize_digest_item(item) for item in raw_pool], len(raw_pool)),
+        "dedupe_digest_items": (bot_grs.dedupe_digest_items, len(pool), lambda: (fresh_pool(),)),
+        "merge_news_pool_items": (bot_grs.merge_news_pool_items, len(pool), fresh_halves),
+        "enrich_digest_items_with_citations": (enrich, len(without_urls) * len(fixture_payloads)),
+        "render_news_digest_html": (lambda: bot_grs.render_news_digest_html(pool, lang), len(pool)),
+        "split_message_chunks": (lambda: bot_grs.split_message_chunks(rendered_html), len(rendered_html)),
+        "parse_article_date": (
+            lambda: [bot_grs.parse_article_date(value) for value in date_strings],
+            len(date_strings),
+            # Start each round with an empty memo so repeated rounds do not measure only cache hits.
+            lambda: bot_grs.parse_article_date_cached.cache_clear() or (),
+        ),
+    }
+
+
+def measure(func, units, min_time, min_rounds, setup=None):
+    rounds = 0
+    elapsed = 0.0
+    best = None
+    while rounds < min_rounds or elapsed < min_time:
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        func(*args)
+        duration = time.perf_counter() - started
+        best = duration if best is None else min(best, duration)
+        elapsed += duration
+        rounds += 1
+
+    args = setup() if setup else ()
+    tracemalloc.start()
+    func(*args)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rounds": rounds,
+        "mean_sec": elapsed / rounds,
+        "best_sec": best,
+        "ops_per_sec": rounds / elapsed if elapsed else 0.0,
+        "units_per_sec": units * rounds / elapsed if elapsed else 0.0,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run(sizes, lang, min_time, min_rounds, only):
+    results = {}
+    for size in sizes:
+        for name, (func, units, *setup) in prepare_cases(size, lang).items():
+            if only and name not in only:
+                continue
+            key = f"{name}[{size}]"
+            results[key] = measure(func, units, min_time, min_rounds, *setup)
+            result = results[key]
+            print(
+                f"{key:<46} {result['ops_per_sec']:>12.2f} ops/s "
+                f"{result['units_per_sec']:>14.0f} units/s "
+                f"{result['peak_memory_kb']:>10.1f} KiB peak",
+                flush=True,
+            )
+    return results
+
+
+def compare_with_baseline(results, baseline, max_regression):
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if not reference or not reference.get("ops_per_sec"):
+            continue
+        ratio = result["ops_per_sec"] / reference["ops_per_sec"]
+        if ratio < 1 - max_regression:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the digest processing pipeline.")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument("--lang", default="ru", choices=["ru", "en"])
+    parser.add_argument("--min-time", type=float, default=0.5, help="minimum measured seconds per case")
+    parser.add_argument("--min-rounds", type=int, default=3)
+    parser.add_argument("--only", default="", help="comma-separated function names")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="allowed ops/sec drop vs baseline")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    only = {name.strip() for name in args.only.split(",") if name.strip()}
+    results = run(sizes, args.lang, args.min_time, args.min_rounds, only)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=1, sort_keys=True)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as handle:
+                baseline = json.load(handle)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(baseline, handle, indent=1, sort_keys=True)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline to create one.")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    regressions = compare_with_baseline(results, baseline, args.max_regression)
+    for key, ratio in regressions:
+        print(f"REGRESSION {key}: {ratio:.2f}x of baseline ops/sec")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""DigestItem versus the plain dicts the digest pipeline used to pass around:
+memory per item, copy cost, and dedupe with cold versus warm derived-value caches.
+
+    python benchmarks/bench_digest_item.py
+    python benchmarks/bench_digest_item.py --size 2000 --output /tmp/digest_item.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+os.environ.setdefault("TELEGRAM_TOKEN", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import logging  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+import bot_grs  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    objects = build()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objects, current
+
+
+def measure_time(func, rounds):
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        duration = time.perf_counter() - started
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DigestItem against dict digest items.")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--lang", default="ru", choices=["ru", "en"])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    raw_pool = synthetic.make_raw_pool(args.size, lang=args.lang)
+    items = [item for item in (bot_grs.normalize_digest_item(item) for item in raw_pool) if item]
+    dicts = [item.to_json() for item in items]
+
+    # Field values are shared by both representations; only the containers are measured.
+    _, item_bytes = measure_memory(lambda: [item.replace() for item in items])
+    _, dict_bytes = measure_memory(lambda: [dict(item) for item in dicts])
+
+    def cold_dedupe():
+        bot_grs.dedupe_digest_items([item.replace() for item in items])
+
+    warm_items = [item.replace() for item in items]
+    bot_grs.dedupe_digest_items(warm_items)
+
+    results = {
+        "items": len(items),
+        "container_bytes_per_item": {
+            "dict": round(dict_bytes / len(dicts)),
+            "digest_item": round(item_bytes / len(items)),
+        },
+        # Stages now share items; a copy is only made when a field actually changes.
+        "update_one_field_us_per_item": {
+            "dict": measure_time(lambda: [dict(item, source_url="") for item in dicts], args.rounds) / len(dicts) * 1e6,
+            "digest_item": measure_time(lambda: [item.replace(source_url="") for item in items], args.rounds) / len(items) * 1e6,
+        },
+        "dedupe_seconds": {
+            "cold_caches": measure_time(cold_dedupe, args.rounds),
+            "warm_caches": measure_time(lambda: bot_grs.dedupe_digest_items(warm_items), args.rounds),
+        },
+    }
+    print(json.dumps(results, indent=1))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Startup profile: import-time breakdown of bot_grs and, optionally, the
+per-stage timings of the worker warm-up.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --top 20
+    DATABASE_URL=... python benchmarks/bench_startup.py --warm
+
+Every run is a fresh interpreter, so the numbers are cold-process costs.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+IMPORT_LINE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent> *)(?P<name>\S+)")
+
+IMPORT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import bot_grs
+print(json.dumps({"import_seconds": time.perf_counter() - started}))
+"""
+
+WARM_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import bot_grs
+imported = time.perf_counter()
+bot_grs.warm_up()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "warm_up_seconds": time.perf_counter() - imported,
+    "ready": bot_grs.startup_state["ready"],
+    "error": bot_grs.startup_state["error"],
+    "stages": bot_grs.startup_state["timings"]["stages"],
+}))
+"""
+
+
+def run_python(script, *flags):
+    env = dict(os.environ)
+    env.setdefault("TELEGRAM_TOKEN", "benchmark")
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    env.setdefault("NEWS_SCHEDULER_ENABLED", "false")
+    env.setdefault("NEWS_JOB_WORKER_ENABLED", "false")
+    completed = subprocess.run(
+        [sys.executable, *flags, "-c", script],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return result, completed.stderr
+
+
+def parse_import_times(stderr):
+    """Direct dependencies of bot_grs (one level below it) and bot_grs's own time."""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            entries.append({
+                "name": match.group("name"),
+                "depth": len(match.group("indent")) // 2,
+                "self_ms": int(match.group("self")) / 1000,
+                "cumulative_ms": int(match.group("cumulative")) / 1000,
+            })
+    module = next((entry for entry in entries if entry["name"] == "bot_grs"), None)
+    if module is None:
+        return None, []
+    children = [entry for entry in entries if entry["depth"] == module["depth"] + 1]
+    return module, sorted(children, key=lambda entry: entry["cumulative_ms"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile bot_grs import time and worker warm-up.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--warm", action="store_true", help="also run warm_up(); needs DATABASE_URL")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    import_seconds = [run_python(IMPORT_SCRIPT)[0]["import_seconds"] for _ in range(args.runs)]
+    _, stderr = run_python(IMPORT_SCRIPT, "-X", "importtime")
+    module, children = parse_import_times(stderr)
+
+    results = {
+        "import_seconds_median": statistics.median(import_seconds),
+        "import_seconds_runs": import_seconds,
+        "bot_grs_self_ms": module["self_ms"] if module else None,
+        "dependencies": children[:args.top],
+    }
+    print(f"import bot_grs: median {results['import_seconds_median'] * 1000:.0f} ms over {args.runs} runs")
+    if module:
+        print(f"  bot_grs module body: {module['self_ms']:.0f} ms")
+    for entry in children[:args.top]:
+        print(f"  {entry['name']:<36} {entry['cumulative_ms']:>8.0f} ms")
+
+    if args.warm:
+        if not os.getenv("DATABASE_URL"):
+            print("DATABASE_URL is not set; skipping --warm.")
+        else:
+            warm, _ = run_python(WARM_SCRIPT)
+            results["warm"] = warm
+            print(f"warm_up: {warm['warm_up_seconds'] * 1000:.0f} ms ready={warm['ready']} error={warm['error']}")
+            for stage in warm["stages"]:
+                print(f"  {stage['name']:<36} {stage['seconds'] * 1000:>8.0f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_grs  # noqa: E402
+
+# Records a live news-mode Responses payload for the offline benchmarks.
+# This spends real tokens; run it manually when the payload shape needs refreshing.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a web_search Responses payload as a benchmark fixture.")
+    parser.add_argument("--lang", default="ru", choices=["ru", "en"])
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "fixtures", "recorded_response.json"))
+    args = parser.parse_args()
+
+    messages = [
+        {"role": "system", "content": "You build a daily migration digest."},
+        {"role": "user", "content": bot_grs.build_news_prompt(args.lang)},
+    ]
+    response, model_used = bot_grs.create_response(messages, lang=args.lang, news_mode=True)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(response.model_dump(), handle, ensure_ascii=False, indent=1)
+    print(f"Recorded model={model_used} output={args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import random
+from datetime import date, timedelta
+
+# Deterministic synthetic digest data for offline benchmarks.
+
+COUNTRIES_RU = [
+    "Испания", "Португалия", "Германия", "Сербия", "Черногория", "Грузия", "Латвия",
+    "Эстония", "Финляндия", "Чехия", "Польша", "Кипр", "Греция", "Италия", "ОАЭ", "Турция",
+]
+COUNTRIES_EN = [
+    "Spain", "Portugal", "Germany", "Serbia", "Montenegro", "Georgia", "Latvia",
+    "Estonia", "Finland", "Czechia", "Poland", "Cyprus", "Greece", "Italy", "UAE", "Turkey",
+]
+TOPICS_RU = [
+    "меняет правила выдачи ВНЖ для удалённых работников",
+    "ужесточает требования к золотой визе",
+    "вводит новую визу цифрового кочевника",
+    "продлевает срок рассмотрения заявлений на гражданство",
+    "запускает онлайн-подачу документов на ПМЖ",
+    "повышает минимальный доход для воссоединения семьи",
+    "отменяет упрощённую легализацию для граждан РФ",
+    "вводит квоты на трудовую миграцию",
+]
+TOPICS_EN = [
+    "changes residence permit rules for remote workers",
+    "tightens golden visa requirements",
+    "introduces a new digital nomad visa",
+    "extends processing times for citizenship applications",
+    "launches online filing for permanent residency",
+    "raises the minimum income for family reunification",
+    "ends simplified legalization for Russian citizens",
+    "introduces quotas for labour migration",
+]
+DOMAINS = [
+    "rbc.ru", "kommersant.ru", "dw.com", "rus.err.ee", "pravo.ru", "migron.ru",
+    "immigrantinvest.com", "astons.com", "iworld.com", "euronews.com", "reuters.com",
+    "schengen.news", "lsm.lv", "yle.fi", "novaya.media", "meduza.io",
+]
+RU_MONTHS = [
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+]
+EN_MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+
+REFERENCE_DATE = date(2025, 6, 1)
+
+
+def format_date(rng, value):
+    style = rng.randrange(6)
+    if style == 0:
+        return value.isoformat()
+    if style == 1:
+        return value.strftime("%d.%m.%Y")
+    if style == 2:
+        return value.strftime("%d/%m/%Y")
+    if style == 3:
+        return f"{value.day} {RU_MONTHS[value.month - 1]} {value.year}"
+    if style == 4:
+        return f"{value.day} {EN_MONTHS[value.month - 1]} {value.year}"
+    return f"около {rng.randint(2, 9)} недель назад"
+
+
+def make_raw_item(rng, index, lang="ru"):
+    countries = COUNTRIES_RU if lang == "ru" else COUNTRIES_EN
+    topics = TOPICS_RU if lang == "ru" else TOPICS_EN
+    country = countries[index % len(countries)]
+    topic = topics[rng.randrange(len(topics))]
+    domain = DOMAINS[rng.randrange(len(DOMAINS))]
+    published = REFERENCE_DATE - timedelta(days=rng.randrange(120))
+
+    if lang == "ru":
+        summary = (
+            f"Власти страны {country} объявили, что {topic} с {published.day} {RU_MONTHS[published.month - 1]}. "
+            f"Изменение затрагивает заявителей из России и их семьи, подающих документы через консульства. "
+            f"Эксперты ожидают рост сроков рассмотрения на {rng.randint(2, 12)} недель (материал {index})."
+        )
+    else:
+        summary = (
+            f"Authorities in {country} said the government {topic} from {published.isoformat()}. "
+            f"The change affects applicants from Russia and their families filing through consulates. "
+            f"Experts expect processing times to grow by {rng.randint(2, 12)} weeks (item {index})."
+        )
+
+    return {
+        "country": country,
+        "title": f"{country} {topic} ({index})",
+        "date": format_date(rng, published),
+        "summary": summary,
+        "source_domain": domain,
+        "source_url": f"https://www.{domain}/news/{published.year}/{index}-{rng.randrange(10 ** 6)}/",
+    }
+
+
+def make_raw_pool(size, seed=42, lang="ru"):
+    rng = random.Random(seed + size)
+    return [make_raw_item(rng, index, lang=lang) for index in range(size)]
+
+
+def make_date_strings(size, seed=7):
+    rng = random.Random(seed + size)
+    values = []
+    for _ in range(size):
+        published = REFERENCE_DATE - timedelta(days=rng.randrange(400))
+        values.append(format_date(rng, published))
+    return values
+
+
+def make_responses_payload(items, lang="ru"):
+    """Build a Responses API payload shaped like a recorded web_search answer."""
+    label = "Оригинал статьи" if lang == "ru" else "Original article"
+    annotations = []
+    text = ""
+    for index, item in enumerate(items, start=1):
+        block = f"{index}) {item['country']}: {item['title']} — {item['date']}. {item['summary']}\n"
+        start = len(text) + block.index(item["title"])
+        annotations.append({
+            "type": "url_citation",
+            "url": item["source_url"],
+            "title": item["title"],
+            "start_index": start,
+            "end_index": start + len(item["title"]),
+        })
+        text += block + f"{label}: {item['source_domain']}\n\n"
+
+    return {
+        "id": "resp_benchmark",
+        "object": "response",
+        "created_at": 1748736000,
+        "model": "gpt-4.1",
+        "status": "completed",
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [{"type": "web_search", "search_context_size": "medium"}],
+        "output": [
+            {
+                "type": "web_search_call",
+                "id": "ws_benchmark",
+                "status": "completed",
+                "action": {"type": "search", "query": "migration news relocation"},
+            },
+            {
+                "type": "message",
+                "id": "msg_benchmark",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": annotations}],
+            },
+        ],
+        "usage": {
+            "input_tokens": 12000,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": 2400,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": 14400,
+        },
+    }
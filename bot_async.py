@@ -0,0 +1,677 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+import asyncpg
+import httpx
+from openai import AsyncOpenAI
+
+import admission
+import metrics
+from bot_grs import (
+    CHAT_HISTORY_CONTEXT_DAYS,
+    METRICS_TOKEN,
+    NEWS_CRON_TOKEN,
+    OPENAI_MODEL,
+    REQUEST_TIMEOUT_SEC,
+    STARTUP_WARM_CONNECTIONS,
+    STARTUP_WARM_TIMEOUT_SEC,
+    TELEGRAM_API_BASE_URL,
+    TELEGRAM_TOKEN,
+    TELEGRAM_WEBHOOK_SECRET,
+    TEXTS,
+    build_answer_messages,
+    extract_response_text,
+    finalize_answer_text,
+    enqueue_deferred_answer,
+    enqueue_news_digest_job,
+    ensure_background_workers,
+    format_limit_reached_message,
+    get_access_retry_rule,
+    get_answer_error_text,
+    get_answer_fallback_models,
+    get_answer_history_limit,
+    get_int_env,
+    get_lang_keyboard,
+    get_main_keyboard,
+    get_menu_reply,
+    get_news_button_reply,
+    get_news_digest_job,
+    get_news_digest_status,
+    get_news_job_worker_id,
+    get_subscription_reply,
+    get_update_age,
+    get_user_lang,
+    is_admin_news_chat,
+    is_duplicate_update,
+    is_news_button,
+    is_news_job_active,
+    is_news_refresh_command,
+    is_news_status_command,
+    is_request_limit_reached,
+    is_subscribe_command,
+    iter_response_requests,
+    log_generate_answer,
+    log_startup_config,
+    log_response_request_failure,
+    log_response_request_start,
+    match_language_choice,
+    mentions_access_limitation,
+    news_job_wakeup,
+    openai_client_kwargs,
+    pending_news_message,
+    process_news_refresh_request,
+    record_openai_usage,
+    release_deferred_answers,
+    reserve_news_job,
+    serialize_news_digest_job,
+    split_message_chunks,
+    toggle_news_subscription,
+)
+from database import DB_POOL_CHECKOUT_TIMEOUT_SEC, get_database_url
+
+# asyncio serving mode: one process keeps many conversations in flight while it waits
+# on OpenAI, Postgres and Telegram. Start it instead of gunicorn with
+#
+#   uvicorn bot_async:app --host 0.0.0.0 --port $PORT
+#
+# Chat traffic runs on asyncpg/httpx/AsyncOpenAI. The news digest pipeline is batch
+# work for admins and the cron task, so it keeps using the sync code in worker threads.
+
+logger = logging.getLogger("grs-tg-bot.async")
+
+ASYNC_MAX_IN_FLIGHT = get_int_env("ASYNC_MAX_IN_FLIGHT", 500)
+ASYNC_DB_POOL_MIN_SIZE = get_int_env("ASYNC_DB_POOL_MIN_SIZE", 1)
+ASYNC_DB_POOL_MAX_SIZE = get_int_env("ASYNC_DB_POOL_MAX_SIZE", 10)
+ASYNC_TELEGRAM_MAX_CONNECTIONS = get_int_env("ASYNC_TELEGRAM_MAX_CONNECTIONS", 100)
+ASYNC_BLOCKING_WORKERS = get_int_env("ASYNC_BLOCKING_WORKERS", 8)
+ASYNC_SHUTDOWN_GRACE_SEC = get_int_env("ASYNC_SHUTDOWN_GRACE_SEC", 20)
+
+WEBHOOK_PATH = f"/webhook/{TELEGRAM_TOKEN}"
+NEWS_JOB_STATUS_PREFIX = "/tasks/news-digest-jobs/"
+
+db_pool = None
+db_pool_lock = None
+http_client = None
+openai_client = None
+in_flight = None
+background_tasks = set()
+chat_locks = {}
+startup_lock = None
+startup_state = {"ready": False, "attempts": 0, "error": None, "timings": None}
+
+
+# ---------------------------------------------
+# Postgres (asyncpg)
+# ---------------------------------------------
+async def get_db_pool():
+    global db_pool
+    if db_pool is None:
+        async with db_pool_lock:
+            if db_pool is None:
+                db_pool = await asyncpg.create_pool(
+                    dsn=get_database_url(),
+                    min_size=ASYNC_DB_POOL_MIN_SIZE,
+                    max_size=ASYNC_DB_POOL_MAX_SIZE,
+                )
+                logger.info("Async database connection pool initialized.")
+    return db_pool
+
+
+@asynccontextmanager
+async def acquire_connection():
+    pool = await get_db_pool()
+    started = time.perf_counter()
+    async with pool.acquire(timeout=DB_POOL_CHECKOUT_TIMEOUT_SEC) as conn:
+        metrics.observe("grs_db_checkout_wait_seconds", time.perf_counter() - started)
+        yield conn
+
+
+@metrics.timed("grs_db_call_seconds")
+async def get_user(chat_id):
+    try:
+        async with acquire_connection() as conn:
+            row = await conn.fetchrow("SELECT * FROM users WHERE chat_id = $1", chat_id)
+            return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"Error getting user: {e}")
+        return None
+
+
+@metrics.timed("grs_db_call_seconds")
+async def create_user(chat_id):
+    try:
+        async with acquire_connection() as conn:
+            await conn.execute(
+                "INSERT INTO users (chat_id, language_code, request_count) VALUES ($1, 'ru', 0) ON CONFLICT (chat_id) DO NOTHING",
+                chat_id,
+            )
+        return await get_user(chat_id)
+    except Exception as e:
+        logger.error(f"Error creating user: {e}")
+        return None
+
+
+@metrics.timed("grs_db_call_seconds")
+async def update_user_language(chat_id, lang_code):
+    try:
+        async with acquire_connection() as conn:
+            await conn.execute("UPDATE users SET language_code = $1 WHERE chat_id = $2", lang_code, chat_id)
+    except Exception as e:
+        logger.error(f"Error updating language: {e}")
+
+
+@metrics.timed("grs_db_call_seconds")
+async def increment_request_count(chat_id):
+    try:
+        async with acquire_connection() as conn:
+            await conn.execute("UPDATE users SET request_count = request_count + 1 WHERE chat_id = $1", chat_id)
+    except Exception as e:
+        logger.error(f"Error incrementing count: {e}")
+
+
+@metrics.timed("grs_db_call_seconds")
+async def save_message(chat_id, role, content):
+    try:
+        async with acquire_connection() as conn:
+            await conn.execute(
+                "INSERT INTO chat_history (chat_id, role, content) VALUES ($1, $2, $3)",
+                chat_id, role, content,
+            )
+    except Exception as e:
+        logger.error(f"Error saving message: {e}")
+
+
+@metrics.timed("grs_db_call_seconds")
+async def load_history(chat_id, limit=20):
+    try:
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT role, content
+                FROM chat_history
+                WHERE chat_id = $1 AND created_at >= NOW() - make_interval(days => $2)
+                ORDER BY created_at DESC
+                LIMIT $3
+                """,
+                chat_id, CHAT_HISTORY_CONTEXT_DAYS, limit,
+            )
+        return [dict(row) for row in reversed(rows)]
+    except Exception as e:
+        logger.error(f"Error loading history: {e}")
+        return []
+
+
+# ---------------------------------------------
+# OpenAI (AsyncOpenAI)
+# ---------------------------------------------
+async def call_openai_responses(variant, **request_payload):
+    model = request_payload.get("model", "")
+    try:
+        with metrics.timer("grs_openai_request_seconds", model=model, variant=variant):
+            response = await openai_client.responses.create(**request_payload)
+    except Exception as exc:
+        metrics.inc("grs_openai_errors_total", model=model, variant=variant, exc_type=exc.__class__.__name__)
+        raise
+
+    record_openai_usage(response, model)
+    return response
+
+
+async def create_response(messages, news_mode=False, plan=None):
+    last_error = None
+
+    for variant_name, request_payload, domain_count in iter_response_requests(messages, news_mode, plan=plan):
+        try:
+            log_response_request_start(variant_name, request_payload, news_mode, domain_count)
+            response = await call_openai_responses(variant_name, **request_payload)
+            return response, request_payload["model"]
+        except Exception as exc:
+            last_error = exc
+            log_response_request_failure(variant_name, request_payload, news_mode, domain_count, exc)
+
+    raise last_error
+
+
+async def generate_answer(chat_id, user_message, lang="ru", use_history=True, plan=None):
+    history = await load_history(chat_id, limit=get_answer_history_limit(plan)) if use_history else []
+    messages = build_answer_messages(history, user_message)
+    log_generate_answer(chat_id, lang, False, use_history, history, user_message)
+
+    try:
+        started = time.perf_counter()
+        try:
+            response, model_used = await create_response(messages, plan=plan)
+        finally:
+            # Timeouts and errors are the slow calls admission most needs to see.
+            admission.controller.record_latency(time.perf_counter() - started)
+        content = extract_response_text(response)
+
+        if mentions_access_limitation(content):
+            retry_messages = messages + [{"role": "user", "content": get_access_retry_rule(lang)}]
+            retry, _ = await create_response(retry_messages, plan=plan)
+            return extract_response_text(retry)
+
+        logger.info(
+            "OpenAI response completed with model=%s news_mode=%s admission=%s",
+            model_used, False, plan["mode"] if plan else "normal",
+        )
+        return finalize_answer_text(content)
+
+    except Exception as e:
+        err_text = str(e)
+        logger.exception("Error OpenAI (Responses API): %s", err_text)
+
+        for fallback_model in get_answer_fallback_models(plan=plan):
+            try:
+                fb = await call_openai_responses("fallback", model=fallback_model, input=messages)
+                return finalize_answer_text(extract_response_text(fb))
+            except Exception as fb_err:
+                logger.exception("Fallback error model=%s: %s", fallback_model, fb_err)
+
+        return get_answer_error_text(err_text, lang)
+
+
+# ---------------------------------------------
+# Telegram (httpx)
+# ---------------------------------------------
+async def post_telegram(method, payload, timeout=REQUEST_TIMEOUT_SEC):
+    try:
+        with metrics.timer("grs_telegram_request_seconds", method=method):
+            resp = await http_client.post(
+                f"{TELEGRAM_API_BASE_URL}/bot{TELEGRAM_TOKEN}/{method}", json=payload, timeout=timeout
+            )
+    except Exception:
+        metrics.inc("grs_telegram_errors_total", method=method, status="exception")
+        raise
+
+    if resp.status_code == 429:
+        metrics.inc("grs_telegram_rate_limited_total", method=method)
+    elif not resp.is_success:
+        metrics.inc("grs_telegram_errors_total", method=method, status=resp.status_code)
+    return resp
+
+
+async def send_message(chat_id, text, keyboard=None, parse_mode=None, disable_web_page_preview=False):
+    try:
+        for index, chunk in enumerate(split_message_chunks(text)):
+            payload = {"chat_id": chat_id, "text": chunk}
+
+            if keyboard and index == 0:
+                payload["reply_markup"] = keyboard
+            if parse_mode:
+                payload["parse_mode"] = parse_mode
+            if disable_web_page_preview:
+                payload["disable_web_page_preview"] = True
+
+            resp = await post_telegram("sendMessage", payload)
+            if not resp.is_success:
+                logger.error("Send Error: %s %s", resp.status_code, resp.text)
+                break
+    except Exception as e:
+        logger.error(f"Send Error: {e}")
+
+
+# ---------------------------------------------
+# Обработка обновлений
+# ---------------------------------------------
+@asynccontextmanager
+async def chat_turn(chat_id):
+    # Updates are acknowledged before processing, so keep one chat's messages in order.
+    entry = chat_locks.setdefault(chat_id, {"lock": asyncio.Lock(), "users": 0})
+    entry["users"] += 1
+    try:
+        async with entry["lock"]:
+            yield
+    finally:
+        entry["users"] -= 1
+        if not entry["users"]:
+            chat_locks.pop(chat_id, None)
+
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+async def handle_message(chat_id, text, queue_age_sec=0.0):
+    user = await get_user(chat_id)
+    if not user:
+        await create_user(chat_id)
+        await send_message(chat_id, TEXTS["ru"]["welcome"], get_lang_keyboard())
+        return
+
+    lang = get_user_lang(user)
+    t = TEXTS[lang]
+
+    if text == "/start":
+        await send_message(chat_id, t["welcome"], get_lang_keyboard())
+        return
+
+    if is_news_refresh_command(text):
+        if not is_admin_news_chat(chat_id) or not reserve_news_job(chat_id, lang):
+            await send_message(chat_id, pending_news_message(lang))
+            return
+
+        await send_message(chat_id, t["searching"])
+        spawn(asyncio.to_thread(process_news_refresh_request, chat_id, lang, text, True))
+        return
+
+    if is_news_status_command(text):
+        if not is_admin_news_chat(chat_id):
+            await send_message(chat_id, pending_news_message(lang))
+            return
+
+        await send_message(chat_id, await asyncio.to_thread(get_news_digest_status, lang, chat_id))
+        return
+
+    if is_subscribe_command(text):
+        subscribed = await asyncio.to_thread(toggle_news_subscription, chat_id)
+        await send_message(chat_id, get_subscription_reply(subscribed, lang))
+        return
+
+    selected_lang = match_language_choice(text)
+    if selected_lang:
+        await update_user_language(chat_id, selected_lang)
+        await send_message(chat_id, TEXTS[selected_lang]["lang_selected"], get_main_keyboard(selected_lang))
+        return
+
+    menu_reply = get_menu_reply(text, lang, user)
+    if menu_reply:
+        await send_message(chat_id, menu_reply)
+        return
+
+    if is_news_button(text):
+        if is_news_job_active(chat_id, lang):
+            await send_message(chat_id, pending_news_message(lang))
+            return
+
+        digest_html = await asyncio.to_thread(get_news_button_reply, lang)
+        if digest_html:
+            await send_message(chat_id, digest_html, parse_mode="HTML", disable_web_page_preview=True)
+        else:
+            await send_message(chat_id, pending_news_message(lang))
+        return
+
+    if is_request_limit_reached(user):
+        await send_message(chat_id, format_limit_reached_message(lang))
+        return
+
+    plan = admission.controller.admit(queue_age_sec=queue_age_sec)
+    if plan["defer"]:
+        # Deferred questions are stored in deferred_answers and answered by the worker thread in bot_grs.
+        if await asyncio.to_thread(enqueue_deferred_answer, chat_id, text, lang) is None:
+            await send_message(chat_id, t["rate_limited"])
+            return
+        await increment_request_count(chat_id)
+        await save_message(chat_id, "user", text)
+        await send_message(chat_id, t["busy_queued"])
+        return
+
+    await increment_request_count(chat_id)
+    await save_message(chat_id, "user", text)
+    with admission.controller.track():
+        ans = await generate_answer(chat_id, text, lang, plan=plan)
+    await save_message(chat_id, "assistant", ans)
+    await send_message(chat_id, ans)
+
+
+async def process_update(chat_id, text, msg):
+    async with in_flight:
+        metrics.add_gauge("grs_async_updates_in_flight", 1)
+        try:
+            async with chat_turn(chat_id):
+                # Measured after the in-flight and per-chat waits, so both count as queueing.
+                await handle_message(chat_id, text, get_update_age(msg))
+        except Exception:
+            logger.exception("Unhandled error processing update chat_id=%s", chat_id)
+        finally:
+            metrics.add_gauge("grs_async_updates_in_flight", -1)
+
+
+# ---------------------------------------------
+# ASGI
+# ---------------------------------------------
+def get_header(scope, name):
+    name = name.lower().encode("latin-1")
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def get_query_param(scope, name, default=None):
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get(name)
+    return values[0] if values else default
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_response(send, status, body, content_type="text/plain; charset=utf-8"):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode("latin-1")), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def json_body(payload):
+    return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+@metrics.timed("grs_webhook_seconds")
+async def webhook(scope, receive):
+    if TELEGRAM_WEBHOOK_SECRET:
+        if get_header(scope, "X-Telegram-Bot-Api-Secret-Token") != TELEGRAM_WEBHOOK_SECRET:
+            logger.warning("Webhook rejected due to invalid secret token.")
+            return 403, "forbidden"
+
+    try:
+        data = json.loads(await read_body(receive) or b"null")
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or "message" not in data:
+        return 200, "ok"
+
+    update_id = data.get("update_id")
+    if is_duplicate_update(update_id):
+        logger.info("Skipping duplicate Telegram update_id=%s", update_id)
+        return 200, "ok"
+
+    msg = data["message"]
+    chat_id = msg.get("chat", {}).get("id")
+    text = msg.get("text", "")
+    if not chat_id or not text:
+        return 200, "ok"
+
+    spawn(process_update(chat_id, text, msg))
+    return 200, "ok"
+
+
+async def refresh_news_digest_task(scope):
+    token = get_header(scope, "X-News-Cron-Token") or get_query_param(scope, "token")
+    if not NEWS_CRON_TOKEN or token != NEWS_CRON_TOKEN:
+        return 403, json_body({"ok": False, "error": "forbidden"})
+
+    lang = get_query_param(scope, "lang", "ru")
+    force = get_query_param(scope, "force", "0").lower() in {"1", "true", "yes"}
+    job = await asyncio.to_thread(enqueue_news_digest_job, lang, force)
+    if not job:
+        return 503, json_body({"ok": False, "error": "enqueue_failed"})
+    news_job_wakeup.set()
+    return 202, json_body({
+        "ok": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "created": job["created"],
+        "status_url": f"/tasks/news-digest-jobs/{job['id']}",
+    })
+
+
+async def news_digest_job_status(scope, job_id):
+    token = get_header(scope, "X-News-Cron-Token") or get_query_param(scope, "token")
+    if not NEWS_CRON_TOKEN or token != NEWS_CRON_TOKEN:
+        return 403, json_body({"ok": False, "error": "forbidden"})
+
+    job = await asyncio.to_thread(get_news_digest_job, job_id)
+    if not job:
+        return 404, json_body({"ok": False, "error": "not_found"})
+    return 200, json_body({"ok": True, **serialize_news_digest_job(job)})
+
+
+def metrics_endpoint(scope):
+    if METRICS_TOKEN:
+        token = get_header(scope, "X-Metrics-Token") or get_query_param(scope, "token")
+        if token != METRICS_TOKEN:
+            return 403, json_body({"ok": False, "error": "forbidden"})
+    return 200, metrics.render_prometheus()
+
+
+async def warm_up():
+    """Async counterpart of bot_grs.warm_up(): asyncpg pool, live Telegram/OpenAI
+    connections and the background workers. /ready retries it until it succeeds.
+    """
+    async with startup_lock:
+        if startup_state["ready"]:
+            return True
+        startup_state["attempts"] += 1
+        trace = metrics.SpanTracer("grs_startup_stage_seconds")
+        try:
+            with trace.span("db_pool"):
+                async with acquire_connection() as conn:
+                    await conn.fetchval("SELECT 1")
+            if STARTUP_WARM_CONNECTIONS:
+                # Failures here only cost the first request a handshake; they do not block readiness.
+                with trace.span("telegram_connection"):
+                    try:
+                        await post_telegram("getMe", {}, timeout=STARTUP_WARM_TIMEOUT_SEC)
+                    except Exception as e:
+                        logger.warning(f"Telegram warm-up failed: {e}")
+                with trace.span("openai_connection"):
+                    try:
+                        await openai_client.with_options(
+                            timeout=STARTUP_WARM_TIMEOUT_SEC, max_retries=0
+                        ).models.retrieve(OPENAI_MODEL)
+                    except Exception as e:
+                        logger.warning(f"OpenAI warm-up failed: {e}")
+            with trace.span("background_workers"):
+                ensure_background_workers()
+        except Exception as e:
+            startup_state["error"] = f"{e.__class__.__name__}: {e}"
+            logger.error(f"Warm-up failed attempt={startup_state['attempts']}: {e}")
+            return False
+        finally:
+            startup_state["timings"] = trace.as_dict()
+
+        startup_state["ready"] = True
+        startup_state["error"] = None
+        logger.info("Warm-up finished timings=%s", startup_state["timings"])
+        return True
+
+
+async def ready():
+    if not startup_state["ready"]:
+        await warm_up()
+    body = json_body({
+        "ok": startup_state["ready"],
+        "attempts": startup_state["attempts"],
+        "error": startup_state["error"],
+        "timings": startup_state["timings"],
+    })
+    return (200 if startup_state["ready"] else 503), body
+
+
+async def startup():
+    global db_pool_lock, startup_lock, http_client, openai_client, in_flight
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=ASYNC_BLOCKING_WORKERS))
+    db_pool_lock = asyncio.Lock()
+    startup_lock = asyncio.Lock()
+    in_flight = asyncio.Semaphore(ASYNC_MAX_IN_FLIGHT)
+    http_client = httpx.AsyncClient(
+        timeout=REQUEST_TIMEOUT_SEC,
+        limits=httpx.Limits(max_connections=ASYNC_TELEGRAM_MAX_CONNECTIONS),
+    )
+    openai_client = AsyncOpenAI(**openai_client_kwargs)
+    log_startup_config()
+    # A failed warm-up does not abort startup; /ready answers 503 and retries it.
+    await warm_up()
+    logger.info(
+        "Async server started max_in_flight=%s db_pool_max=%s blocking_workers=%s",
+        ASYNC_MAX_IN_FLIGHT,
+        ASYNC_DB_POOL_MAX_SIZE,
+        ASYNC_BLOCKING_WORKERS,
+    )
+
+
+async def shutdown():
+    if background_tasks:
+        logger.info("Waiting for %s in-flight updates", len(background_tasks))
+        _done, pending = await asyncio.wait(list(background_tasks), timeout=ASYNC_SHUTDOWN_GRACE_SEC)
+        for task in pending:
+            task.cancel()
+    # The deferred-answer thread dies with the process; hand its question to another worker.
+    await asyncio.to_thread(release_deferred_answers, get_news_job_worker_id())
+
+    await http_client.aclose()
+    await openai_client.close()
+    if db_pool is not None:
+        await db_pool.close()
+
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await startup()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await handle_lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    path = scope["path"]
+    method = scope["method"]
+    content_type = "text/plain; charset=utf-8"
+
+    if path == WEBHOOK_PATH and method == "POST":
+        status, body = await webhook(scope, receive)
+    elif path == "/tasks/refresh-news-digest" and method in {"GET", "POST"}:
+        status, body = await refresh_news_digest_task(scope)
+        content_type = "application/json"
+    elif path.startswith(NEWS_JOB_STATUS_PREFIX) and path[len(NEWS_JOB_STATUS_PREFIX):].isdigit() and method == "GET":
+        status, body = await news_digest_job_status(scope, int(path[len(NEWS_JOB_STATUS_PREFIX):]))
+        content_type = "application/json"
+    elif path == "/ready" and method == "GET":
+        status, body = await ready()
+        content_type = "application/json"
+    elif path == "/metrics" and method == "GET":
+        status, body = metrics_endpoint(scope)
+        content_type = "text/plain; version=0.0.4" if status == 200 else "application/json"
+    else:
+        status, body = 404, "not found"
+
+    await send_response(send, status, body, content_type)
@@ -5,16 +5,35 @@ import time
 import threading
 import re
 import json
+import random
+import socket
+import hashlib
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone, date
+from functools import lru_cache
 from importlib.metadata import PackageNotFoundError, version
 from urllib.parse import urlparse
 
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
-from openai import OpenAI
+from flask import Flask, Response, jsonify, request
 from psycopg2.extras import Json
 
-from database import DatabasePool, get_db_connection
+import admission
+import metrics
+from chat_history_maintenance import run_chat_history_maintenance
+from countries import find_country_code, get_country_name
+from database import (
+    DatabasePool,
+    execute_statement,
+    get_db_connection,
+    get_read_connection,
+    open_advisory_lock_session,
+    prepared_statement,
+    record_fetched_bytes,
+)
+from keyword_matcher import KeywordMatcher
 
 load_dotenv()
 
@@ -34,6 +53,7 @@ app = Flask(__name__)
 # ---------------------------------------------
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+TELEGRAM_API_BASE_URL = (os.getenv("TELEGRAM_API_BASE_URL") or "https://api.telegram.org").rstrip("/")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_BASE_URL = (os.getenv("OPENAI_BASE_URL") or "").strip()
 # Model settings are env-driven because provider/model availability can change.
@@ -41,12 +61,14 @@ OPENAI_MODEL = (os.getenv("OPENAI_MODEL") or "gpt-5-mini").strip()
 OPENAI_NEWS_MODEL = (os.getenv("OPENAI_NEWS_MODEL") or "gpt-4.1").strip()
 OPENAI_TRANSLATION_MODEL = (os.getenv("OPENAI_TRANSLATION_MODEL") or "gpt-4.1-nano").strip()
 OPENAI_ENABLE_NEWS_FILTERS = os.getenv("OPENAI_ENABLE_NEWS_FILTERS", "false").lower() == "true"
+OPENAI_NEWS_STRUCTURED_OUTPUT = os.getenv("OPENAI_NEWS_STRUCTURED_OUTPUT", "true").lower() == "true"
 MANAGER_USERNAME = os.getenv("MANAGER_USERNAME", "globalrelocationsolutions_cz").lstrip("@")
 OPENAI_FALLBACK_MODELS_RAW = os.getenv("OPENAI_FALLBACK_MODELS") or "gpt-5,gpt-4.1,gpt-4o"
 OPENAI_TRANSLATION_FALLBACK_MODELS_RAW = (
     os.getenv("OPENAI_TRANSLATION_FALLBACK_MODELS") or "gpt-4o-mini,gpt-4.1-mini"
 )
 NEWS_CRON_TOKEN = os.getenv("NEWS_CRON_TOKEN", "")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 NEWS_ADMIN_CHAT_ID = int(os.getenv("NEWS_ADMIN_CHAT_ID", "1111827435"))
 
 try:
@@ -57,7 +79,19 @@ except ValueError:
 openai_client_kwargs = {"api_key": OPENAI_API_KEY, "timeout": OPENAI_TIMEOUT_SEC}
 if OPENAI_BASE_URL:
     openai_client_kwargs["base_url"] = OPENAI_BASE_URL
-client = OpenAI(**openai_client_kwargs)
+openai_client = None
+openai_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    global openai_client
+    if openai_client is None:
+        with openai_client_lock:
+            if openai_client is None:
+                # Imported here: the SDK is over half of this module's import time.
+                from openai import OpenAI
+                openai_client = OpenAI(**openai_client_kwargs)
+    return openai_client
 
 # ---------------------------------------------
 # Тексты и настройки
@@ -96,10 +130,74 @@ EN_DIGEST_MONTH_NAMES = (
     "november|december"
 )
 
+# Every spelling parse_article_date accepts: nominative, genitive and
+# prepositional Russian forms plus common abbreviations in both languages.
+ARTICLE_DATE_MONTHS = {
+    name: month
+    for month, names in enumerate(
+        [
+            "январь января январе янв january jan",
+            "февраль февраля феврале фев февр february feb",
+            "март марта марте мар march mar",
+            "апрель апреля апреле апр april apr",
+            "май мая мае may",
+            "июнь июня июне июн june jun",
+            "июль июля июле июл july jul",
+            "август августа августе авг august aug",
+            "сентябрь сентября сентябре сен сент september sep sept",
+            "октябрь октября октябре окт october oct",
+            "ноябрь ноября ноябре ноя нояб november nov",
+            "декабрь декабря декабре дек december dec",
+        ],
+        start=1,
+    )
+    for name in names.split()
+}
+ARTICLE_DATE_MONTH_PATTERN = "|".join(sorted(ARTICLE_DATE_MONTHS, key=len, reverse=True))
+ARTICLE_DATE_PATTERN = re.compile(
+    rf"""
+    \b(?:
+        (?P<iso_y>\d{{4}})[-./](?P<iso_m>\d{{1,2}})[-./](?P<iso_d>\d{{1,2}})
+      | (?P<num_d>\d{{1,2}})[-./](?P<num_m>\d{{1,2}})[-./](?P<num_y>\d{{4}})
+      | (?P<dmy_d>\d{{1,2}})\s+(?P<dmy_m>{ARTICLE_DATE_MONTH_PATTERN})\.?,?\s+(?P<dmy_y>\d{{4}})
+      | (?P<mdy_m>{ARTICLE_DATE_MONTH_PATTERN})\.?\s+(?P<mdy_d>\d{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<mdy_y>\d{{4}})
+      | (?P<my_m>{ARTICLE_DATE_MONTH_PATTERN})\.?,?\s+(?P<my_y>\d{{4}})
+    )(?!\d)
+    """,
+    re.I | re.X,
+)
+# "≈ 3 недели назад" is the model guessing, so approximate forms are not resolved.
+RELATIVE_ARTICLE_DATE_PATTERN = re.compile(
+    r"""
+    (?P<approx>≈|~|около|примерно|about|around)?\s*
+    (?:(?P<count>\d+)\s*|\b(?:(?:an?|one)\s+)?)
+    (?P<unit>
+        дн(?:я|ей)?|день|недел(?:я|и|ь|ю)|месяц(?:а|ев)?|год(?:а)?|лет
+      | days?|weeks?|months?|years?
+    )\s+(?:назад|ago)
+    | \b(?P<word>сегодня|вчера|today|yesterday)\b
+    """,
+    re.I | re.X,
+)
+
 processed_updates = {}
 processed_updates_lock = threading.Lock()
 active_news_jobs = set()
 active_news_jobs_lock = threading.Lock()
+news_job_worker = None
+news_job_worker_lock = threading.Lock()
+news_job_wakeup = threading.Event()
+news_scheduler = None
+news_scheduler_lock = threading.Lock()
+deferred_answer_worker = None
+deferred_answer_worker_lock = threading.Lock()
+deferred_answer_wakeup = threading.Event()
+startup_config_logged = False
+startup_state = {"ready": False, "attempts": 0, "error": None, "timings": None}
+startup_lock = threading.Lock()
+# Open Telegram/OpenAI connections during warm-up, not just the DB pool.
+STARTUP_WARM_CONNECTIONS = os.getenv("STARTUP_WARM_CONNECTIONS", "true").lower() == "true"
+STARTUP_WARM_TIMEOUT_SEC = 5
 
 
 def get_int_env(name, default):
@@ -115,6 +213,54 @@ NEWS_LOOKBACK_DAYS = get_int_env("NEWS_LOOKBACK_DAYS", 120)
 NEWS_ALLOWED_DOMAINS_RAW = os.getenv("NEWS_ALLOWED_DOMAINS", "")
 NEWS_SOURCE_URLS_RAW = os.getenv("NEWS_SOURCE_URLS", "")
 NEWS_LOW_PRIORITY_DOMAINS_RAW = os.getenv("NEWS_LOW_PRIORITY_DOMAINS", "")
+# load_history only reads this recent window, so lookups touch the newest chat_history partitions.
+CHAT_HISTORY_CONTEXT_DAYS = get_int_env("CHAT_HISTORY_CONTEXT_DAYS", 30)
+NEWS_JOB_MAX_ATTEMPTS = get_int_env("NEWS_JOB_MAX_ATTEMPTS", 3)
+NEWS_JOB_RETRY_DELAY_SEC = get_int_env("NEWS_JOB_RETRY_DELAY_SEC", 60)
+NEWS_JOB_HEARTBEAT_SEC = get_int_env("NEWS_JOB_HEARTBEAT_SEC", 15)
+# A running job whose heartbeat is older than this is treated as abandoned and reclaimed.
+NEWS_JOB_STALE_SEC = max(get_int_env("NEWS_JOB_STALE_SEC", 120), NEWS_JOB_HEARTBEAT_SEC * 3)
+NEWS_JOB_POLL_SEC = get_int_env("NEWS_JOB_POLL_SEC", 10)
+NEWS_JOB_WORKER_ENABLED = os.getenv("NEWS_JOB_WORKER_ENABLED", "true").lower() == "true"
+# One web_search discovery feeds every language; other languages translate the shared candidates.
+NEWS_SHARED_DISCOVERY = os.getenv("NEWS_SHARED_DISCOVERY", "true").lower() == "true"
+NEWS_SHARED_DISCOVERY_TTL_SEC = get_int_env("NEWS_SHARED_DISCOVERY_TTL_SEC", 6 * 60 * 60)
+# Deferred questions live in deferred_answers; a running row older than this is reclaimed.
+DEFERRED_ANSWER_STALE_SEC = get_int_env("DEFERRED_ANSWER_STALE_SEC", 600)
+DEFERRED_ANSWER_MAX_ATTEMPTS = get_int_env("DEFERRED_ANSWER_MAX_ATTEMPTS", 3)
+DEFERRED_ANSWER_POLL_SEC = get_int_env("DEFERRED_ANSWER_POLL_SEC", 5)
+NEWS_BROADCAST_ENABLED = os.getenv("NEWS_BROADCAST_ENABLED", "true").lower() == "true"
+# Telegram allows about 30 messages per second per bot across all chats; stay under it.
+NEWS_BROADCAST_MESSAGES_PER_SEC = get_int_env("NEWS_BROADCAST_MESSAGES_PER_SEC", 25)
+NEWS_BROADCAST_WORKERS = get_int_env("NEWS_BROADCAST_WORKERS", 8)
+# Progress is checkpointed after each batch, so a crash resends at most one batch.
+NEWS_BROADCAST_BATCH_SIZE = get_int_env("NEWS_BROADCAST_BATCH_SIZE", 50)
+NEWS_BROADCAST_MAX_RETRIES = get_int_env("NEWS_BROADCAST_MAX_RETRIES", 3)
+NEWS_SCHEDULER_ENABLED = os.getenv("NEWS_SCHEDULER_ENABLED", "true").lower() == "true"
+# Order matters: the first language is scheduled first, the others follow NEWS_SCHEDULER_STAGGER_SEC apart.
+NEWS_SCHEDULER_LANGS = [
+    lang for lang in (item.strip() for item in os.getenv("NEWS_SCHEDULER_LANGS", "ru,en").split(","))
+    if lang in ("ru", "en")
+]
+NEWS_SCHEDULER_INTERVAL_SEC = get_int_env("NEWS_SCHEDULER_INTERVAL_SEC", 30 * 60)
+NEWS_SCHEDULER_JITTER_SEC = get_int_env("NEWS_SCHEDULER_JITTER_SEC", 120)
+NEWS_SCHEDULER_STAGGER_SEC = get_int_env("NEWS_SCHEDULER_STAGGER_SEC", 300)
+CHAT_HISTORY_MAINTENANCE_INTERVAL_SEC = get_int_env("CHAT_HISTORY_MAINTENANCE_INTERVAL_SEC", 24 * 60 * 60)
+# Arbitrary constant shared by all replicas; whoever holds it runs the scheduler.
+NEWS_SCHEDULER_LOCK_ID = 724_002
+ARTICLE_DATE_CACHE_SIZE = get_int_env("ARTICLE_DATE_CACHE_SIZE", 4096)
+TRANSLATION_CACHE_MAX_ITEMS = get_int_env("TRANSLATION_CACHE_MAX_ITEMS", 2000)
+# Bump when the translation prompt changes so stale cached translations are not reused.
+TRANSLATION_CACHE_VERSION = "1"
+TRANSLATION_BATCH_MAX_ITEMS = get_int_env("TRANSLATION_BATCH_MAX_ITEMS", 5)
+TRANSLATION_BATCH_MAX_CHARS = get_int_env("TRANSLATION_BATCH_MAX_CHARS", 6000)
+TRANSLATION_MAX_WORKERS = get_int_env("TRANSLATION_MAX_WORKERS", 4)
+
+translation_cache = OrderedDict()
+translation_cache_lock = threading.Lock()
+translation_stats_lock = threading.Lock()
+static_prompt_cache = {}
+prompt_config_version = None
 
 DEFAULT_LOW_PRIORITY_NEWS_DOMAINS = {
     "astons.com",
@@ -367,20 +513,27 @@ def format_limit_reached_message(lang):
     )
 
 
-print(
-    "Startup config "
-    f"openai_sdk={get_package_version('openai')} "
-    f"openai_base_url={'custom' if OPENAI_BASE_URL else 'default'} "
-    f"openai_model={OPENAI_MODEL} "
-    f"openai_news_model={OPENAI_NEWS_MODEL or '<empty>'} "
-    f"openai_translation_model={OPENAI_TRANSLATION_MODEL or '<empty>'} "
-    f"openai_fallback_models={OPENAI_FALLBACK_MODELS_RAW} "
-    f"openai_translation_fallback_models={OPENAI_TRANSLATION_FALLBACK_MODELS_RAW} "
-    f"news_lookback_days={NEWS_LOOKBACK_DAYS} "
-    f"openai_timeout_sec={OPENAI_TIMEOUT_SEC} "
-    f"news_filters_enabled={OPENAI_ENABLE_NEWS_FILTERS}",
-    flush=True,
-)
+def log_startup_config():
+    """Printed once per process by the server entry points rather than on every import."""
+    global startup_config_logged
+    if startup_config_logged:
+        return
+    startup_config_logged = True
+    print(
+        "Startup config "
+        f"openai_sdk={get_package_version('openai')} "
+        f"openai_base_url={'custom' if OPENAI_BASE_URL else 'default'} "
+        f"openai_model={OPENAI_MODEL} "
+        f"openai_news_model={OPENAI_NEWS_MODEL or '<empty>'} "
+        f"openai_translation_model={OPENAI_TRANSLATION_MODEL or '<empty>'} "
+        f"openai_fallback_models={OPENAI_FALLBACK_MODELS_RAW} "
+        f"openai_translation_fallback_models={OPENAI_TRANSLATION_FALLBACK_MODELS_RAW} "
+        f"news_lookback_days={NEWS_LOOKBACK_DAYS} "
+        f"openai_timeout_sec={OPENAI_TIMEOUT_SEC} "
+        f"news_filters_enabled={OPENAI_ENABLE_NEWS_FILTERS} "
+        f"news_structured_output={OPENAI_NEWS_STRUCTURED_OUTPUT}",
+        flush=True,
+    )
 
 
 TEXTS = {
@@ -395,6 +548,7 @@ TEXTS = {
             "ℹ️ Как пользоваться\n\n"
             "Задайте вопрос свободной формы о визах, ВНЖ, ПМЖ, гражданстве, въезде, документах или релокации.\n\n"
             "📰 Актуальные новости — подборка важных миграционных новостей из разных источников.\n\n"
+            "🔔 /subscribe — получать свежий дайджест автоматически (повторная команда отключает подписку).\n\n"
             "📝 Написать менеджеру — контакты команды GRS.\n\n"
             "🎙 Скоро можно будет отправлять аудиосообщения: бот расшифрует голос и ответит по смыслу."
         ),
@@ -406,9 +560,12 @@ TEXTS = {
         "limit_info": "Использовано запросов: {count} из {max}.",
         "limit_reached": "🚫 Вы исчерпали лимит бесплатных запросов ({max}).\nПожалуйста, свяжитесь с менеджером для консультации: {manager_username}",
         "lang_selected": "🇷🇺 Язык установлен: Русский",
+        "news_subscribed": "🔔 Вы подписались на ежедневный дайджест новостей. Отправьте /subscribe ещё раз, чтобы отписаться.",
+        "news_unsubscribed": "🔕 Подписка на дайджест новостей отключена.",
         "searching": "🔍 Ищу информацию, это может занять минуту...",
         "error": "❌ Произошла ошибка сервиса.",
         "rate_limited": "⚠️ Запрос временно недоступен. Попробуйте снова через минуту.",
+        "busy_queued": "⏳ Сейчас много запросов. Ваш вопрос в очереди — ответ придёт в этот чат, как только освободится место.",
         "btn_ru": "🇷🇺 Русский",
         "btn_en": "🇬🇧 English"
     },
@@ -423,6 +580,7 @@ TEXTS = {
             "ℹ️ How to use\n\n"
             "Ask a free-form question about visas, residence permits, citizenship, entry rules, documents, or relocation.\n\n"
             "📰 Latest News — a curated digest of important migration news from multiple sources.\n\n"
+            "🔔 /subscribe — get each fresh digest automatically (send it again to unsubscribe).\n\n"
             "📝 Contact Manager — GRS team contacts.\n\n"
             "🎙 Voice messages are coming soon: the bot will transcribe audio and answer the question."
         ),
@@ -434,9 +592,12 @@ TEXTS = {
         "limit_info": "Requests used: {count} of {max}.",
         "limit_reached": "🚫 You have reached the free request limit ({max}).\nPlease contact the manager: {manager_username}",
         "lang_selected": "🇬🇧 Language set: English",
+        "news_subscribed": "🔔 You are subscribed to the daily news digest. Send /subscribe again to unsubscribe.",
+        "news_unsubscribed": "🔕 News digest subscription is off.",
         "searching": "🔍 Searching...",
         "error": "❌ Service error.",
         "rate_limited": "⚠️ Request is temporarily unavailable. Please try again in a minute.",
+        "busy_queued": "⏳ We are busy right now. Your question is queued and the answer will arrive in this chat shortly.",
         "btn_ru": "🇷🇺 Русский",
         "btn_en": "🇬🇧 English"
     }
@@ -620,9 +781,46 @@ def build_source_profile_prompt(lang, compact=False):
     return "\n".join(lines)
 
 
-def build_news_prompt(lang, compact=False):
+def get_prompt_config_version():
+    global prompt_config_version
+    if prompt_config_version is None:
+        # Everything the static prompt prefixes are built from; env-driven, so fixed per process.
+        config = {
+            "profiles": get_news_source_profiles(),
+            "low_priority_domains": sorted(get_low_priority_news_domains()),
+            "target_news_items": TARGET_NEWS_ITEMS,
+            "candidate_news_items": CANDIDATE_NEWS_ITEMS,
+            "chat_system_prompt": CHAT_SYSTEM_PROMPT,
+        }
+        raw = json.dumps(config, ensure_ascii=False, sort_keys=True)
+        prompt_config_version = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+    return prompt_config_version
+
+
+def get_static_prompt(name, lang, builder):
+    # Provider-side prompt caching matches on the exact leading tokens, so the
+    # static part of each prompt is built once and reused byte-for-byte.
+    key = (name, lang, get_prompt_config_version())
+    prompt = static_prompt_cache.get(key)
+    if prompt is None:
+        prompt = builder(lang)
+        static_prompt_cache[key] = prompt
+    return prompt
+
+
+def build_news_period_rule(lang):
     today = datetime.now(timezone.utc).date()
     start_date = today - timedelta(days=NEWS_LOOKBACK_DAYS)
+    if lang == "ru":
+        return f"Период публикации: с {start_date.isoformat()} по {today.isoformat()}."
+    return f"Publication date range: {start_date.isoformat()} to {today.isoformat()}."
+
+
+def build_news_prompt(lang, compact=False):
+    return get_static_prompt("news", lang, build_news_static_prompt) + "\n" + build_news_period_rule(lang)
+
+
+def build_news_static_prompt(lang):
     allowed_domains = get_allowed_news_domains()
     source_profiles = build_source_profile_prompt(lang, compact=True)
 
@@ -634,8 +832,7 @@ def build_news_prompt(lang, compact=False):
             "Используй несколько независимых источников, а не один сайт."
         )
         return (
-            f"Подготовь сводку из {TARGET_NEWS_ITEMS} новостей для релокантов из России. "
-            f"Период публикации: с {start_date.isoformat()} по {today.isoformat()}. "
+            f"Подготовь сводку из {TARGET_NEWS_ITEMS} новостей для релокантов из России за период, указанный в конце. "
             "Темы: визы, ВНЖ/ПМЖ, гражданство, правила въезда, трудовая и учебная миграция, digital nomad, "
             "воссоединение семьи, легализация, консульские ограничения. "
             "Приоритет: страны за пределами РФ. Новости из России включай только если они прямо влияют на тех, "
@@ -662,8 +859,7 @@ def build_news_prompt(lang, compact=False):
         "Use several independent sources instead of one site."
     )
     return (
-        f"Prepare a summary of {TARGET_NEWS_ITEMS} news items for Russian relocators. "
-        f"Publication date range: {start_date.isoformat()} to {today.isoformat()}. "
+        f"Prepare a summary of {TARGET_NEWS_ITEMS} news items for Russian relocators for the period given at the end. "
         "Topics: visas, residence permits, citizenship, entry rules, work and study migration, digital nomads, "
         "family reunion, legalization, and consular restrictions. Prioritize countries outside Russia. "
         "Include Russia-based news only when it directly affects Russians already abroad or preparing relocation. "
@@ -682,9 +878,62 @@ def build_news_prompt(lang, compact=False):
     )
 
 
-def build_news_snapshot_prompt(lang):
-    today = datetime.now(timezone.utc).date()
-    start_date = today - timedelta(days=NEWS_LOOKBACK_DAYS)
+# With structured output the json_schema wraps the list: {"items": [...]}.
+NEWS_DIGEST_SYSTEM_PROMPTS = {
+    "ru": (
+        "Ты собираешь ежедневный миграционный дайджест. "
+        + (
+            'Отвечай только валидным JSON-объектом вида {"items": [...]} без markdown и без пояснений.'
+            if OPENAI_NEWS_STRUCTURED_OUTPUT else
+            "Отвечай только валидным JSON-массивом без markdown и без пояснений."
+        )
+    ),
+    "en": (
+        "You build a daily migration digest. "
+        + (
+            'Respond only with a valid JSON object of the form {"items": [...]}, no markdown, no commentary.'
+            if OPENAI_NEWS_STRUCTURED_OUTPUT else
+            "Respond only with a valid JSON array, no markdown, no commentary."
+        )
+    ),
+}
+NEWS_DIGEST_OUTPUT_RULES = {
+    "ru": (
+        'Верни ТОЛЬКО JSON-объект вида {"items": [...]} без markdown и без пояснений. '
+        "Поля каждого элемента items: "
+        if OPENAI_NEWS_STRUCTURED_OUTPUT else
+        "Верни ТОЛЬКО JSON-массив объектов без markdown и без пояснений. "
+        "Поля каждого объекта: "
+    ),
+    "en": (
+        'Return ONLY a JSON object of the form {"items": [...]}, no markdown and no explanations. '
+        "Fields for each element of items: "
+        if OPENAI_NEWS_STRUCTURED_OUTPUT else
+        "Return ONLY a JSON array of objects, no markdown and no explanations. "
+        "Fields for each object: "
+    ),
+}
+NEWS_SNAPSHOT_BROADEN_RULES = {
+    "ru": (
+        "Собери более широкую и интересную подборку: стремись к 10 пунктам, минимум к 8, "
+        "и сначала ищи разные страны и разные домены. Не останавливайся на первых 2-3 совпадениях."
+    ),
+    "en": (
+        "Build a broader and more interesting selection: aim for 10 items, minimum 8, "
+        "and prioritize different countries and domains before repeating one source."
+    ),
+}
+
+
+def build_news_snapshot_prompt(lang, broaden=False):
+    # Static rules and the source list first, the date range last.
+    prompt = get_static_prompt("news_snapshot", lang, build_news_snapshot_static_prompt)
+    if broaden:
+        prompt += "\n" + NEWS_SNAPSHOT_BROADEN_RULES[lang if lang == "ru" else "en"]
+    return prompt + "\n" + build_news_period_rule(lang)
+
+
+def build_news_snapshot_static_prompt(lang):
     allowed_domains = get_allowed_news_domains()
     low_priority_domains = sorted(get_low_priority_news_domains())
     source_profiles = build_source_profile_prompt(lang, compact=True)
@@ -703,8 +952,8 @@ def build_news_snapshot_prompt(lang):
             ""
         )
         return (
-            f"Найди {CANDIDATE_NEWS_ITEMS - 2}-{CANDIDATE_NEWS_ITEMS} кандидатов для новостного дайджеста релокантов из России за период "
-            f"с {start_date.isoformat()} по {today.isoformat()}. "
+            f"Найди {CANDIDATE_NEWS_ITEMS - 2}-{CANDIDATE_NEWS_ITEMS} кандидатов для новостного дайджеста релокантов из России "
+            "за период, указанный в конце. "
             "Темы: визы, ВНЖ/ПМЖ, гражданство, правила въезда, трудовая и учебная миграция, digital nomad, "
             "воссоединение семьи, легализация, консульские ограничения. "
             "Приоритет: разные страны и разные домены; не больше 2 новостей с одного домена, если есть альтернатива. "
@@ -714,8 +963,8 @@ def build_news_snapshot_prompt(lang):
             "Не включай общие гайды, обзоры услуг, внутренние новости РФ без прямого влияния на релокацию, спорт, криминал, вакансии. "
             + domain_rule
             + "Если точной статьи нет, не придумывай ее. Нужна только оригинальная статья, а не главная страница сайта. "
-            "Верни ТОЛЬКО JSON-массив объектов без markdown и без пояснений. "
-            "Поля каждого объекта: country, title, date, summary, source_domain, source_url. "
+            + NEWS_DIGEST_OUTPUT_RULES["ru"]
+            + "country, title, date, summary, source_domain, source_url. "
             "Все поля country, title, date и summary должны быть на русском; "
             "переводи материалы иностранных источников. "
             "summary: информативное описание в 2-3 предложениях, примерно в 2 раза подробнее короткой заметки. "
@@ -741,8 +990,8 @@ def build_news_snapshot_prompt(lang):
         ""
     )
     return (
-        f"Find {CANDIDATE_NEWS_ITEMS - 2}-{CANDIDATE_NEWS_ITEMS} candidate news items for a Russian relocator digest from "
-        f"{start_date.isoformat()} to {today.isoformat()}. "
+        f"Find {CANDIDATE_NEWS_ITEMS - 2}-{CANDIDATE_NEWS_ITEMS} candidate news items for a Russian relocator digest "
+        "for the period given at the end. "
         "Topics: visas, residence permits, citizenship, entry rules, work and study migration, digital nomads, "
         "family reunion, legalization, consular restrictions. Prioritize different countries and different domains; "
         "avoid more than 2 items from one domain if alternatives exist. "
@@ -752,8 +1001,8 @@ def build_news_snapshot_prompt(lang):
         "Exclude generic guides, service pages, Russia-only domestic news without relocation impact, sports, crime, vacancies. "
         + domain_rule
         + "If there is no exact article, do not invent it. Only original article URLs, not site homepages. "
-        "Return ONLY a JSON array of objects, no markdown and no explanations. "
-        "Fields for each object: country, title, date, summary, source_domain, source_url. "
+        + NEWS_DIGEST_OUTPUT_RULES["en"]
+        + "country, title, date, summary, source_domain, source_url. "
         "All country, title, date, and summary fields must be in English; "
         "translate foreign-language source material. "
         "summary: informative 2-3 sentence description, about twice as detailed as a short brief. "
@@ -769,19 +1018,105 @@ def build_news_snapshot_prompt(lang):
 # ---------------------------------------------
 # Функции работы с пользователями (БД)
 # ---------------------------------------------
+def news_consistency_key(lang):
+    # Digest writes and reads share one read-your-writes key per language.
+    return f"news:{lang}" if lang else None
+
+
+# Hot per-message queries are prepared once per pooled connection.
+GET_USER_STATEMENT = prepared_statement("grs_get_user", "SELECT * FROM users WHERE chat_id = %s")
+INCREMENT_REQUEST_COUNT_STATEMENT = prepared_statement(
+    "grs_increment_request_count",
+    "UPDATE users SET request_count = request_count + 1 WHERE chat_id = %s",
+)
+SAVE_MESSAGE_STATEMENT = prepared_statement(
+    "grs_save_message",
+    "INSERT INTO chat_history (chat_id, role, content) VALUES (%s, %s, %s)",
+)
+LOAD_HISTORY_STATEMENT = prepared_statement(
+    "grs_load_history",
+    """
+    SELECT role, content
+    FROM chat_history
+    WHERE chat_id = %s AND created_at >= NOW() - make_interval(days => %s)
+    ORDER BY created_at DESC
+    LIMIT %s
+    """,
+)
+# Column sets for news_digests reads. raw_response is never part of a projection;
+# it is kept for debugging in SQL only.
+NEWS_DIGEST_PROJECTIONS = {
+    "freshness": (
+        "id, created_at, "
+        "CASE WHEN jsonb_typeof(items_json) = 'array' THEN jsonb_array_length(items_json) ELSE 0 END AS item_count"
+    ),
+    "render": "id, items_json, rendered_html, created_at",
+    "status": "id, items_json, model_used, stage_timings, created_at",
+    "audit": (
+        "id, items_json, rendered_html, model_used, stage_timings, created_at, "
+        "octet_length(raw_response) AS raw_response_bytes"
+    ),
+}
+LATEST_NEWS_DIGEST_STATEMENTS = {
+    projection: prepared_statement(
+        f"grs_latest_news_digest_{projection}",
+        f"""
+        SELECT {columns}
+        FROM news_digests
+        WHERE language_code = %s AND status = 'ready'
+        ORDER BY created_at DESC, id DESC
+        LIMIT 1
+        """,
+    )
+    for projection, columns in NEWS_DIGEST_PROJECTIONS.items()
+}
+NEWS_POOL_COLUMNS = (
+    "id, country, country_code, title, summary, source_domain, source_url, article_date_raw, article_date"
+)
+UPSERT_NEWS_POOL_ITEM_STATEMENT = prepared_statement(
+    "grs_upsert_news_pool_item",
+    """
+    INSERT INTO news_digest_pool (
+        language_code,
+        source_url,
+        source_domain,
+        title,
+        summary,
+        country,
+        country_code,
+        article_date_raw,
+        article_date,
+        is_active
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, FALSE)
+    ON CONFLICT (language_code, source_url)
+    DO UPDATE SET
+        source_domain = EXCLUDED.source_domain,
+        title = EXCLUDED.title,
+        summary = EXCLUDED.summary,
+        country = EXCLUDED.country,
+        country_code = EXCLUDED.country_code,
+        article_date_raw = EXCLUDED.article_date_raw,
+        article_date = EXCLUDED.article_date,
+        updated_at = NOW()
+    RETURNING id, discovered_at, updated_at, is_active
+    """,
+)
+
+@metrics.timed("grs_db_call_seconds")
 def get_user(chat_id):
     try:
-        with get_db_connection() as conn:
+        with get_read_connection(chat_id) as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT * FROM users WHERE chat_id = %s", (chat_id,))
+                execute_statement(cur, GET_USER_STATEMENT, (chat_id,))
                 return cur.fetchone()
     except Exception as e:
         logger.error(f"Error getting user: {e}")
         return None
 
+@metrics.timed("grs_db_call_seconds")
 def create_user(chat_id):
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(chat_id) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     "INSERT INTO users (chat_id, language_code, request_count) VALUES (%s, 'ru', 0) ON CONFLICT (chat_id) DO NOTHING",
@@ -793,45 +1128,75 @@ def create_user(chat_id):
         logger.error(f"Error creating user: {e}")
         return None
 
+@metrics.timed("grs_db_call_seconds")
 def update_user_language(chat_id, lang_code):
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(chat_id) as conn:
             with conn.cursor() as cur:
                 cur.execute("UPDATE users SET language_code = %s WHERE chat_id = %s", (lang_code, chat_id))
                 conn.commit()
     except Exception as e:
         logger.error(f"Error updating language: {e}")
 
+@metrics.timed("grs_db_call_seconds")
+def toggle_news_subscription(chat_id):
+    try:
+        with get_db_connection(chat_id) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE users
+                    SET news_subscribed = NOT news_subscribed, news_subscribed_at = NOW()
+                    WHERE chat_id = %s
+                    RETURNING news_subscribed
+                    """,
+                    (chat_id,),
+                )
+                row = cur.fetchone()
+                conn.commit()
+                return row["news_subscribed"] if row else None
+    except Exception as e:
+        logger.error(f"Error toggling news subscription: {e}")
+        return None
+
+
+@metrics.timed("grs_db_call_seconds")
+def unsubscribe_news_chat(chat_id):
+    try:
+        with get_db_connection(chat_id) as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE users SET news_subscribed = FALSE WHERE chat_id = %s", (chat_id,))
+                conn.commit()
+    except Exception as e:
+        logger.error(f"Error unsubscribing chat from news: {e}")
+
+@metrics.timed("grs_db_call_seconds")
 def increment_request_count(chat_id):
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(chat_id) as conn:
             with conn.cursor() as cur:
-                cur.execute("UPDATE users SET request_count = request_count + 1 WHERE chat_id = %s", (chat_id,))
+                execute_statement(cur, INCREMENT_REQUEST_COUNT_STATEMENT, (chat_id,))
                 conn.commit()
     except Exception as e:
         logger.error(f"Error incrementing count: {e}")
 
 # Функции работы с историей сообщений (сохранены)
+@metrics.timed("grs_db_call_seconds")
 def save_message(chat_id, role, content):
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(chat_id) as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO chat_history (chat_id, role, content) VALUES (%s, %s, %s)",
-                    (chat_id, role, content)
-                )
+                execute_statement(cur, SAVE_MESSAGE_STATEMENT, (chat_id, role, content))
                 conn.commit()
     except Exception as e:
         logger.error(f"Error saving message: {e}")
 
+@metrics.timed("grs_db_call_seconds")
 def load_history(chat_id, limit=20):
     try:
-        with get_db_connection() as conn:
+        with get_read_connection(chat_id) as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT role, content FROM chat_history WHERE chat_id = %s ORDER BY created_at DESC LIMIT %s",
-                    (chat_id, limit)
-                )
+                execute_statement(cur, LOAD_HISTORY_STATEMENT, (chat_id, CHAT_HISTORY_CONTEXT_DAYS, limit))
                 rows = cur.fetchall()
         return list(reversed(rows))
     except Exception as e:
@@ -841,9 +1206,10 @@ def load_history(chat_id, limit=20):
 # ---------------------------------------------
 # Кэш новостей
 # ---------------------------------------------
+@metrics.timed("grs_db_call_seconds")
 def get_cached_news(lang):
     try:
-        with get_db_connection() as conn:
+        with get_read_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -871,9 +1237,10 @@ def get_cached_news(lang):
         logger.error(f"Error getting cached news: {e}")
         return None
 
+@metrics.timed("grs_db_call_seconds")
 def save_cached_news(lang, content):
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     "INSERT INTO news_cache (language_code, content) VALUES (%s, %s)",
@@ -883,9 +1250,10 @@ def save_cached_news(lang, content):
     except Exception as e:
         logger.error(f"Error saving cached news: {e}")
 
+@metrics.timed("grs_db_call_seconds")
 def clear_cached_news(lang=None):
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
                 if lang:
                     cur.execute("DELETE FROM news_cache WHERE language_code = %s", (lang,))
@@ -896,21 +1264,14 @@ def clear_cached_news(lang=None):
         logger.error(f"Error clearing cached news: {e}")
 
 
-def get_latest_news_digest(lang, allow_stale=False):
+@metrics.timed("grs_db_call_seconds")
+def get_latest_news_digest(lang, allow_stale=False, projection="audit"):
     try:
-        with get_db_connection() as conn:
+        with get_read_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, rendered_html, items_json, raw_response, model_used, created_at
-                    FROM news_digests
-                    WHERE language_code = %s AND status = 'ready'
-                    ORDER BY created_at DESC, id DESC
-                    LIMIT 1
-                    """,
-                    (lang,),
-                )
+                execute_statement(cur, LATEST_NEWS_DIGEST_STATEMENTS[projection], (lang,))
                 row = cur.fetchone()
+                record_fetched_bytes(f"latest_news_digest_{projection}", [row] if row else [])
                 if not row:
                     return None
 
@@ -924,17 +1285,25 @@ def get_latest_news_digest(lang, allow_stale=False):
         return None
 
 
-def save_news_digest(lang, items, rendered_html, raw_response, model_used, status="ready"):
-    serializable_items = []
-    for item in items or []:
-        current = dict(item)
-        article_date = current.get("article_date")
-        if isinstance(article_date, (date, datetime)):
-            current["article_date"] = article_date.isoformat()
-        serializable_items.append(current)
+@metrics.timed("grs_db_call_seconds")
+def load_news_digest_rendered_html(digest_id, lang):
+    try:
+        with get_read_connection(news_consistency_key(lang)) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT rendered_html FROM news_digests WHERE id = %s", (digest_id,))
+                row = cur.fetchone()
+                return row["rendered_html"] if row else None
+    except Exception as e:
+        logger.error(f"Error loading news digest html: {e}")
+        return None
+
+
+@metrics.timed("grs_db_call_seconds")
+def save_news_digest(lang, items, rendered_html, raw_response, model_used, status="ready", stage_timings=None):
+    serializable_items = [item.to_json() for item in items or []]
 
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -944,11 +1313,20 @@ def save_news_digest(lang, items, rendered_html, raw_response, model_used, statu
                         items_json,
                         rendered_html,
                         raw_response,
-                        model_used
-                    ) VALUES (%s, %s, %s, %s, %s, %s)
+                        model_used,
+                        stage_timings
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
                     RETURNING id
                     """,
-                    (lang, status, Json(serializable_items), rendered_html, raw_response, model_used),
+                    (
+                        lang,
+                        status,
+                        Json(serializable_items),
+                        rendered_html,
+                        raw_response,
+                        model_used,
+                        Json(stage_timings) if stage_timings else None,
+                    ),
                 )
                 row = cur.fetchone()
                 conn.commit()
@@ -959,9 +1337,24 @@ def save_news_digest(lang, items, rendered_html, raw_response, model_used, statu
         return None
 
 
+@metrics.timed("grs_db_call_seconds")
+def update_news_digest_stage_timings(digest_id, lang, stage_timings):
+    try:
+        with get_db_connection(news_consistency_key(lang)) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE news_digests SET stage_timings = %s WHERE id = %s",
+                    (Json(stage_timings), digest_id),
+                )
+                conn.commit()
+    except Exception as e:
+        logger.error(f"Error updating news digest stage timings: {e}")
+
+
+@metrics.timed("grs_db_call_seconds")
 def clear_news_digest(lang=None):
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
                 if lang:
                     cur.execute("DELETE FROM news_digests WHERE language_code = %s", (lang,))
@@ -982,59 +1375,72 @@ def pending_news_message(lang):
     return "🛠 The news digest is still refreshing. Only the last ready snapshot is available for now."
 
 
-def parse_article_date(raw_value):
-    if not raw_value:
-        return None
+def shift_months(value, months):
+    month_index = value.year * 12 + value.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    days_in_month = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+    return date(year, month, min(value.day, days_in_month))
 
-    value = raw_value.strip()
-    value = re.sub(r"\s+", " ", value)
-    value = re.sub(
-        r"(?:≈|~|около|примерно|about|around)\s*\d+\s*"
-        r"(?:дн(?:я|ей)?|недел(?:я|и|ь)?|месяц(?:а|ев)?|год(?:а|ов)?|лет|"
-        r"day(?:s)?|week(?:s)?|month(?:s)?|year(?:s)?)\s*(?:назад|ago)?",
-        "",
-        value,
-        flags=re.I,
-    ).strip(" -—,.;")
-    if not value:
+
+def resolve_relative_article_date(match, reference_date):
+    word = (match.group("word") or "").lower()
+    if word:
+        return reference_date - timedelta(days=1 if word in {"вчера", "yesterday"} else 0)
+    if match.group("approx"):
         return None
 
-    month_map = {
-        "января": 1, "февраля": 2, "марта": 3, "апреля": 4, "мая": 5, "июня": 6,
-        "июля": 7, "августа": 8, "сентября": 9, "октября": 10, "ноября": 11, "декабря": 12,
-        "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6,
-        "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
-    }
+    count = int(match.group("count") or 1)
+    unit = match.group("unit").lower()
+    if unit.startswith(("дн", "день", "day")):
+        return reference_date - timedelta(days=count)
+    if unit.startswith(("недел", "week")):
+        return reference_date - timedelta(weeks=count)
+    if unit.startswith(("месяц", "month")):
+        return shift_months(reference_date, count)
+    return shift_months(reference_date, count * 12)
 
-    for fmt in ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y"):
-        try:
-            return datetime.strptime(value, fmt).date()
-        except ValueError:
-            pass
 
-    match = re.search(r"(\d{1,2})\s+([A-Za-zА-Яа-яЁё]+)\s+(\d{4})", value)
+@lru_cache(maxsize=ARTICLE_DATE_CACHE_SIZE)
+def parse_article_date_cached(raw_value, reference_date):
+    match = ARTICLE_DATE_PATTERN.search(raw_value)
     if match:
-        day_num = int(match.group(1))
-        month_name = match.group(2).lower()
-        year_num = int(match.group(3))
-        month_num = month_map.get(month_name)
-        if month_num:
-            try:
-                return date(year_num, month_num, day_num)
-            except ValueError:
-                return None
+        groups = match.groupdict()
+        for prefix in ("iso", "num", "dmy", "mdy", "my"):
+            if groups[f"{prefix}_y"]:
+                month = groups[f"{prefix}_m"]
+                month = int(month) if month.isdigit() else ARTICLE_DATE_MONTHS[month.lower()]
+                try:
+                    return date(int(groups[f"{prefix}_y"]), month, int(groups.get(f"{prefix}_d") or 1))
+                except ValueError:
+                    return None
 
+    match = RELATIVE_ARTICLE_DATE_PATTERN.search(raw_value)
+    if match:
+        return resolve_relative_article_date(match, reference_date)
     return None
 
 
+def parse_article_date(raw_value, reference_date=None):
+    """Publication date from a model-written date string; month-only dates map to the 1st.
+
+    Relative forms ("3 дня назад", "yesterday") resolve against reference_date,
+    today (UTC) by default. Results are memoized per (value, reference date).
+    """
+    if not raw_value:
+        return None
+    return parse_article_date_cached(raw_value, reference_date or datetime.now(timezone.utc).date())
+
+
+@metrics.timed("grs_db_call_seconds")
 def get_news_pool_rows(lang, active_only=False):
     try:
-        with get_db_connection() as conn:
+        with get_read_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
                 if active_only:
                     cur.execute(
-                        """
-                        SELECT *
+                        f"""
+                        SELECT {NEWS_POOL_COLUMNS}
                         FROM news_digest_pool
                         WHERE language_code = %s AND is_active = TRUE
                         ORDER BY article_date DESC NULLS LAST, discovered_at DESC
@@ -1043,49 +1449,31 @@ def get_news_pool_rows(lang, active_only=False):
                     )
                 else:
                     cur.execute(
-                        """
-                        SELECT *
+                        f"""
+                        SELECT {NEWS_POOL_COLUMNS}
                         FROM news_digest_pool
                         WHERE language_code = %s
                         ORDER BY article_date DESC NULLS LAST, discovered_at DESC
                         """,
                         (lang,),
                     )
-                return cur.fetchall()
+                rows = cur.fetchall()
+                record_fetched_bytes("news_pool_rows", rows)
+                return rows
     except Exception as e:
         logger.error(f"Error loading news pool rows: {e}")
         return []
 
 
+@metrics.timed("grs_db_call_seconds")
 def upsert_news_pool_item(lang, item):
     article_date = parse_article_date(item.get("date", ""))
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO news_digest_pool (
-                        language_code,
-                        source_url,
-                        source_domain,
-                        title,
-                        summary,
-                        country,
-                        article_date_raw,
-                        article_date,
-                        is_active
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, FALSE)
-                    ON CONFLICT (language_code, source_url)
-                    DO UPDATE SET
-                        source_domain = EXCLUDED.source_domain,
-                        title = EXCLUDED.title,
-                        summary = EXCLUDED.summary,
-                        country = EXCLUDED.country,
-                        article_date_raw = EXCLUDED.article_date_raw,
-                        article_date = EXCLUDED.article_date,
-                        updated_at = NOW()
-                    RETURNING id, discovered_at, updated_at, is_active
-                    """,
+                execute_statement(
+                    cur,
+                    UPSERT_NEWS_POOL_ITEM_STATEMENT,
                     (
                         lang,
                         item["source_url"],
@@ -1093,6 +1481,7 @@ def upsert_news_pool_item(lang, item):
                         item["title"],
                         item["summary"],
                         item.get("country"),
+                        item.get("country_code") or find_country_code(item.get("country")) or None,
                         item.get("date"),
                         article_date,
                     ),
@@ -1105,10 +1494,11 @@ def upsert_news_pool_item(lang, item):
         return None
 
 
+@metrics.timed("grs_db_call_seconds")
 def set_active_news_pool_items(lang, active_urls):
     active_urls = list(active_urls)
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(news_consistency_key(lang)) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     "UPDATE news_digest_pool SET is_active = FALSE, updated_at = NOW() WHERE language_code = %s",
@@ -1127,93 +1517,469 @@ def set_active_news_pool_items(lang, active_urls):
     except Exception as e:
         logger.error(f"Error updating active news pool items: {e}")
 
-# ---------------------------------------------
-# Очистка простого текста (без Markdown)
-# ---------------------------------------------
-def sanitize_plain_text(text, preserve_urls=False):
-    if not text:
-        return text
 
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
-    text = re.sub(r"\*\*(.+?)\*\*", r"\1", text)
-    text = re.sub(r"__([^_]+)__", r"\1", text)
-    text = re.sub(r"`([^`]+)`", r"\1", text)
-    text = re.sub(r"\[(.*?)\]\((.*?)\)", r"\1 — \2", text)
-    if not preserve_urls:
-        text = re.sub(r"https?://\S+", "", text)
-    text = re.sub(r"^\s*[-*]\s+", "- ", text, flags=re.M)
-    text = re.sub(r"\b([a-z0-9.-]+\.[a-z]{2,})\.\s+\(\1\b", r"\1 (", text, flags=re.I)
-    text = re.sub(r"[ \t]{2,}", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
+@metrics.timed("grs_db_call_seconds")
+def get_recent_news_candidates(max_age_sec, limit, exclude_language=None):
+    try:
+        with get_read_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT id, country, title, summary, source_domain, source_url, article_date_raw, article_date,
+                        content_language, model_used
+                    FROM news_candidates
+                    WHERE updated_at >= NOW() - make_interval(secs => %s)
+                      AND (%s IS NULL OR content_language <> %s)
+                    ORDER BY updated_at DESC, id DESC
+                    LIMIT %s
+                    """,
+                    (max_age_sec, exclude_language, exclude_language, limit),
+                )
+                rows = cur.fetchall()
+                record_fetched_bytes("news_candidates", rows)
+                return rows
+    except Exception as e:
+        logger.error(f"Error loading shared news candidates: {e}")
+        return []
 
 
-def normalize_news_response_text(text):
-    if not text:
-        return ""
+@metrics.timed("grs_db_call_seconds")
+def upsert_news_candidates(items, content_language, model_used):
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                for item in items:
+                    cur.execute(
+                        """
+                        INSERT INTO news_candidates (
+                            source_url, source_domain, title, summary, country,
+                            article_date_raw, article_date, content_language, model_used
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (source_url)
+                        DO UPDATE SET
+                            source_domain = EXCLUDED.source_domain,
+                            title = EXCLUDED.title,
+                            summary = EXCLUDED.summary,
+                            country = EXCLUDED.country,
+                            article_date_raw = EXCLUDED.article_date_raw,
+                            article_date = EXCLUDED.article_date,
+                            content_language = EXCLUDED.content_language,
+                            model_used = EXCLUDED.model_used,
+                            updated_at = NOW()
+                        """,
+                        (
+                            item["source_url"],
+                            item["source_domain"],
+                            item["title"],
+                            item["summary"],
+                            item.get("country"),
+                            item.get("date"),
+                            parse_article_date(item.get("date", "")),
+                            content_language,
+                            model_used,
+                        ),
+                    )
+                # Rows past the TTL are never read again.
+                cur.execute(
+                    "DELETE FROM news_candidates WHERE updated_at < NOW() - make_interval(secs => %s)",
+                    (NEWS_SHARED_DISCOVERY_TTL_SEC,),
+                )
+                conn.commit()
+    except Exception as e:
+        logger.error(f"Error saving shared news candidates: {e}")
 
-    text = sanitize_plain_text(text, preserve_urls=True)
-    text = re.sub(r"\b(Источник|Оригинал статьи|Source|Original article):\s+", r"\1: ", text, flags=re.I)
-    text = re.sub(
-        r"—\s*(\d{1,2}\s+[A-Za-zА-Яа-яЁё]+)\s*\n+\s*(20\d{2})\b",
-        r"— \1 \2",
-        text,
-        flags=re.I,
-    )
-    text = re.sub(r"\(([a-z0-9.-]+\.[a-z]{2,})", r"\1", text, flags=re.I)
-    first_item = re.search(r"^\s*\d+[\).]\s+", text, flags=re.M)
-    if first_item:
-        text = text[first_item.start():]
-    return text.strip()
 
+NEWS_BROADCAST_COLUMNS = """
+    id, digest_id, language_code, status, last_chat_id, chunk_count, sent_count, blocked_count, failed_count
+"""
 
-def split_numbered_news_blocks(text):
-    normalized = normalize_news_response_text(text)
-    if not normalized:
-        return []
-    return [
-        match.group(0).strip()
-        for match in re.finditer(r"(?ms)^\s*\d+[\).]\s+.*?(?=^\s*\d+[\).]\s+|\Z)", normalized)
-    ]
 
+@metrics.timed("grs_db_call_seconds")
+def create_news_broadcast(digest_id, lang, worker_id):
+    """Returns the new broadcast row, or None if this digest was already broadcast."""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    INSERT INTO news_broadcasts (digest_id, language_code, locked_by)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (digest_id) DO NOTHING
+                    RETURNING {NEWS_BROADCAST_COLUMNS}
+                    """,
+                    (digest_id, lang, worker_id),
+                )
+                row = cur.fetchone()
+                conn.commit()
+                return row
+    except Exception as e:
+        logger.error(f"Error creating news broadcast: {e}")
+        return None
 
-def parse_news_items(text):
-    if not text:
-        return []
 
-    blocks = split_numbered_news_blocks(text)
-    if not blocks:
+@metrics.timed("grs_db_call_seconds")
+def claim_stale_news_broadcasts(worker_id):
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    UPDATE news_broadcasts
+                    SET locked_by = %s, heartbeat_at = NOW()
+                    WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => %s)
+                    RETURNING {NEWS_BROADCAST_COLUMNS}
+                    """,
+                    (worker_id, NEWS_JOB_STALE_SEC),
+                )
+                rows = cur.fetchall()
+                conn.commit()
+                return rows
+    except Exception as e:
+        logger.error(f"Error claiming stale news broadcasts: {e}")
         return []
 
-    items = []
-    for block in blocks:
-        normalized_block = re.sub(r"\s*\n+\s*", " ", block).strip()
-        if normalized_block:
-            items.append(normalized_block)
-    return items
-
-
-def normalize_news_item_key(item_text):
-    text = re.sub(r"^\d+[\).]\s*", "", item_text.strip().lower())
-    title = re.split(r"\s+почему важно:|\s+источник:", text, maxsplit=1)[0]
-    title = re.sub(r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b", " ", title)
-    title = re.sub(r"\b\d{4}\b", " ", title)
-    title = re.sub(r"[^a-zа-я0-9]+", " ", title, flags=re.I)
-    title = re.sub(r"\s+", " ", title).strip()
-    words = title.split()
-    return " ".join(words[:12])
 
+@metrics.timed("grs_db_call_seconds")
+def load_news_broadcast_batch(lang, after_chat_id, limit):
+    """Next page of subscriber ids after the checkpoint (keyset on users_news_subscribers_idx).
+
+    Each page uses its own short checkout, so no transaction stays open while
+    messages are sent. Errors propagate: a failed page must fail the broadcast,
+    not end it early as if every subscriber had been reached.
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT chat_id
+                FROM users
+                WHERE news_subscribed AND language_code = %s AND (%s IS NULL OR chat_id > %s)
+                ORDER BY chat_id
+                LIMIT %s
+                """,
+                (lang, after_chat_id, after_chat_id, limit),
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            return [row["chat_id"] for row in rows]
 
-def normalize_digest_source_url_key(source_url):
-    if not source_url:
-        return ""
 
+@metrics.timed("grs_db_call_seconds")
+def checkpoint_news_broadcast(broadcast, worker_id, status="running", error=None):
     try:
-        parsed = urlparse(source_url)
-    except Exception:
-        return source_url.strip().lower()
-
-    host = normalize_host(source_url)
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE news_broadcasts
+                    SET status = %s,
+                        heartbeat_at = NOW(),
+                        last_chat_id = %s,
+                        chunk_count = %s,
+                        sent_count = %s,
+                        blocked_count = %s,
+                        failed_count = %s,
+                        last_error = COALESCE(%s, last_error),
+                        finished_at = CASE WHEN %s = 'running' THEN NULL ELSE NOW() END
+                    WHERE id = %s AND locked_by = %s AND status = 'running'
+                    """,
+                    (
+                        status,
+                        broadcast["last_chat_id"],
+                        broadcast["chunk_count"],
+                        broadcast["sent_count"],
+                        broadcast["blocked_count"],
+                        broadcast["failed_count"],
+                        error,
+                        status,
+                        broadcast["id"],
+                        worker_id,
+                    ),
+                )
+                conn.commit()
+                return cur.rowcount == 1
+    except Exception as e:
+        logger.error(f"Error checkpointing news broadcast: {e}")
+        return False
+
+
+NEWS_JOB_COLUMNS = """
+    id, language_code, force, status, attempts, max_attempts, run_after, locked_by,
+    heartbeat_at, progress, result, last_error, created_at, started_at, finished_at
+"""
+
+
+@metrics.timed("grs_db_call_seconds")
+def enqueue_news_digest_job(lang, force=False, delay_sec=0):
+    """Returns the pending job for lang, creating it if there is none."""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    INSERT INTO news_digest_jobs (language_code, force, max_attempts, run_after)
+                    VALUES (%s, %s, %s, NOW() + make_interval(secs => %s))
+                    ON CONFLICT (language_code) WHERE status IN ('queued','running')
+                    DO UPDATE SET force = news_digest_jobs.force OR EXCLUDED.force, updated_at = NOW()
+                    RETURNING {NEWS_JOB_COLUMNS}, (xmax = 0) AS created
+                    """,
+                    (lang, force, NEWS_JOB_MAX_ATTEMPTS, delay_sec),
+                )
+                row = cur.fetchone()
+                conn.commit()
+                return row
+    except Exception as e:
+        logger.error(f"Error enqueueing news digest job: {e}")
+        return None
+
+
+@metrics.timed("grs_db_call_seconds")
+def get_recent_news_digest_outcomes(lang, limit=8):
+    """Most recent finished jobs for lang, newest first: job status, refresh outcome and age."""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT status, result->>'status' AS outcome,
+                           EXTRACT(EPOCH FROM NOW() - finished_at) AS age_sec
+                    FROM news_digest_jobs
+                    WHERE language_code = %s AND finished_at IS NOT NULL
+                    ORDER BY finished_at DESC
+                    LIMIT %s
+                    """,
+                    (lang, limit),
+                )
+                return cur.fetchall()
+    except Exception as e:
+        logger.error(f"Error loading news digest job outcomes: {e}")
+        return []
+
+
+def get_news_refresh_backoff_sec(outcomes):
+    """Doubles the wait after each consecutive refresh that did not produce a ready digest."""
+    misses = 0
+    for row in outcomes:
+        if row["outcome"] == "ready":
+            break
+        misses += 1
+    if not misses:
+        return 0
+    return min(NEWS_CACHE_TTL_SEC, NEWS_SCHEDULER_INTERVAL_SEC * 2 ** misses)
+
+
+@metrics.timed("grs_db_call_seconds")
+def get_news_digest_job(job_id):
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT {NEWS_JOB_COLUMNS} FROM news_digest_jobs WHERE id = %s", (job_id,))
+                return cur.fetchone()
+    except Exception as e:
+        logger.error(f"Error loading news digest job: {e}")
+        return None
+
+
+@metrics.timed("grs_db_call_seconds")
+def claim_news_digest_job(worker_id):
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                # Jobs whose worker stopped heartbeating go back to the queue, or fail
+                # once they have used up their attempts.
+                cur.execute(
+                    """
+                    UPDATE news_digest_jobs
+                    SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                        finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+                        last_error = 'heartbeat lost (worker ' || COALESCE(locked_by, '?') || ')',
+                        locked_by = NULL,
+                        updated_at = NOW()
+                    WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => %s)
+                    RETURNING id, status
+                    """,
+                    (NEWS_JOB_STALE_SEC,),
+                )
+                for row in cur.fetchall():
+                    logger.warning("Reclaimed news digest job id=%s status=%s", row["id"], row["status"])
+                    metrics.inc("grs_news_jobs_total", status="reclaimed")
+
+                cur.execute(
+                    f"""
+                    UPDATE news_digest_jobs
+                    SET status = 'running',
+                        attempts = attempts + 1,
+                        locked_by = %s,
+                        heartbeat_at = NOW(),
+                        started_at = COALESCE(started_at, NOW()),
+                        updated_at = NOW()
+                    WHERE id = (
+                        SELECT id
+                        FROM news_digest_jobs
+                        WHERE status = 'queued' AND run_after <= NOW()
+                        ORDER BY run_after, id
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING {NEWS_JOB_COLUMNS}
+                    """,
+                    (worker_id,),
+                )
+                row = cur.fetchone()
+                conn.commit()
+                return row
+    except Exception as e:
+        logger.error(f"Error claiming news digest job: {e}")
+        return None
+
+
+@metrics.timed("grs_db_call_seconds")
+def heartbeat_news_digest_job(job_id, worker_id, progress):
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE news_digest_jobs
+                    SET heartbeat_at = NOW(), progress = %s, updated_at = NOW()
+                    WHERE id = %s AND locked_by = %s AND status = 'running'
+                    """,
+                    (Json(progress), job_id, worker_id),
+                )
+                conn.commit()
+                return cur.rowcount == 1
+    except Exception as e:
+        logger.error(f"Error updating news digest job heartbeat: {e}")
+        # Keep working: a missed heartbeat only matters once it is NEWS_JOB_STALE_SEC old.
+        return True
+
+
+@metrics.timed("grs_db_call_seconds")
+def finish_news_digest_job(job_id, worker_id, progress, result=None, error=None):
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE news_digest_jobs
+                    SET status = CASE
+                            WHEN %(error)s IS NULL THEN 'succeeded'
+                            WHEN attempts >= max_attempts THEN 'failed'
+                            ELSE 'queued'
+                        END,
+                        run_after = NOW() + make_interval(secs => %(retry_delay)s * power(2, attempts - 1)),
+                        finished_at = CASE WHEN %(error)s IS NULL OR attempts >= max_attempts THEN NOW() END,
+                        locked_by = NULL,
+                        progress = %(progress)s,
+                        result = %(result)s,
+                        last_error = COALESCE(%(error)s, last_error),
+                        updated_at = NOW()
+                    WHERE id = %(job_id)s AND locked_by = %(worker_id)s AND status = 'running'
+                    RETURNING status
+                    """,
+                    {
+                        "error": error,
+                        "retry_delay": NEWS_JOB_RETRY_DELAY_SEC,
+                        "progress": Json(progress),
+                        "result": Json(result) if result is not None else None,
+                        "job_id": job_id,
+                        "worker_id": worker_id,
+                    },
+                )
+                row = cur.fetchone()
+                conn.commit()
+                return row["status"] if row else None
+    except Exception as e:
+        logger.error(f"Error finishing news digest job: {e}")
+        return None
+
+# ---------------------------------------------
+# Очистка простого текста (без Markdown)
+# ---------------------------------------------
+def sanitize_plain_text(text, preserve_urls=False):
+    if not text:
+        return text
+
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"\*\*(.+?)\*\*", r"\1", text)
+    text = re.sub(r"__([^_]+)__", r"\1", text)
+    text = re.sub(r"`([^`]+)`", r"\1", text)
+    text = re.sub(r"\[(.*?)\]\((.*?)\)", r"\1 — \2", text)
+    if not preserve_urls:
+        text = re.sub(r"https?://\S+", "", text)
+    text = re.sub(r"^\s*[-*]\s+", "- ", text, flags=re.M)
+    text = re.sub(r"\b([a-z0-9.-]+\.[a-z]{2,})\.\s+\(\1\b", r"\1 (", text, flags=re.I)
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def normalize_news_response_text(text):
+    if not text:
+        return ""
+
+    text = sanitize_plain_text(text, preserve_urls=True)
+    text = re.sub(r"\b(Источник|Оригинал статьи|Source|Original article):\s+", r"\1: ", text, flags=re.I)
+    text = re.sub(
+        r"—\s*(\d{1,2}\s+[A-Za-zА-Яа-яЁё]+)\s*\n+\s*(20\d{2})\b",
+        r"— \1 \2",
+        text,
+        flags=re.I,
+    )
+    text = re.sub(r"\(([a-z0-9.-]+\.[a-z]{2,})", r"\1", text, flags=re.I)
+    first_item = re.search(r"^\s*\d+[\).]\s+", text, flags=re.M)
+    if first_item:
+        text = text[first_item.start():]
+    return text.strip()
+
+
+def split_numbered_news_blocks(text):
+    normalized = normalize_news_response_text(text)
+    if not normalized:
+        return []
+    return [
+        match.group(0).strip()
+        for match in re.finditer(r"(?ms)^\s*\d+[\).]\s+.*?(?=^\s*\d+[\).]\s+|\Z)", normalized)
+    ]
+
+
+def parse_news_items(text):
+    if not text:
+        return []
+
+    blocks = split_numbered_news_blocks(text)
+    if not blocks:
+        return []
+
+    items = []
+    for block in blocks:
+        normalized_block = re.sub(r"\s*\n+\s*", " ", block).strip()
+        if normalized_block:
+            items.append(normalized_block)
+    return items
+
+
+def normalize_news_item_key(item_text):
+    text = re.sub(r"^\d+[\).]\s*", "", item_text.strip().lower())
+    title = re.split(r"\s+почему важно:|\s+источник:", text, maxsplit=1)[0]
+    title = re.sub(r"\b\d{1,2}[./-]\d{1,2}[./-]\d{2,4}\b", " ", title)
+    title = re.sub(r"\b\d{4}\b", " ", title)
+    title = re.sub(r"[^a-zа-я0-9]+", " ", title, flags=re.I)
+    title = re.sub(r"\s+", " ", title).strip()
+    words = title.split()
+    return " ".join(words[:12])
+
+
+def normalize_digest_source_url_key(source_url):
+    if not source_url:
+        return ""
+
+    try:
+        parsed = urlparse(source_url)
+    except Exception:
+        return source_url.strip().lower()
+
+    host = normalize_host(source_url)
     path = re.sub(r"/+$", "", parsed.path or "/").lower()
     return f"{host}{path}"
 
@@ -1281,8 +2047,8 @@ def get_digest_article_date_key(item):
 
 
 def are_near_duplicate_digest_items(item, existing_item):
-    item_tokens = get_digest_dedupe_tokens(item)
-    existing_tokens = get_digest_dedupe_tokens(existing_item)
+    item_tokens = item.dedupe_tokens
+    existing_tokens = existing_item.dedupe_tokens
     if not item_tokens or not existing_tokens:
         return False
 
@@ -1293,10 +2059,10 @@ def are_near_duplicate_digest_items(item, existing_item):
     union_count = len(item_tokens | existing_tokens)
     similarity = shared_count / union_count if union_count else 0
     containment = shared_count / min(len(item_tokens), len(existing_tokens))
-    item_domain = comparable_domain(item.get("source_domain"))
-    existing_domain = comparable_domain(existing_item.get("source_domain"))
-    item_date = get_digest_article_date_key(item)
-    existing_date = get_digest_article_date_key(existing_item)
+    item_domain = item.domain_key
+    existing_domain = existing_item.domain_key
+    item_date = item.date_key
+    existing_date = existing_item.date_key
     same_domain = bool(item_domain and item_domain == existing_domain)
     same_date = bool(item_date and item_date == existing_date)
 
@@ -1327,19 +2093,16 @@ def extract_news_item_country(item_text):
         if 2 <= len(country_candidate) <= 40:
             return country_candidate.lower()
 
-    known_countries = [
-        "сша", "польша", "румыния", "финляндия", "грузия", "япония", "канада",
-        "черногория", "китай", "германия", "испания", "черногория", "швеция",
-        "норвегия", "латвия", "литва", "эстония", "чехия", "дания", "франция",
-        "исландия", "греция", "кипр", "сербия", "португалия", "италия",
-        "венгрия", "хорватия", "черногория", "нидерланды", "бельгия",
-        "евросоюз", "ес", "шенген", "румыния/шенген", "россия—китай"
-    ]
-    lower = title_part.lower()
-    for country in known_countries:
-        if lower.startswith(country):
-            return country
-    return ""
+    code = find_country_code(title_part, prefix_only=True)
+    if not code:
+        return ""
+    return get_country_name(code, "ru" if re.match(r"\W*[А-Яа-яЁё]", title_part) else "en").lower()
+
+
+def get_news_item_country_key(item_text):
+    """ISO code when the gazetteer knows the country, else the extracted text."""
+    country = extract_news_item_country(item_text)
+    return find_country_code(country) or country
 
 
 def get_news_item_domains(text):
@@ -1357,7 +2120,7 @@ def dedupe_news_items(items):
         if not key or key in seen:
             continue
         domain = extract_news_item_domain(item)
-        country = extract_news_item_country(item)
+        country = get_news_item_country_key(item)
         if country and country_counts.get(country, 0) >= 1 and len(deduped) < 6:
             continue
         if domain and domain_counts.get(domain, 0) >= 2 and len(deduped) >= 4:
@@ -1379,7 +2142,7 @@ def dedupe_news_items(items):
             if not key or key in seen:
                 continue
             domain = extract_news_item_domain(item)
-            country = extract_news_item_country(item)
+            country = get_news_item_country_key(item)
             if country and country_counts.get(country, 0) >= 2 and len(deduped) >= 4:
                 continue
             if domain and domain_counts.get(domain, 0) >= 2 and len(deduped) >= 4:
@@ -1464,17 +2227,7 @@ def is_invalid_cached_news(text):
     if not text:
         return True
 
-    error_markers = [
-        TEXTS["ru"]["error"],
-        TEXTS["ru"]["rate_limited"],
-        TEXTS["en"]["error"],
-        TEXTS["en"]["rate_limited"],
-        "service error",
-        "rate limited",
-        "rate limit",
-    ]
-    lower = text.lower()
-    return any(marker.lower() in lower for marker in error_markers)
+    return KEYWORDS.contains("cached_news_error", text.lower())
 
 
 def build_web_search_tool(news_mode=False, include_filters=True):
@@ -1486,25 +2239,36 @@ def build_web_search_tool(news_mode=False, include_filters=True):
     return tool
 
 
-def should_use_chat_web_search(messages):
+CHAT_SEARCH_TEMPORAL_MARKERS = [
+    "сегодня", "сейчас", "актуал", "последн", "новост", "свеж",
+    "today", "current", "latest", "recent", "news", "updated",
+]
+CHAT_SEARCH_MIGRATION_MARKERS = [
+    "виза", "визы", "внж", "пмж", "гражданств", "релокац", "эмиграц",
+    "иммиграц", "миграц", "убежищ", "цифров", "digital nomad", "nomad",
+    "residence permit", "permanent residence", "citizenship", "visa",
+    "asylum", "relocation", "migration",
+]
+
+
+def should_use_chat_web_search(messages, strict=False):
     if not messages:
         return False
 
     last_content = str(messages[-1].get("content", "")).lower()
-    temporal_markers = [
-        "сегодня", "сейчас", "актуал", "последн", "новост", "свеж",
-        "today", "current", "latest", "recent", "news", "updated",
-    ]
-    migration_markers = [
-        "виза", "визы", "внж", "пмж", "гражданств", "релокац", "эмиграц",
-        "иммиграц", "миграц", "убежищ", "цифров", "digital nomad", "nomad",
-        "residence permit", "permanent residence", "citizenship", "visa",
-        "asylum", "relocation", "migration",
-    ]
-    return any(marker in last_content for marker in temporal_markers + migration_markers)
+    if KEYWORDS.contains("chat_search_temporal", last_content):
+        return True
+    # A migration topic alone is borderline: the model usually knows the rules,
+    # so under load (strict) these are answered without web_search.
+    if strict:
+        return False
+    return KEYWORDS.contains("chat_search_migration", last_content)
+
 
+def get_response_models(news_mode=False, plan=None):
+    if plan and plan.get("model"):
+        return [plan["model"]]
 
-def get_response_models(news_mode=False):
     candidates = []
     preferred = [OPENAI_MODEL]
     if news_mode:
@@ -1516,10 +2280,13 @@ def get_response_models(news_mode=False):
     return candidates
 
 
-def get_tool_variants(news_mode=False, messages=None):
+def get_tool_variants(news_mode=False, messages=None, plan=None):
     if not news_mode:
-        if should_use_chat_web_search(messages):
+        strict = bool(plan and plan.get("strict_search"))
+        if should_use_chat_web_search(messages, strict=strict):
             return [("default", build_web_search_tool(news_mode=False))]
+        if strict:
+            return [("no_search", None)]
         return [("no_search", None), ("default", build_web_search_tool(news_mode=False))]
 
     if OPENAI_ENABLE_NEWS_FILTERS:
@@ -1531,56 +2298,87 @@ def get_tool_variants(news_mode=False, messages=None):
     return [("unfiltered", build_web_search_tool(news_mode=True, include_filters=False))]
 
 
-def create_response(messages, lang="ru", news_mode=False):
-    last_error = None
+def call_openai_responses(variant, **request_payload):
+    model = request_payload.get("model", "")
+    try:
+        with metrics.timer("grs_openai_request_seconds", model=model, variant=variant):
+            response = get_openai_client().responses.create(**request_payload)
+    except Exception as exc:
+        metrics.inc("grs_openai_errors_total", model=model, variant=variant, exc_type=exc.__class__.__name__)
+        raise
+
+    record_openai_usage(response, model)
+    return response
 
-    for variant_name, web_search_tool in get_tool_variants(news_mode=news_mode, messages=messages):
+
+def iter_response_requests(messages, news_mode=False, text_format=None, plan=None):
+    for variant_name, web_search_tool in get_tool_variants(news_mode=news_mode, messages=messages, plan=plan):
         allowed_domains = []
         if web_search_tool:
             allowed_domains = web_search_tool.get("filters", {}).get("allowed_domains", [])
 
-        for model in get_response_models(news_mode=news_mode):
-            try:
-                request_payload = {
-                    "model": model,
-                    "input": messages,
-                }
-                if web_search_tool:
-                    request_payload["tools"] = [web_search_tool]
-                msg = (
-                    "OpenAI request start "
-                    f"model={model} news_mode={news_mode} variant={variant_name} "
-                    f"messages={len(messages)} domains={len(allowed_domains)} "
-                    f"last_user_chars={len(str(messages[-1].get('content', ''))) if messages else 0}"
-                )
-                logger.info(msg)
-                print(msg, flush=True)
-                response = client.responses.create(**request_payload)
-                return response, model
-            except Exception as exc:
-                last_error = exc
-                err_msg = (
-                    "OpenAI request failed "
-                    f"model={model} news_mode={news_mode} variant={variant_name} "
-                    f"exc_type={exc.__class__.__name__} domains={len(allowed_domains)} err={exc}"
-                )
-                logger.exception(err_msg)
-                print(err_msg, flush=True)
+        for model in get_response_models(news_mode=news_mode, plan=plan):
+            request_payload = {
+                "model": model,
+                "input": messages,
+            }
+            if web_search_tool:
+                request_payload["tools"] = [web_search_tool]
+            if text_format:
+                request_payload["text"] = text_format
+            yield variant_name, request_payload, len(allowed_domains)
+
+
+def log_response_request_start(variant_name, request_payload, news_mode, domain_count):
+    messages = request_payload["input"]
+    msg = (
+        "OpenAI request start "
+        f"model={request_payload['model']} news_mode={news_mode} variant={variant_name} "
+        f"messages={len(messages)} domains={domain_count} "
+        f"last_user_chars={len(str(messages[-1].get('content', ''))) if messages else 0}"
+    )
+    logger.info(msg)
+    print(msg, flush=True)
 
-    raise last_error
 
+def log_response_request_failure(variant_name, request_payload, news_mode, domain_count, exc):
+    err_msg = (
+        "OpenAI request failed "
+        f"model={request_payload['model']} news_mode={news_mode} variant={variant_name} "
+        f"exc_type={exc.__class__.__name__} domains={domain_count} err={exc}"
+    )
+    logger.exception(err_msg)
+    print(err_msg, flush=True)
+
+
+def record_openai_usage(response, model):
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        cached_tokens = getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", 0) or 0
+        output_tokens = getattr(usage, "output_tokens", 0) or 0
+        metrics.inc("grs_openai_tokens_total", input_tokens, model=model, kind="input")
+        metrics.inc("grs_openai_tokens_total", cached_tokens, model=model, kind="cached_input")
+        metrics.inc("grs_openai_tokens_total", output_tokens, model=model, kind="output")
+        logger.info(
+            "OpenAI usage model=%s input_tokens=%s cached_tokens=%s output_tokens=%s prompt_config=%s",
+            model, input_tokens, cached_tokens, output_tokens, get_prompt_config_version(),
+        )
 
-def response_to_dict(response):
-    if response is None:
-        return {}
-    if hasattr(response, "model_dump"):
+
+def create_response(messages, lang="ru", news_mode=False, text_format=None, plan=None):
+    last_error = None
+
+    for variant_name, request_payload, domain_count in iter_response_requests(messages, news_mode, text_format, plan):
         try:
-            return response.model_dump()
-        except Exception:
-            pass
-    if isinstance(response, dict):
-        return response
-    return {}
+            log_response_request_start(variant_name, request_payload, news_mode, domain_count)
+            response = call_openai_responses(variant_name, **request_payload)
+            return response, request_payload["model"]
+        except Exception as exc:
+            last_error = exc
+            log_response_request_failure(variant_name, request_payload, news_mode, domain_count, exc)
+
+    raise last_error
 
 
 def normalize_host(value):
@@ -1606,88 +2404,93 @@ def comparable_domain(value):
     return host
 
 
-def collect_response_citations(response):
-    payload = response_to_dict(response)
+NUMBERED_NEWS_BLOCK_PATTERN = re.compile(r"(?ms)^\s*\d+[\).]\s+.*?(?=^\s*\d+[\).]\s+|\Z)")
+
+
+def get_response_field(node, name, default=None):
+    if isinstance(node, dict):
+        return node.get(name, default)
+    return getattr(node, name, default)
+
+
+def get_response_citation_index(response):
+    """Walk output[*].content[*].annotations once and cache the result on the response."""
+    if response is None:
+        return {"text_parts": [], "annotations": [], "citations": [], "item_urls": None}
+
+    cached = getattr(response, "_grs_citation_index", None)
+    if cached is not None:
+        return cached
+
+    text_parts = []
+    annotations = []
     citations = []
     seen = set()
+    offset = 0
 
-    def visit(node):
-        if isinstance(node, dict):
-            url = node.get("url")
-            if isinstance(url, str) and url.startswith(("http://", "https://")):
-                domain = normalize_host(url)
-                if domain and domain != "api.openai.com":
-                    key = (url, domain)
-                    if key not in seen:
-                        seen.add(key)
-                        citations.append({"url": url, "domain": domain})
-            for value in node.values():
-                visit(value)
-        elif isinstance(node, list):
-            for item in node:
-                visit(item)
-
-    visit(payload)
-    return citations
-
-
-def collect_output_text_annotations(response):
-    payload = response_to_dict(response)
-    output = payload.get("output", [])
-    collected = []
-
-    for item in output:
-        if item.get("type") != "message":
+    for output_item in get_response_field(response, "output", None) or []:
+        if get_response_field(output_item, "type") != "message":
             continue
-        for content in item.get("content", []):
-            if content.get("type") != "output_text":
+        for content in get_response_field(output_item, "content", None) or []:
+            if get_response_field(content, "type") != "output_text":
                 continue
-            text = content.get("text") or ""
-            annotations = content.get("annotations") or []
-            collected.append({"text": text, "annotations": annotations})
+            text = get_response_field(content, "text") or ""
+            part_annotations = get_response_field(content, "annotations", None) or []
+            text_parts.append({"text": text, "annotations": part_annotations})
+
+            for ann in part_annotations:
+                url = get_response_field(ann, "url")
+                if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+                    continue
+                domain = normalize_host(url)
+                start = get_response_field(ann, "start_index")
+                end = get_response_field(ann, "end_index")
+                annotations.append({
+                    "url": url,
+                    "start": start + offset if isinstance(start, int) else None,
+                    "end": end + offset if isinstance(end, int) else None,
+                    "domain": domain,
+                })
+                if domain and domain != "api.openai.com" and (url, domain) not in seen:
+                    seen.add((url, domain))
+                    citations.append({"url": url, "domain": domain})
+            offset += len(text)
+
+    index = {"text_parts": text_parts, "annotations": annotations, "citations": citations, "item_urls": None}
+    try:
+        setattr(response, "_grs_citation_index", index)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return index
+
 
-    return collected
+def collect_response_citations(response):
+    return get_response_citation_index(response)["citations"]
 
 
 def map_item_urls_from_annotations(response):
-    text_parts = collect_output_text_annotations(response)
-    if not text_parts:
+    index = get_response_citation_index(response)
+    if index["item_urls"] is not None:
+        return index["item_urls"]
+    if not index["text_parts"]:
         return []
 
-    full_text = ""
-    annotations = []
-    offset = 0
+    full_text = "".join(part["text"] for part in index["text_parts"])
+    positioned = sorted(
+        (ann for ann in index["annotations"] if isinstance(ann["start"], int)),
+        key=lambda ann: ann["start"],
+    )
+    starts = [ann["start"] for ann in positioned]
 
-    for part in text_parts:
-        part_text = part["text"]
-        full_text += part_text
-        for ann in part["annotations"]:
-            url = ann.get("url")
-            if not isinstance(url, str) or not url.startswith(("http://", "https://")):
-                continue
-            start = ann.get("start_index")
-            end = ann.get("end_index")
-            if isinstance(start, int):
-                start += offset
-            if isinstance(end, int):
-                end += offset
-            annotations.append({"url": url, "start": start, "end": end, "domain": normalize_host(url)})
-        offset += len(part_text)
-
-    blocks = [
-        (match.start(), match.end(), match.group(0).strip())
-        for match in re.finditer(r"(?ms)^\s*\d+[\).]\s+.*?(?=^\s*\d+[\).]\s+|\Z)", full_text)
-    ]
     item_urls = []
-    for start, end, _block in blocks:
+    for match in NUMBERED_NEWS_BLOCK_PATTERN.finditer(full_text):
+        position = bisect_left(starts, match.start())
         chosen = None
-        for ann in annotations:
-            ann_start = ann.get("start")
-            if isinstance(ann_start, int) and start <= ann_start < end:
-                chosen = ann
-                break
+        if position < len(starts) and starts[position] < match.end():
+            chosen = positioned[position]
         item_urls.append(chosen)
 
+    index["item_urls"] = item_urls
     return item_urls
 
 
@@ -1767,25 +2570,113 @@ def extract_response_text(response, news_mode=False):
     return text
 
 
-def extract_json_array_from_text(text):
-    if not text:
-        return []
+DIGEST_ITEM_FIELDS = ["country", "title", "date", "summary", "source_domain", "source_url"]
 
-    candidate = text.strip()
-    fenced = re.search(r"```(?:json)?\s*(\[.*\])\s*```", candidate, flags=re.S | re.I)
-    if fenced:
-        candidate = fenced.group(1).strip()
-    else:
-        start = candidate.find("[")
-        end = candidate.rfind("]")
-        if start != -1 and end != -1 and end > start:
-            candidate = candidate[start:end + 1]
+DIGEST_ITEMS_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {field: {"type": "string"} for field in DIGEST_ITEM_FIELDS},
+                "required": DIGEST_ITEM_FIELDS,
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["items"],
+    "additionalProperties": False,
+}
+
+
+def build_digest_text_format():
+    if not OPENAI_NEWS_STRUCTURED_OUTPUT:
+        return None
+    return {
+        "format": {
+            "type": "json_schema",
+            "name": "news_digest_items",
+            "schema": DIGEST_ITEMS_JSON_SCHEMA,
+            "strict": True,
+        }
+    }
+
+
+def salvage_json_array_items(text):
+    """Decode array elements one by one and keep everything before the first broken element."""
+    start = text.find("[")
+    if start == -1:
+        return []
+
+    decoder = json.JSONDecoder()
+    items = []
+    position = start + 1
+    length = len(text)
+
+    while position < length:
+        while position < length and text[position] in " \t\r\n,":
+            position += 1
+        if position >= length or text[position] == "]":
+            break
+        try:
+            value, position = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            break
+        items.append(value)
+
+    return items
+
+
+def parse_json_items(text):
+    """Return (items, mode) where mode is 'strict', 'salvaged' or 'failed'."""
+    if not text:
+        return [], "failed"
+
+    candidate = text.strip()
+    fenced = re.search(r"```(?:json)?\s*([\[{].*?)\s*(?:```|\Z)", candidate, flags=re.S | re.I)
+    if fenced:
+        candidate = fenced.group(1).strip()
 
     try:
         data = json.loads(candidate)
-        return data if isinstance(data, list) else []
     except json.JSONDecodeError:
-        return []
+        data = None
+
+    if isinstance(data, dict) and isinstance(data.get("items"), list):
+        return data["items"], "strict"
+    if isinstance(data, list):
+        return data, "strict"
+
+    start = candidate.find("[")
+    end = candidate.rfind("]")
+    if data is None and start != -1 and end > start:
+        try:
+            data = json.loads(candidate[start:end + 1])
+            if isinstance(data, list):
+                return data, "strict"
+        except json.JSONDecodeError:
+            pass
+
+    salvaged = salvage_json_array_items(candidate)
+    if salvaged:
+        return salvaged, "salvaged"
+    return [], "failed"
+
+
+def extract_json_array_from_text(text):
+    items, _mode = parse_json_items(text)
+    return items
+
+
+def new_digest_extraction_stats():
+    return {
+        "calls": 0,
+        "strict_calls": 0,
+        "salvaged_calls": 0,
+        "salvaged_items": 0,
+        "wasted_calls": 0,
+    }
 
 
 GENERIC_DIGEST_TITLE_PREFIXES = [
@@ -1801,6 +2692,44 @@ GENERIC_DIGEST_TITLE_PREFIXES = [
     "requirements and procedure",
 ]
 
+GENERIC_DIGEST_TITLE_MARKERS = [
+    "все, что нужно знать",
+    "всё, что нужно знать",
+    "что дает",
+    "что даёт",
+    "требования и процедура",
+    "права, возможности и ограничения",
+    "подробный гид",
+    "инвестору",
+    "guide",
+    "everything you need to know",
+    "requirements and procedure",
+    "rights, opportunities and limitations",
+    "for investors",
+    "process and requirements",
+]
+
+GENERIC_DIGEST_SUMMARY_MARKERS = ["подробный гид", "guide", "возможности получения", "что нужно знать инвестору"]
+
+CACHED_NEWS_ERROR_MARKERS = [
+    TEXTS["ru"]["error"],
+    TEXTS["ru"]["rate_limited"],
+    TEXTS["en"]["error"],
+    TEXTS["en"]["rate_limited"],
+    "service error",
+    "rate limited",
+    "rate limit",
+]
+
+KEYWORDS = KeywordMatcher(
+    chat_search_temporal=CHAT_SEARCH_TEMPORAL_MARKERS,
+    chat_search_migration=CHAT_SEARCH_MIGRATION_MARKERS,
+    generic_digest_title_prefix=GENERIC_DIGEST_TITLE_PREFIXES,
+    generic_digest_title=GENERIC_DIGEST_TITLE_MARKERS,
+    generic_digest_summary=GENERIC_DIGEST_SUMMARY_MARKERS,
+    cached_news_error=CACHED_NEWS_ERROR_MARKERS,
+)
+
 GENERIC_DIGEST_URL_SEGMENTS = {
     "blog",
     "residence",
@@ -1911,33 +2840,141 @@ def looks_like_evergreen_digest_item(title, summary):
     title_lower = (title or "").lower()
     summary_lower = (summary or "").lower()
 
-    generic_markers = [
-        "все, что нужно знать",
-        "всё, что нужно знать",
-        "что дает",
-        "что даёт",
-        "требования и процедура",
-        "права, возможности и ограничения",
-        "подробный гид",
-        "инвестору",
-        "guide",
-        "everything you need to know",
-        "requirements and procedure",
-        "rights, opportunities and limitations",
-        "for investors",
-        "process and requirements",
-    ]
-
-    if any(title_lower.startswith(prefix) for prefix in GENERIC_DIGEST_TITLE_PREFIXES):
+    if KEYWORDS.prefix("generic_digest_title_prefix", title_lower):
         return True
-    if any(marker in title_lower for marker in generic_markers) and "измен" not in title_lower:
+    if KEYWORDS.contains("generic_digest_title", title_lower) and "измен" not in title_lower:
         return True
-    if any(marker in summary_lower for marker in ["подробный гид", "guide", "возможности получения", "что нужно знать инвестору"]):
+    if KEYWORDS.contains("generic_digest_summary", summary_lower):
         return True
 
     return False
 
 
+class DigestItem:
+    """A normalized digest entry.
+
+    Pipeline stages pass the same instances along instead of copying dicts, so
+    treat them as immutable and derive changed copies with replace(). The values
+    dedupe compares are computed on first access and survive replace() unless
+    one of their inputs changed.
+    """
+
+    FIELDS = (
+        "country", "title", "date", "summary", "source_domain", "source_url",
+        "article_date", "country_code", "normalized_title_key", "id",
+    )
+    DERIVED_INPUTS = {
+        "_dedupe_tokens": ("country", "title", "summary"),
+        "_date_key": ("article_date", "date"),
+        "_domain_key": ("source_domain",),
+        "_source_url_key": ("source_url",),
+    }
+    __slots__ = FIELDS + tuple(DERIVED_INPUTS)
+
+    def __init__(
+        self,
+        country="",
+        title="",
+        date="",
+        summary="",
+        source_domain="",
+        source_url="",
+        article_date=None,
+        country_code="",
+        normalized_title_key="",
+        id=None,
+    ):
+        self.country = country
+        self.title = title
+        self.date = date
+        self.summary = summary
+        self.source_domain = source_domain
+        self.source_url = source_url
+        self.article_date = article_date
+        self.country_code = country_code
+        self.normalized_title_key = normalized_title_key
+        self.id = id
+        for cached in self.DERIVED_INPUTS:
+            setattr(self, cached, None)
+
+    # Read access mirrors dicts so rendering, quality checks and DB helpers
+    # work on these and on raw model output alike.
+    def get(self, field, default=None):
+        if field not in self.FIELDS:
+            return default
+        value = getattr(self, field)
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __repr__(self):
+        return f"DigestItem(title={self.title!r}, source_url={self.source_url!r})"
+
+    def replace(self, **changes):
+        item = DigestItem.__new__(DigestItem)
+        for slot in self.__slots__:
+            setattr(item, slot, getattr(self, slot))
+        for field, value in changes.items():
+            if field not in DIGEST_ITEM_INVALIDATES:
+                raise TypeError(f"DigestItem has no field {field!r}")
+            setattr(item, field, value)
+            for cached in DIGEST_ITEM_INVALIDATES[field]:
+                setattr(item, cached, None)
+        return item
+
+    @property
+    def dedupe_tokens(self):
+        if self._dedupe_tokens is None:
+            self._dedupe_tokens = frozenset(get_digest_dedupe_tokens(self))
+        return self._dedupe_tokens
+
+    @property
+    def date_key(self):
+        if self._date_key is None:
+            self._date_key = get_digest_article_date_key(self)
+        return self._date_key
+
+    @property
+    def domain_key(self):
+        if self._domain_key is None:
+            self._domain_key = comparable_domain(self.source_domain)
+        return self._domain_key
+
+    @property
+    def source_url_key(self):
+        if self._source_url_key is None:
+            self._source_url_key = normalize_digest_source_url_key(self.source_url)
+        return self._source_url_key
+
+    def to_json(self):
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        if isinstance(data["article_date"], date):
+            data["article_date"] = data["article_date"].isoformat()
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        """Loads an entry written by to_json(); it was normalized before it was stored."""
+        values = {field: data.get(field) for field in cls.FIELDS if data.get(field) is not None}
+        article_date = values.get("article_date")
+        if isinstance(article_date, str):
+            try:
+                values["article_date"] = date.fromisoformat(article_date[:10])
+            except ValueError:
+                values["article_date"] = None
+        return cls(**values)
+
+
+# field -> cached derived values that depend on it
+DIGEST_ITEM_INVALIDATES = {
+    field: tuple(cached for cached, inputs in DigestItem.DERIVED_INPUTS.items() if field in inputs)
+    for field in DigestItem.FIELDS
+}
+
+
 def normalize_digest_item(item):
     if not isinstance(item, dict):
         return None
@@ -1974,12 +3011,14 @@ def normalize_digest_item(item):
     title_needs_country_context = bool(
         title and (
             title[0].islower()
-            or any(title.lower().startswith(prefix) for prefix in GENERIC_DIGEST_TITLE_PREFIXES)
+            or KEYWORDS.prefix("generic_digest_title_prefix", title.lower())
         )
     )
 
     if not country:
         country = extract_news_item_country(f"{title}") or ""
+    if not country:
+        country = get_country_name(find_country_code(title), "ru" if re.search(r"[А-Яа-яЁё]", title) else "en")
     if not country:
         country = "Страна" if re.search(r"[А-Яа-яЁё]", title) else "Country"
 
@@ -2006,16 +3045,17 @@ def normalize_digest_item(item):
     if title and country and title_needs_country_context:
         title = f"{country}: {title}"
 
-    return {
-        "country": country,
-        "title": title,
-        "date": date,
-        "summary": summary,
-        "source_domain": source_domain,
-        "source_url": source_url,
-        "article_date": article_date,
-        "normalized_title_key": normalize_news_item_key(f"{source_domain} {title}"),
-    }
+    return DigestItem(
+        country=country,
+        title=title,
+        date=date,
+        summary=summary,
+        source_domain=source_domain,
+        source_url=source_url,
+        article_date=article_date,
+        country_code=find_country_code(country) or find_country_code(title),
+        normalized_title_key=normalize_news_item_key(f"{source_domain} {title}"),
+    )
 
 
 def digest_text_language_counts(item):
@@ -2046,39 +3086,254 @@ def count_digest_language_mismatches(items, lang):
 
 
 def apply_digest_item_translation(item, translated):
-    current = dict(item)
+    changes = {}
     for field in ["country", "title", "date", "summary"]:
         value = translated.get(field)
         if value:
             value = strip_digest_source_artifacts(
                 cleanup_digest_text(value),
-                current.get("source_domain", ""),
-                current.get("source_url", ""),
+                item.source_domain,
+                item.source_url,
             )
             if value:
-                current[field] = value
+                changes[field] = value
 
-    normalized = normalize_digest_item(current)
+    current = item.replace(**changes)
+    normalized = normalize_digest_item(current.to_json())
     return normalized or current
 
 
-def translate_digest_items(items, lang):
-    targets = [
-        {
-            "index": index,
-            **{
-                field: item.get(field, "")
-                for field in ["country", "title", "date", "summary"]
-            },
-        }
-        for index, item in enumerate(items)
-        if needs_digest_item_translation(item, lang)
-    ]
+DIGEST_TRANSLATION_FIELDS = ["country", "title", "date", "summary"]
+
+
+def new_translation_cache_stats():
+    return {
+        "requested": 0,
+        "memory_hits": 0,
+        "db_hits": 0,
+        "misses": 0,
+        "translated": 0,
+        "failed": 0,
+        "tokens_used": 0,
+        "tokens_saved": 0,
+    }
+
+
+def summarize_translation_cache_stats(stats):
+    stats = stats or new_translation_cache_stats()
+    hits = stats["memory_hits"] + stats["db_hits"]
+    lookups = hits + stats["misses"]
+    return {
+        **stats,
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+    }
+
+
+def make_digest_translation_hash(item):
+    payload = json.dumps(
+        [TRANSLATION_CACHE_VERSION] + [str(item.get(field, "") or "") for field in DIGEST_TRANSLATION_FIELDS],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_memory_cached_translation(lang, content_hash, model):
+    key = (lang, content_hash, model)
+    with translation_cache_lock:
+        entry = translation_cache.get(key)
+        if entry is not None:
+            translation_cache.move_to_end(key)
+        return entry
+
+
+def remember_translation(lang, content_hash, model, translated, tokens):
+    key = (lang, content_hash, model)
+    with translation_cache_lock:
+        translation_cache[key] = {"translated": translated, "tokens": tokens}
+        translation_cache.move_to_end(key)
+        while len(translation_cache) > TRANSLATION_CACHE_MAX_ITEMS:
+            translation_cache.popitem(last=False)
+
+
+@metrics.timed("grs_db_call_seconds")
+def load_cached_translations(lang, content_hashes, models):
+    if not content_hashes or not models:
+        return {}
+
+    try:
+        with get_read_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT content_hash, model, translated_json, tokens
+                    FROM news_translation_cache
+                    WHERE language_code = %s AND content_hash = ANY(%s) AND model = ANY(%s)
+                    """,
+                    (lang, list(content_hashes), list(models)),
+                )
+                rows = cur.fetchall()
+    except Exception as e:
+        logger.error(f"Error loading cached translations: {e}")
+        return {}
+
+    model_rank = {model: rank for rank, model in enumerate(models)}
+    best = {}
+    for row in rows:
+        current = best.get(row["content_hash"])
+        if current is None or model_rank.get(row["model"], len(models)) < model_rank.get(current["model"], len(models)):
+            best[row["content_hash"]] = row
+    return best
+
+
+@metrics.timed("grs_db_call_seconds")
+def save_cached_translations(lang, model, entries):
+    if not entries:
+        return
+
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                for content_hash, translated, tokens in entries:
+                    cur.execute(
+                        """
+                        INSERT INTO news_translation_cache (
+                            language_code,
+                            content_hash,
+                            model,
+                            translated_json,
+                            tokens
+                        ) VALUES (%s, %s, %s, %s, %s)
+                        ON CONFLICT (language_code, content_hash, model)
+                        DO UPDATE SET
+                            translated_json = EXCLUDED.translated_json,
+                            tokens = EXCLUDED.tokens,
+                            created_at = NOW()
+                        """,
+                        (lang, content_hash, model, Json(translated), tokens),
+                    )
+                conn.commit()
+    except Exception as e:
+        logger.error(f"Error saving cached translations: {e}")
+
+
+def get_cached_digest_translations(targets, lang, models, stats):
+    cached = {}
+    db_lookup = {}
+
+    for target in targets:
+        content_hash = target["content_hash"]
+        for model in models:
+            entry = get_memory_cached_translation(lang, content_hash, model)
+            if entry is not None:
+                cached[target["index"]] = entry["translated"]
+                stats["memory_hits"] += 1
+                metrics.inc("grs_cache_requests_total", cache="translation", result="memory_hit")
+                stats["tokens_saved"] += entry["tokens"]
+                break
+        else:
+            db_lookup.setdefault(content_hash, []).append(target["index"])
+
+    for content_hash, row in load_cached_translations(lang, db_lookup.keys(), models).items():
+        translated = row["translated_json"]
+        if isinstance(translated, str):
+            try:
+                translated = json.loads(translated)
+            except json.JSONDecodeError:
+                continue
+        if not isinstance(translated, dict):
+            continue
+
+        tokens = row.get("tokens") or 0
+        remember_translation(lang, content_hash, row["model"], translated, tokens)
+        for index in db_lookup[content_hash]:
+            cached[index] = translated
+            stats["db_hits"] += 1
+            metrics.inc("grs_cache_requests_total", cache="translation", result="db_hit")
+            stats["tokens_saved"] += tokens
+
+    stats["misses"] += len(targets) - len(cached)
+    metrics.inc("grs_cache_requests_total", len(targets) - len(cached), cache="translation", result="miss")
+    return cached
+
+
+def get_response_total_tokens(response):
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", 0) or 0
+
+
+def translate_digest_items(items, lang, stats=None):
+    stats = stats if stats is not None else new_translation_cache_stats()
+    targets = []
+    for index, item in enumerate(items):
+        if not needs_digest_item_translation(item, lang):
+            continue
+        target = {"index": index, **{field: item.get(field, "") for field in DIGEST_TRANSLATION_FIELDS}}
+        target["content_hash"] = make_digest_translation_hash(target)
+        targets.append(target)
     if not targets:
         return items
 
+    stats["requested"] += len(targets)
+    models = get_translation_models()
+    translated_by_index = get_cached_digest_translations(targets, lang, models, stats)
+    missing_by_hash = {}
+    for target in targets:
+        if target["index"] not in translated_by_index:
+            missing_by_hash.setdefault(target["content_hash"], []).append(target)
+
+    if missing_by_hash:
+        unique_targets = [group[0] for group in missing_by_hash.values()]
+        fresh = request_digest_translations(unique_targets, lang, models, stats)
+        for target in unique_targets:
+            translated = fresh.get(target["index"])
+            if translated is None:
+                continue
+            for duplicate in missing_by_hash[target["content_hash"]]:
+                translated_by_index[duplicate["index"]] = translated
+    else:
+        logger.info("Digest translation served from cache lang=%s items=%s", lang, len(targets))
+
+    if not translated_by_index:
+        return items
+
+    updated_items = list(items)
+    for index, translated in translated_by_index.items():
+        if 0 <= index < len(updated_items):
+            updated_items[index] = apply_digest_item_translation(updated_items[index], translated)
+    return updated_items
+
+
+def add_translation_stats(stats, **amounts):
+    with translation_stats_lock:
+        for key, amount in amounts.items():
+            stats[key] = stats.get(key, 0) + amount
+
+
+def split_translation_chunks(targets):
+    chunks = []
+    current = []
+    current_chars = 0
+
+    for target in targets:
+        target_chars = sum(len(str(target.get(field, "") or "")) for field in DIGEST_TRANSLATION_FIELDS)
+        if current and (
+            len(current) >= TRANSLATION_BATCH_MAX_ITEMS
+            or current_chars + target_chars > TRANSLATION_BATCH_MAX_CHARS
+        ):
+            chunks.append(current)
+            current = []
+            current_chars = 0
+        current.append(target)
+        current_chars += target_chars
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_translation_messages(targets, lang):
     target_language = "Russian" if lang == "ru" else "English"
-    messages = [
+    return [
         {
             "role": "system",
             "content": (
@@ -2093,7 +3348,10 @@ def translate_digest_items(items, lang):
             "content": json.dumps(
                 {
                     "target_language": target_language,
-                    "items": targets,
+                    "items": [
+                        {key: value for key, value in target.items() if key != "content_hash"}
+                        for target in targets
+                    ],
                     "required_output_fields": ["index", "country", "title", "date", "summary"],
                 },
                 ensure_ascii=False,
@@ -2101,55 +3359,113 @@ def translate_digest_items(items, lang):
         },
     ]
 
-    last_error = None
-    for model in get_translation_models():
+
+def is_valid_digest_translation(translated):
+    return bool(
+        isinstance(translated, dict)
+        and str(translated.get("title", "") or "").strip()
+        and str(translated.get("summary", "") or "").strip()
+    )
+
+
+def translate_digest_chunk(targets, lang, models, stats):
+    pending = {target["index"]: target for target in targets}
+    translated_by_index = {}
+
+    for model in models:
+        if not pending:
+            break
+
+        chunk_targets = list(pending.values())
         try:
             logger.info(
                 "OpenAI translation request start model=%s lang=%s items=%s",
                 model,
                 lang,
-                len(targets),
+                len(chunk_targets),
             )
-            response = client.responses.create(model=model, input=messages)
-            translated_items = extract_json_array_from_text((response.output_text or "").strip())
-            translated_by_index = {}
-            for translated in translated_items:
+            response = call_openai_responses(
+                "translation",
+                model=model,
+                input=build_translation_messages(chunk_targets, lang),
+            )
+            tokens = get_response_total_tokens(response)
+            add_translation_stats(stats, tokens_used=tokens)
+
+            accepted = {}
+            for translated in extract_json_array_from_text((response.output_text or "").strip()):
                 if not isinstance(translated, dict):
                     continue
                 index = translated.get("index")
-                if isinstance(index, int):
-                    translated_by_index[index] = translated
-
-            if not translated_by_index:
-                raise ValueError("translation response did not contain indexed items")
-
-            updated_items = [dict(item) for item in items]
-            for index, translated in translated_by_index.items():
-                if 0 <= index < len(updated_items):
-                    updated_items[index] = apply_digest_item_translation(
-                        updated_items[index],
-                        translated,
-                    )
+                if isinstance(index, int) and index in pending and is_valid_digest_translation(translated):
+                    accepted[index] = {field: translated.get(field, "") for field in DIGEST_TRANSLATION_FIELDS}
+
+            if not accepted:
+                raise ValueError("translation response did not contain valid indexed items")
+
+            tokens_per_item = tokens // len(accepted)
+            cache_entries = []
+            for index, translated in accepted.items():
+                content_hash = pending.pop(index)["content_hash"]
+                translated_by_index[index] = translated
+                remember_translation(lang, content_hash, model, translated, tokens_per_item)
+                cache_entries.append((content_hash, translated, tokens_per_item))
+            save_cached_translations(lang, model, cache_entries)
+            add_translation_stats(stats, translated=len(accepted))
 
             logger.info(
-                "OpenAI translation completed model=%s lang=%s translated_items=%s",
+                "OpenAI translation completed model=%s lang=%s translated_items=%s missing_items=%s tokens=%s",
                 model,
                 lang,
-                len(translated_by_index),
+                len(accepted),
+                len(pending),
+                tokens,
             )
-            return updated_items
         except Exception as exc:
-            last_error = exc
             logger.exception(
-                "OpenAI translation failed model=%s lang=%s exc_type=%s err=%s",
+                "OpenAI translation failed model=%s lang=%s items=%s exc_type=%s err=%s",
                 model,
                 lang,
+                len(chunk_targets),
                 exc.__class__.__name__,
                 exc,
             )
 
-    logger.error("OpenAI translation skipped after failures lang=%s err=%s", lang, last_error)
-    return items
+    if pending:
+        add_translation_stats(stats, failed=len(pending))
+        logger.error(
+            "OpenAI translation incomplete lang=%s missing_indexes=%s",
+            lang,
+            sorted(pending),
+        )
+    return translated_by_index
+
+
+def request_digest_translations(targets, lang, models, stats):
+    chunks = split_translation_chunks(targets)
+    if len(chunks) == 1:
+        return translate_digest_chunk(chunks[0], lang, models, stats)
+
+    translated_by_index = {}
+    with ThreadPoolExecutor(max_workers=min(TRANSLATION_MAX_WORKERS, len(chunks))) as executor:
+        futures = [
+            executor.submit(translate_digest_chunk, chunk, lang, models, stats)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            try:
+                translated_by_index.update(future.result())
+            except Exception:
+                logger.exception("Digest translation chunk crashed lang=%s", lang)
+
+    logger.info(
+        "Digest translation chunks finished lang=%s chunks=%s translated_items=%s requested_items=%s",
+        lang,
+        len(chunks),
+        len(translated_by_index),
+        len(targets),
+    )
+    return translated_by_index
 
 
 def enrich_digest_items_with_citations(items, response):
@@ -2160,12 +3476,11 @@ def enrich_digest_items_with_citations(items, response):
     used_urls = {item["source_url"] for item in items if item.get("source_url")}
     enriched = []
     for item in items:
-        current = dict(item)
-        if current.get("source_url"):
-            enriched.append(current)
+        if item.source_url:
+            enriched.append(item)
             continue
 
-        item_domain = comparable_domain(current.get("source_domain"))
+        item_domain = item.domain_key
         matched = None
         for citation in citations:
             if citation["url"] in used_urls:
@@ -2175,10 +3490,9 @@ def enrich_digest_items_with_citations(items, response):
                 break
 
         if matched:
-            current["source_url"] = matched["url"]
-            current["source_domain"] = current.get("source_domain") or matched["domain"]
+            item = item.replace(source_url=matched["url"], source_domain=item.source_domain or matched["domain"])
             used_urls.add(matched["url"])
-        enriched.append(current)
+        enriched.append(item)
     return enriched
 
 
@@ -2189,18 +3503,15 @@ def dedupe_digest_items(items):
     domain_counts = {}
 
     def sort_key(item):
-        article_date = item.get("article_date")
-        source_priority = 1 if is_low_priority_news_domain(item.get("source_domain", "")) else 0
+        article_date = item.article_date
+        source_priority = 1 if is_low_priority_news_domain(item.source_domain) else 0
         if article_date:
-            return (source_priority, 0, -article_date.toordinal(), item.get("source_url", ""))
-        return (source_priority, 1, 0, item.get("source_url", ""))
+            return (source_priority, 0, -article_date.toordinal(), item.source_url)
+        return (source_priority, 1, 0, item.source_url)
 
     for item in sorted(items, key=sort_key):
-        source_url = item.get("source_url", "")
-        source_url_key = normalize_digest_source_url_key(source_url)
-        fallback_key = item.get("normalized_title_key") or normalize_news_item_key(
-            f"{item.get('source_domain', '')} {item.get('title', '')}"
-        )
+        source_url_key = item.source_url_key
+        fallback_key = item.normalized_title_key or normalize_news_item_key(f"{item.source_domain} {item.title}")
         if not source_url_key and not fallback_key:
             continue
         if source_url_key and source_url_key in seen_urls:
@@ -2210,7 +3521,7 @@ def dedupe_digest_items(items):
         if any(are_near_duplicate_digest_items(item, existing) for existing in deduped):
             continue
 
-        domain = item.get("source_domain", "").strip().lower()
+        domain = item.source_domain.strip().lower()
         if domain and domain_counts.get(domain, 0) >= MAX_NEWS_PER_DOMAIN:
             continue
 
@@ -2221,7 +3532,7 @@ def dedupe_digest_items(items):
         if domain:
             domain_counts[domain] = domain_counts.get(domain, 0) + 1
 
-        deduped.append(dict(item))
+        deduped.append(item)
 
     return deduped[:TARGET_NEWS_ITEMS]
 
@@ -2284,10 +3595,12 @@ def row_to_digest_item(row):
     if not normalized:
         return None
 
-    normalized["id"] = row.get("id")
+    changes = {"id": row.get("id")}
+    if row.get("country_code"):
+        changes["country_code"] = row["country_code"]
     if isinstance(article_date, date):
-        normalized["article_date"] = article_date
-    return normalized
+        changes["article_date"] = article_date
+    return normalized.replace(**changes)
 
 
 def repair_digest_language(items, lang, persist=False):
@@ -2348,12 +3661,12 @@ def merge_news_pool_items(existing_active_items, new_candidate_items):
 
     merged = {}
     for item in existing_active_items:
-        if item.get("source_url"):
-            merged[item["source_url"]] = dict(item)
+        if item.source_url:
+            merged[item.source_url] = item
 
     for item in new_candidate_items:
-        if item.get("source_url"):
-            merged[item["source_url"]] = dict(item)
+        if item.source_url:
+            merged[item.source_url] = item
 
     return dedupe_digest_items(list(merged.values()))
 
@@ -2400,170 +3713,767 @@ def render_news_digest_html(items, lang):
     return f"{escape_html(header)}\n\n" + "\n\n".join(formatted)
 
 
-def render_news_digest_snapshot(row, lang):
-    if not row:
-        return ""
+def render_news_digest_snapshot(row, lang):
+    if not row:
+        return ""
+
+    normalized_items = normalize_snapshot_items(row)
+    normalized_items = repair_digest_language(normalized_items, lang)
+    if normalized_items:
+        return render_news_digest_html(normalized_items, lang)
+
+    return row.get("rendered_html") or ""
+
+
+def build_news_digest(chat_id, lang, translation_stats=None, extraction_stats=None, trace=None):
+    translation_stats = translation_stats if translation_stats is not None else new_translation_cache_stats()
+    extraction_stats = extraction_stats if extraction_stats is not None else new_digest_extraction_stats()
+    trace = trace or metrics.SpanTracer()
+    system_content = NEWS_DIGEST_SYSTEM_PROMPTS[lang if lang == "ru" else "en"]
+    prompt_variants = [build_news_snapshot_prompt(lang), build_news_snapshot_prompt(lang, broaden=True)]
+
+    best_result = {"items": [], "rendered_html": "", "raw_response": "", "model_used": ""}
+
+    for prompt in prompt_variants:
+        messages = [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": prompt},
+        ]
+        with trace.span("create_response") as span:
+            response, model_used = create_response(
+                messages,
+                lang=lang,
+                news_mode=True,
+                text_format=build_digest_text_format(),
+            )
+            span["tokens"] = get_response_total_tokens(response)
+
+        with trace.span("parse_items") as span:
+            raw_text = (response.output_text or "").strip()
+            raw_items, parse_mode = parse_json_items(raw_text)
+            span["items"] = len(raw_items)
+
+        with trace.span("normalize_items") as span:
+            items = [normalize_digest_item(item) for item in raw_items]
+            items = [item for item in items if item]
+            span["items"] = len(items)
+
+        extraction_stats["calls"] += 1
+        if parse_mode == "strict":
+            extraction_stats["strict_calls"] += 1
+        elif parse_mode == "salvaged":
+            extraction_stats["salvaged_calls"] += 1
+            extraction_stats["salvaged_items"] += len(raw_items)
+        if not items:
+            extraction_stats["wasted_calls"] += 1
+        logger.info(
+            "News digest extraction model=%s lang=%s parse_mode=%s raw_items=%s usable_items=%s",
+            model_used,
+            lang,
+            parse_mode,
+            len(raw_items),
+            len(items),
+        )
+
+        with trace.span("enrich_citations") as span:
+            items = enrich_digest_items_with_citations(items, response)
+            span["items"] = len(items)
+
+        with trace.span("translate_candidates") as span:
+            tokens_before = translation_stats["tokens_used"]
+            items = translate_digest_items(items, lang, stats=translation_stats)
+            span["items"] = len(items)
+            span["tokens"] = translation_stats["tokens_used"] - tokens_before
+
+        with trace.span("dedupe_candidates") as span:
+            items = dedupe_digest_items(items)
+            span["items"] = len(items)
+
+        candidate = {
+            "items": items,
+            "rendered_html": render_news_digest_html(items, lang) if items else "",
+            "raw_response": raw_text,
+            "model_used": model_used,
+        }
+        if len(candidate["items"]) > len(best_result["items"]):
+            best_result = candidate
+        if len(candidate["items"]) >= READY_NEWS_MIN_ITEMS:
+            return candidate
+
+    return best_result
+
+
+def discover_news_digest_items(chat_id, lang, translation_stats, extraction_stats, trace, force=False):
+    # A forced refresh always searches; a language never reuses its own earlier search.
+    if NEWS_SHARED_DISCOVERY and not force:
+        with trace.span("load_shared_candidates") as span:
+            rows = get_recent_news_candidates(
+                NEWS_SHARED_DISCOVERY_TTL_SEC, CANDIDATE_NEWS_ITEMS * 2, exclude_language=lang
+            )
+            items = [item for item in (row_to_digest_item(row) for row in rows) if item]
+            span["items"] = len(items)
+
+        if len(items) >= READY_NEWS_MIN_ITEMS:
+            # Another language searched recently; translating its candidates is far
+            # cheaper than a second round of web_search calls.
+            with trace.span("translate_shared_candidates") as span:
+                tokens_before = translation_stats["tokens_used"]
+                items = dedupe_digest_items(translate_digest_items(items, lang, stats=translation_stats))
+                span["items"] = len(items)
+                span["tokens"] = translation_stats["tokens_used"] - tokens_before
+            languages = sorted({row["content_language"] for row in rows})
+            metrics.inc("grs_news_discovery_total", lang=lang, source="shared")
+            logger.info("Reusing shared news candidates lang=%s items=%s from=%s", lang, len(items), languages)
+            return {
+                "items": items,
+                "rendered_html": "",
+                "raw_response": json.dumps({"shared_candidates": len(items), "content_languages": languages}),
+                "model_used": rows[0]["model_used"] or "",
+            }
+
+    digest = build_news_digest(
+        chat_id,
+        lang,
+        translation_stats=translation_stats,
+        extraction_stats=extraction_stats,
+        trace=trace,
+    )
+    metrics.inc("grs_news_discovery_total", lang=lang, source="search")
+    if NEWS_SHARED_DISCOVERY and digest["items"]:
+        with trace.span("save_shared_candidates") as span:
+            upsert_news_candidates(digest["items"], lang, digest["model_used"])
+            span["items"] = len(digest["items"])
+    return digest
+
+
+def refresh_news_digest(lang="ru", force=False, chat_id=None, trace=None):
+    translation_stats = new_translation_cache_stats()
+    extraction_stats = new_digest_extraction_stats()
+    trace = trace or metrics.SpanTracer("grs_digest_stage_seconds", lang=lang)
+    result = run_news_digest_refresh(lang, force, chat_id, translation_stats, extraction_stats, trace)
+    result["translation_cache"] = summarize_translation_cache_stats(translation_stats)
+    result["extraction"] = extraction_stats
+    result["timings"] = trace.as_dict()
+    metrics.observe(
+        "grs_digest_refresh_seconds",
+        result["timings"]["total_seconds"],
+        lang=lang,
+        status=result.get("status", "unknown"),
+    )
+    logger.info(
+        "News digest refresh finished lang=%s status=%s translation_cache=%s extraction=%s timings=%s",
+        lang,
+        result.get("status"),
+        result["translation_cache"],
+        extraction_stats,
+        result["timings"],
+    )
+    if result.get("status") == "ready" and result.get("updated") and result.get("digest_id"):
+        start_news_broadcast(result["digest_id"], lang)
+    return result
+
+
+def load_news_pool_items(lang, trace):
+    with trace.span("load_pool_rows") as span:
+        rows = get_news_pool_rows(lang, active_only=False)
+        span["items"] = len(rows)
+    with trace.span("normalize_pool_rows") as span:
+        items = [row_to_digest_item(row) for row in rows]
+        items = [item for item in items if item]
+        span["items"] = len(items)
+    return items
+
+
+def upsert_news_pool_items(lang, items, trace):
+    with trace.span("upsert_pool") as span:
+        for item in items:
+            upsert_news_pool_item(lang, item)
+        span["items"] = len(items)
+
+
+def run_news_digest_refresh(lang, force, chat_id, translation_stats, extraction_stats, trace):
+    with trace.span("load_latest_digest"):
+        latest_ready = get_latest_news_digest(lang, allow_stale=True, projection="freshness")
+    if latest_ready and not force and latest_ready.get("age_sec", NEWS_CACHE_TTL_SEC + 1) < NEWS_CACHE_TTL_SEC:
+        return {
+            "status": "skipped",
+            "reason": "ready_digest_is_fresh",
+            "item_count": latest_ready.get("item_count", 0),
+            "updated": False,
+        }
+
+    existing_pool_items = load_news_pool_items(lang, trace)
+    existing_pool_urls = {item["source_url"] for item in existing_pool_items if item.get("source_url")}
+
+    digest = discover_news_digest_items(chat_id or 0, lang, translation_stats, extraction_stats, trace, force=force)
+    candidate_items = digest["items"]
+    new_candidate_items = [item for item in candidate_items if item.get("source_url") not in existing_pool_urls]
+
+    upsert_news_pool_items(lang, candidate_items, trace)
+
+    refreshed_pool_items = load_news_pool_items(lang, trace)
+    with trace.span("merge_pool") as span:
+        final_items = merge_news_pool_items(refreshed_pool_items, [])
+        span["items"] = len(final_items)
+    with trace.span("translate_pool") as span:
+        tokens_before = translation_stats["tokens_used"]
+        final_items = translate_digest_items(final_items, lang, stats=translation_stats)
+        span["items"] = len(final_items)
+        span["tokens"] = translation_stats["tokens_used"] - tokens_before
+    upsert_news_pool_items(lang, final_items, trace)
+
+    quality = evaluate_digest_quality(final_items, lang=lang)
+
+    if is_digest_ready(final_items, lang=lang):
+        with trace.span("activate_pool"):
+            set_active_news_pool_items(
+                lang,
+                [item["source_url"] for item in final_items if item.get("source_url")],
+            )
+        with trace.span("render_html"):
+            rendered_html = render_news_digest_html(final_items, lang)
+        with trace.span("save_digest"):
+            digest_id = save_news_digest(
+                lang,
+                final_items,
+                rendered_html,
+                digest["raw_response"],
+                digest["model_used"],
+                status="ready",
+                stage_timings=trace.as_dict(),
+            )
+        if digest_id:
+            # The row was written inside the save_digest span; store the breakdown including it.
+            update_news_digest_stage_timings(digest_id, lang, trace.as_dict())
+        if not digest_id:
+            return {
+                "status": "failed",
+                "updated": False,
+                "new_count": len(new_candidate_items),
+                "item_count": len(final_items),
+                "domains": quality["domains"],
+                "urls": quality["urls"],
+                "generic_urls": quality["generic_urls"],
+                "language_mismatches": quality["language_mismatches"],
+                "reason": "save_ready_digest_failed",
+            }
+        return {
+            "status": "ready",
+            "updated": bool(new_candidate_items),
+            "new_count": len(new_candidate_items),
+            "item_count": len(final_items),
+            "domains": quality["domains"],
+            "urls": quality["urls"],
+            "generic_urls": quality["generic_urls"],
+            "language_mismatches": quality["language_mismatches"],
+            "digest_id": digest_id,
+        }
+
+    if not new_candidate_items and refreshed_pool_items:
+        return {
+            "status": "unchanged",
+            "updated": False,
+            "new_count": 0,
+            "item_count": quality["item_count"],
+            "domains": quality["domains"],
+            "urls": quality["urls"],
+            "generic_urls": quality["generic_urls"],
+            "language_mismatches": quality["language_mismatches"],
+        }
+
+    with trace.span("save_digest"):
+        digest_id = save_news_digest(
+            lang,
+            final_items or candidate_items,
+            render_news_digest_html(final_items or candidate_items, lang) if (final_items or candidate_items) else "",
+            digest["raw_response"],
+            digest["model_used"],
+            status="draft" if candidate_items else "failed",
+            stage_timings=trace.as_dict(),
+        )
+    if digest_id:
+        update_news_digest_stage_timings(digest_id, lang, trace.as_dict())
+    return {
+        "status": "draft" if candidate_items else "failed",
+        "updated": False,
+        "new_count": len(new_candidate_items),
+        "item_count": quality["item_count"],
+        "domains": quality["domains"],
+        "urls": quality["urls"],
+        "generic_urls": quality["generic_urls"],
+        "language_mismatches": quality["language_mismatches"],
+        "digest_id": digest_id,
+    }
+
+
+def get_news_job_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_news_digest_job(job, worker_id):
+    job_id = job["id"]
+    lang = job["language_code"]
+    trace = metrics.SpanTracer("grs_digest_stage_seconds", lang=lang)
+    stop_event = threading.Event()
+    lost_lock = threading.Event()
+
+    def heartbeat():
+        while not stop_event.wait(NEWS_JOB_HEARTBEAT_SEC):
+            if not heartbeat_news_digest_job(job_id, worker_id, trace.progress()):
+                # Another worker reclaimed the job; our result will not be recorded.
+                logger.warning("News digest job id=%s lost its lock", job_id)
+                lost_lock.set()
+                return
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    logger.info("News digest job started id=%s lang=%s attempt=%s", job_id, lang, job["attempts"])
+
+    result = None
+    error = None
+    try:
+        result = refresh_news_digest(lang=lang, force=job["force"], trace=trace)
+        if result.get("status") == "failed":
+            error = result.get("reason") or "refresh_failed"
+    except Exception as exc:
+        logger.exception("News digest job id=%s failed", job_id)
+        error = f"{exc.__class__.__name__}: {exc}"
+    finally:
+        stop_event.set()
+        heartbeat_thread.join()
+
+    status = None
+    if not lost_lock.is_set():
+        status = finish_news_digest_job(job_id, worker_id, trace.progress(), result=result, error=error)
+    metrics.inc("grs_news_jobs_total", status=status or "lost")
+    logger.info("News digest job finished id=%s lang=%s status=%s error=%s", job_id, lang, status, error)
+
+
+def news_job_worker_loop():
+    worker_id = get_news_job_worker_id()
+    logger.info("News digest job worker started worker_id=%s", worker_id)
+    while True:
+        job = claim_news_digest_job(worker_id)
+        if job:
+            run_news_digest_job(job, worker_id)
+            continue
+        news_job_wakeup.wait(NEWS_JOB_POLL_SEC)
+        news_job_wakeup.clear()
+
+
+def ensure_news_job_worker():
+    global news_job_worker
+    if not NEWS_JOB_WORKER_ENABLED:
+        return
+    with news_job_worker_lock:
+        if news_job_worker is None or not news_job_worker.is_alive():
+            news_job_worker = threading.Thread(target=news_job_worker_loop, name="news-job-worker", daemon=True)
+            news_job_worker.start()
+
+
+def schedule_news_digest_refreshes():
+    """Enqueues a refresh for every scheduled language whose ready digest is stale."""
+    delay_sec = 0
+    for lang in NEWS_SCHEDULER_LANGS:
+        latest = get_latest_news_digest(lang, allow_stale=True, projection="freshness")
+        if latest and latest.get("age_sec", NEWS_CACHE_TTL_SEC + 1) < NEWS_CACHE_TTL_SEC:
+            metrics.inc("grs_news_scheduler_decisions_total", lang=lang, decision="fresh")
+            continue
+
+        # Unchanged, draft and failed refreshes save no ready row, so the digest stays
+        # stale; back off instead of re-running web_search every tick.
+        outcomes = get_recent_news_digest_outcomes(lang)
+        backoff_sec = get_news_refresh_backoff_sec(outcomes)
+        if outcomes and outcomes[0]["age_sec"] < backoff_sec:
+            metrics.inc("grs_news_scheduler_decisions_total", lang=lang, decision="backoff")
+            logger.info(
+                "News scheduler lang=%s decision=backoff last_outcome=%s backoff=%ss",
+                lang, outcomes[0]["outcome"] or outcomes[0]["status"], backoff_sec,
+            )
+            continue
+
+        job = enqueue_news_digest_job(lang, delay_sec=delay_sec)
+        if not job:
+            metrics.inc("grs_news_scheduler_decisions_total", lang=lang, decision="error")
+            continue
+        decision = "enqueued" if job["created"] else "pending"
+        metrics.inc("grs_news_scheduler_decisions_total", lang=lang, decision=decision)
+        logger.info("News scheduler lang=%s decision=%s job_id=%s delay=%ss", lang, decision, job["id"], delay_sec)
+        if job["created"]:
+            # Spread stale languages out so their web_search bursts do not overlap.
+            delay_sec += NEWS_SCHEDULER_STAGGER_SEC
+    news_job_wakeup.set()
+
+
+def news_scheduler_loop():
+    leader_conn = None
+    last_maintenance_at = None
+    while True:
+        try:
+            if leader_conn is not None:
+                with leader_conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+            else:
+                leader_conn = open_advisory_lock_session(NEWS_SCHEDULER_LOCK_ID)
+                if leader_conn is not None:
+                    logger.info("News scheduler acquired leadership worker_id=%s", get_news_job_worker_id())
+        except Exception as e:
+            logger.warning("News scheduler leader connection failed: %s", e)
+            if leader_conn is not None:
+                try:
+                    leader_conn.close()
+                except Exception:
+                    pass
+            leader_conn = None
+        metrics.set_gauge("grs_news_scheduler_leader", 1 if leader_conn is not None else 0)
+
+        if leader_conn is not None:
+            try:
+                schedule_news_digest_refreshes()
+                resume_news_broadcasts()
+                if last_maintenance_at is None or time.monotonic() - last_maintenance_at >= CHAT_HISTORY_MAINTENANCE_INTERVAL_SEC:
+                    result = run_chat_history_maintenance()
+                    logger.info("Chat history maintenance finished result=%s", result)
+                    last_maintenance_at = time.monotonic()
+            except Exception:
+                logger.exception("News scheduler tick failed")
+
+        time.sleep(max(1.0, NEWS_SCHEDULER_INTERVAL_SEC + random.uniform(-NEWS_SCHEDULER_JITTER_SEC, NEWS_SCHEDULER_JITTER_SEC)))
+
+
+def ensure_news_scheduler():
+    global news_scheduler
+    if not NEWS_SCHEDULER_ENABLED or not NEWS_SCHEDULER_LANGS:
+        return
+    with news_scheduler_lock:
+        if news_scheduler is None or not news_scheduler.is_alive():
+            news_scheduler = threading.Thread(target=news_scheduler_loop, name="news-scheduler", daemon=True)
+            news_scheduler.start()
+
+
+def get_update_age(msg):
+    sent_at = msg.get("date")
+    return max(0.0, time.time() - sent_at) if isinstance(sent_at, (int, float)) else 0.0
+
+
+@metrics.timed("grs_db_call_seconds")
+def enqueue_deferred_answer(chat_id, text, lang):
+    """Stores a deferred question; returns its id, or None when the queue is full."""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO deferred_answers (chat_id, language_code, text)
+                    SELECT %s, %s, %s
+                    WHERE (SELECT COUNT(*) FROM deferred_answers WHERE status IN ('queued', 'running')) < %s
+                    RETURNING id
+                    """,
+                    (chat_id, lang, text, admission.ADMISSION_MAX_DEFERRED),
+                )
+                row = cur.fetchone()
+                conn.commit()
+    except Exception as e:
+        logger.error(f"Error enqueueing deferred answer: {e}")
+        return None
+    if row is None:
+        return None
+    deferred_answer_wakeup.set()
+    return row["id"]
+
+
+@metrics.timed("grs_db_call_seconds")
+def claim_deferred_answer(worker_id, release_all):
+    """Claims the oldest deferred question; under pressure only those past the max wait."""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                # Questions whose worker died mid-answer go back to the queue, or fail
+                # once they have used up their attempts.
+                cur.execute(
+                    """
+                    UPDATE deferred_answers
+                    SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                        finished_at = CASE WHEN attempts >= %s THEN NOW() END,
+                        last_error = 'abandoned (worker ' || COALESCE(locked_by, '?') || ')',
+                        locked_by = NULL
+                    WHERE status = 'running' AND started_at < NOW() - make_interval(secs => %s)
+                    RETURNING id, status
+                    """,
+                    (DEFERRED_ANSWER_MAX_ATTEMPTS, DEFERRED_ANSWER_MAX_ATTEMPTS, DEFERRED_ANSWER_STALE_SEC),
+                )
+                for row in cur.fetchall():
+                    logger.warning("Reclaimed deferred answer id=%s status=%s", row["id"], row["status"])
+
+                cur.execute(
+                    """
+                    UPDATE deferred_answers
+                    SET status = 'running',
+                        attempts = attempts + 1,
+                        locked_by = %s,
+                        started_at = NOW()
+                    WHERE id = (
+                        SELECT id
+                        FROM deferred_answers
+                        WHERE status = 'queued'
+                          AND (%s OR created_at < NOW() - make_interval(secs => %s))
+                        ORDER BY created_at, id
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING id, chat_id, language_code, text
+                    """,
+                    (worker_id, release_all, admission.ADMISSION_DEFER_MAX_WAIT_SEC),
+                )
+                row = cur.fetchone()
+                conn.commit()
+                return row
+    except Exception as e:
+        logger.error(f"Error claiming deferred answer: {e}")
+        return None
+
+
+@metrics.timed("grs_db_call_seconds")
+def finish_deferred_answer(answer_id, worker_id, error=None):
+    """Marks a claimed question answered; on error requeues it until attempts run out."""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE deferred_answers
+                    SET status = CASE
+                            WHEN %s IS NULL THEN 'answered'
+                            WHEN attempts >= %s THEN 'failed'
+                            ELSE 'queued'
+                        END,
+                        finished_at = CASE WHEN %s IS NULL OR attempts >= %s THEN NOW() END,
+                        last_error = %s,
+                        locked_by = NULL
+                    WHERE id = %s AND locked_by = %s
+                    """,
+                    (error, DEFERRED_ANSWER_MAX_ATTEMPTS, error, DEFERRED_ANSWER_MAX_ATTEMPTS, error, answer_id, worker_id),
+                )
+                conn.commit()
+    except Exception as e:
+        logger.error(f"Error finishing deferred answer {answer_id}: {e}")
+
+
+@metrics.timed("grs_db_call_seconds")
+def release_deferred_answers(worker_id):
+    """Puts this worker's unfinished questions back in the queue (called on shutdown)."""
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE deferred_answers
+                    SET status = 'queued', locked_by = NULL, attempts = GREATEST(attempts - 1, 0)
+                    WHERE status = 'running' AND locked_by = %s
+                    """,
+                    (worker_id,),
+                )
+                released = cur.rowcount
+                conn.commit()
+    except Exception as e:
+        logger.error(f"Error releasing deferred answers: {e}")
+        return 0
+    if released:
+        logger.info("Released %s deferred answers worker_id=%s", released, worker_id)
+    return released
+
+
+@metrics.timed("grs_db_call_seconds")
+def update_deferred_answer_gauges():
+    try:
+        with get_read_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT COUNT(*) AS pending,
+                           COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(created_at)), 0) AS oldest_sec
+                    FROM deferred_answers
+                    WHERE status IN ('queued', 'running')
+                    """
+                )
+                row = cur.fetchone()
+    except Exception as e:
+        logger.error(f"Error loading deferred answer backlog: {e}")
+        return
+    metrics.set_gauge("grs_admission_deferred", row["pending"])
+    metrics.set_gauge("grs_admission_deferred_oldest_seconds", float(row["oldest_sec"]))
+
+
+def answer_deferred_question(row, plan, worker_id):
+    chat_id = row["chat_id"]
+    try:
+        with admission.controller.track():
+            ans = generate_answer(chat_id, row["text"], row["language_code"], plan=plan)
+        save_message(chat_id, "assistant", ans)
+        send_message(chat_id, ans)
+    except Exception as e:
+        logger.exception("Deferred answer failed id=%s chat_id=%s", row["id"], chat_id)
+        finish_deferred_answer(row["id"], worker_id, error=str(e)[:500] or type(e).__name__)
+        return
+    finish_deferred_answer(row["id"], worker_id)
+
+
+def deferred_answer_worker_loop():
+    worker_id = get_news_job_worker_id()
+    logger.info("Deferred answer worker started worker_id=%s", worker_id)
+    while True:
+        release_all, plan = admission.controller.release_deferred()
+        row = claim_deferred_answer(worker_id, release_all)
+        if row:
+            answer_deferred_question(row, plan, worker_id)
+            continue
+        update_deferred_answer_gauges()
+        deferred_answer_wakeup.wait(DEFERRED_ANSWER_POLL_SEC)
+        deferred_answer_wakeup.clear()
+
+
+def ensure_deferred_answer_worker():
+    global deferred_answer_worker
+    with deferred_answer_worker_lock:
+        if deferred_answer_worker is None or not deferred_answer_worker.is_alive():
+            deferred_answer_worker = threading.Thread(
+                target=deferred_answer_worker_loop,
+                name="deferred-answer-worker",
+                daemon=True,
+            )
+            deferred_answer_worker.start()
+
+
+def ensure_background_workers():
+    ensure_news_job_worker()
+    ensure_news_scheduler()
+    ensure_deferred_answer_worker()
 
-    normalized_items = normalize_snapshot_items(row)
-    normalized_items = repair_digest_language(normalized_items, lang)
-    if normalized_items:
-        return render_news_digest_html(normalized_items, lang)
 
-    return row.get("rendered_html") or ""
+class BroadcastRateLimiter:
+    """Spaces sends evenly across all sender threads; a 429 pushes every sender back."""
 
+    def __init__(self, messages_per_sec):
+        self.interval = 1.0 / messages_per_sec
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
 
-def build_news_digest(chat_id, lang):
-    system_content = (
-        "Ты собираешь ежедневный миграционный дайджест. "
-        "Отвечай только валидным JSON-массивом без markdown и без пояснений."
-        if lang == "ru" else
-        "You build a daily migration digest. Respond only with a valid JSON array, no markdown, no commentary."
-    )
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_at)
+            self.next_at = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
-    prompt_variants = [build_news_snapshot_prompt(lang)]
-    if lang == "ru":
-        prompt_variants.append(
-            build_news_snapshot_prompt(lang)
-            + "\nСобери более широкую и интересную подборку: стремись к 10 пунктам, минимум к 8, "
-              "и сначала ищи разные страны и разные домены. Не останавливайся на первых 2-3 совпадениях."
-        )
-    else:
-        prompt_variants.append(
-            build_news_snapshot_prompt(lang)
-            + "\nBuild a broader and more interesting selection: aim for 10 items, minimum 8, "
-              "and prioritize different countries and domains before repeating one source."
-        )
+    def pause(self, seconds):
+        with self.lock:
+            self.next_at = max(self.next_at, time.monotonic() + seconds)
 
-    best_result = {"items": [], "rendered_html": "", "raw_response": "", "model_used": ""}
 
-    for prompt in prompt_variants:
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": prompt},
-        ]
-        response, model_used = create_response(messages, lang=lang, news_mode=True)
-        raw_text = (response.output_text or "").strip()
-        items = [normalize_digest_item(item) for item in extract_json_array_from_text(raw_text)]
-        items = [item for item in items if item]
-        items = enrich_digest_items_with_citations(items, response)
-        items = translate_digest_items(items, lang)
-        items = dedupe_digest_items(items)
+def get_telegram_retry_after(resp):
+    try:
+        return float(resp.json().get("parameters", {}).get("retry_after", 1))
+    except (ValueError, AttributeError):
+        return 1.0
 
-        candidate = {
-            "items": items,
-            "rendered_html": render_news_digest_html(items, lang) if items else "",
-            "raw_response": raw_text,
-            "model_used": model_used,
-        }
-        if len(candidate["items"]) > len(best_result["items"]):
-            best_result = candidate
-        if len(candidate["items"]) >= READY_NEWS_MIN_ITEMS:
-            return candidate
 
-    return best_result
+def send_broadcast_message(chat_id, payloads, limiter):
+    for payload in payloads:
+        for _attempt in range(NEWS_BROADCAST_MAX_RETRIES + 1):
+            limiter.wait()
+            try:
+                resp = post_telegram("sendMessage", {**payload, "chat_id": chat_id})
+            except Exception as e:
+                logger.warning("Broadcast send failed chat_id=%s: %s", chat_id, e)
+                continue
+            if resp.status_code == 429:
+                limiter.pause(get_telegram_retry_after(resp))
+                continue
+            if resp.status_code == 403:
+                # The user blocked the bot; stop pushing to them.
+                unsubscribe_news_chat(chat_id)
+                return "blocked"
+            if not resp.ok:
+                logger.warning("Broadcast send error chat_id=%s: %s %s", chat_id, resp.status_code, resp.text)
+                return "failed"
+            break
+        else:
+            return "failed"
+    return "sent"
 
 
-def refresh_news_digest(lang="ru", force=False, chat_id=None):
-    latest_ready = get_latest_news_digest(lang, allow_stale=True)
-    if latest_ready and not force and latest_ready.get("age_sec", NEWS_CACHE_TTL_SEC + 1) < NEWS_CACHE_TTL_SEC:
-        return {
-            "status": "skipped",
-            "reason": "ready_digest_is_fresh",
-            "item_count": len(latest_ready.get("items_json") or []),
-            "updated": False,
-        }
+def run_news_broadcast(broadcast, worker_id):
+    lang = broadcast["language_code"]
+    html = load_news_digest_rendered_html(broadcast["digest_id"], lang)
+    if not html:
+        checkpoint_news_broadcast(broadcast, worker_id, status="failed", error="digest_html_missing")
+        return
 
-    existing_pool_rows = get_news_pool_rows(lang, active_only=False)
-    existing_pool_items = [row_to_digest_item(row) for row in existing_pool_rows]
-    existing_pool_items = [item for item in existing_pool_items if item]
-    existing_pool_urls = {item["source_url"] for item in existing_pool_items if item.get("source_url")}
+    # Rendered and split once, then reused for every subscriber.
+    payloads = [
+        {"text": chunk, "parse_mode": "HTML", "disable_web_page_preview": True}
+        for chunk in split_message_chunks(html)
+    ]
+    broadcast["chunk_count"] = len(payloads)
+    limiter = BroadcastRateLimiter(NEWS_BROADCAST_MESSAGES_PER_SEC)
+    started = time.perf_counter()
+    logger.info(
+        "News broadcast started id=%s digest_id=%s lang=%s resume_after=%s chunks=%s",
+        broadcast["id"], broadcast["digest_id"], lang, broadcast["last_chat_id"], len(payloads),
+    )
 
-    digest = build_news_digest(chat_id or 0, lang)
-    candidate_items = digest["items"]
-    new_candidate_items = [item for item in candidate_items if item.get("source_url") not in existing_pool_urls]
+    try:
+        with ThreadPoolExecutor(max_workers=NEWS_BROADCAST_WORKERS) as executor:
+            while True:
+                chat_ids = load_news_broadcast_batch(lang, broadcast["last_chat_id"], NEWS_BROADCAST_BATCH_SIZE)
+                if not chat_ids:
+                    break
+                for outcome in executor.map(lambda chat_id: send_broadcast_message(chat_id, payloads, limiter), chat_ids):
+                    broadcast[f"{outcome}_count"] += 1
+                    metrics.inc("grs_news_broadcast_recipients_total", lang=lang, outcome=outcome)
+                broadcast["last_chat_id"] = chat_ids[-1]
+                if not checkpoint_news_broadcast(broadcast, worker_id):
+                    logger.warning("News broadcast id=%s lost its lock; stopping", broadcast["id"])
+                    return
+    except Exception as e:
+        logger.exception("News broadcast id=%s crashed", broadcast["id"])
+        checkpoint_news_broadcast(broadcast, worker_id, status="failed", error=f"{e.__class__.__name__}: {e}")
+        return
+
+    checkpoint_news_broadcast(broadcast, worker_id, status="completed")
+    logger.info(
+        "News broadcast finished id=%s lang=%s sent=%s blocked=%s failed=%s seconds=%.1f",
+        broadcast["id"], lang, broadcast["sent_count"], broadcast["blocked_count"], broadcast["failed_count"],
+        time.perf_counter() - started,
+    )
 
-    for item in candidate_items:
-        upsert_news_pool_item(lang, item)
 
-    refreshed_pool_rows = get_news_pool_rows(lang, active_only=False)
-    refreshed_pool_items = [row_to_digest_item(row) for row in refreshed_pool_rows]
-    refreshed_pool_items = [item for item in refreshed_pool_items if item]
-    final_items = merge_news_pool_items(refreshed_pool_items, [])
-    final_items = translate_digest_items(final_items, lang)
-    for item in final_items:
-        upsert_news_pool_item(lang, item)
+def start_news_broadcast(digest_id, lang):
+    if not NEWS_BROADCAST_ENABLED:
+        return
+    worker_id = get_news_job_worker_id()
+    broadcast = create_news_broadcast(digest_id, lang, worker_id)
+    if broadcast:
+        threading.Thread(target=run_news_broadcast, args=(broadcast, worker_id), daemon=True).start()
 
-    quality = evaluate_digest_quality(final_items, lang=lang)
 
-    if is_digest_ready(final_items, lang=lang):
-        set_active_news_pool_items(
-            lang,
-            [item["source_url"] for item in final_items if item.get("source_url")],
-        )
-        rendered_html = render_news_digest_html(final_items, lang)
-        digest_id = save_news_digest(
-            lang,
-            final_items,
-            rendered_html,
-            digest["raw_response"],
-            digest["model_used"],
-            status="ready",
-        )
-        if not digest_id:
-            return {
-                "status": "failed",
-                "updated": False,
-                "new_count": len(new_candidate_items),
-                "item_count": len(final_items),
-                "domains": quality["domains"],
-                "urls": quality["urls"],
-                "generic_urls": quality["generic_urls"],
-                "language_mismatches": quality["language_mismatches"],
-                "reason": "save_ready_digest_failed",
-            }
-        return {
-            "status": "ready",
-            "updated": bool(new_candidate_items),
-            "new_count": len(new_candidate_items),
-            "item_count": len(final_items),
-            "domains": quality["domains"],
-            "urls": quality["urls"],
-            "generic_urls": quality["generic_urls"],
-            "language_mismatches": quality["language_mismatches"],
-            "digest_id": digest_id,
-        }
+def resume_news_broadcasts():
+    if not NEWS_BROADCAST_ENABLED:
+        return
+    worker_id = get_news_job_worker_id()
+    for broadcast in claim_stale_news_broadcasts(worker_id):
+        logger.warning("Resuming news broadcast id=%s after chat_id=%s", broadcast["id"], broadcast["last_chat_id"])
+        threading.Thread(target=run_news_broadcast, args=(broadcast, worker_id), daemon=True).start()
 
-    if not new_candidate_items and refreshed_pool_items:
-        return {
-            "status": "unchanged",
-            "updated": False,
-            "new_count": 0,
-            "item_count": quality["item_count"],
-            "domains": quality["domains"],
-            "urls": quality["urls"],
-            "generic_urls": quality["generic_urls"],
-            "language_mismatches": quality["language_mismatches"],
-        }
 
-    digest_id = save_news_digest(
-        lang,
-        final_items or candidate_items,
-        render_news_digest_html(final_items or candidate_items, lang) if (final_items or candidate_items) else "",
-        digest["raw_response"],
-        digest["model_used"],
-        status="draft" if candidate_items else "failed",
-    )
-    return {
-        "status": "draft" if candidate_items else "failed",
-        "updated": False,
-        "new_count": len(new_candidate_items),
-        "item_count": quality["item_count"],
-        "domains": quality["domains"],
-        "urls": quality["urls"],
-        "generic_urls": quality["generic_urls"],
-        "language_mismatches": quality["language_mismatches"],
-        "digest_id": digest_id,
-    }
+def serialize_news_digest_job(job):
+    payload = {}
+    for key, value in job.items():
+        if key == "created":
+            continue
+        payload[key] = value.isoformat() if isinstance(value, datetime) else value
+    return payload
 
 
 def escape_html(text):
@@ -2753,10 +4663,7 @@ def split_message_chunks(text, limit=TELEGRAM_MAX_MESSAGE_LEN):
 # ---------------------------------------------
 # Генерация ответа (Responses API + web_search)
 # ---------------------------------------------
-def generate_answer(chat_id, user_message, lang="ru", use_history=True, news_mode=False):
-    history = load_history(chat_id, limit=MAX_HISTORY_MESSAGES) if use_history else []
-
-    system_prompt = """Ты — AI-консультант по вопросам миграционного права, виз, ВНЖ/ПМЖ и релокации.
+CHAT_SYSTEM_PROMPT = """Ты — AI-консультант по вопросам миграционного права, виз, ВНЖ/ПМЖ и релокации.
 
 Задача:
 - давать актуальный и практичный ответ по сути вопроса;
@@ -2772,13 +4679,26 @@ def generate_answer(chat_id, user_message, lang="ru", use_history=True, news_mod
 - если вопрос требует актуальных данных, опирайся на web_search, а не на общие знания;
 - пиши профессионально, понятно и без канцелярита.
 """
-    if news_mode:
-        system_prompt += "\nФормат ответа: простой текст без Markdown."
 
+
+def build_chat_system_prompt(variant):
+    if variant == "plain_text":
+        return CHAT_SYSTEM_PROMPT + "\nФормат ответа: простой текст без Markdown."
+    return CHAT_SYSTEM_PROMPT
+
+
+def build_answer_messages(history, user_message, news_mode=False):
+    # System prompt, then history oldest-first, then the new message: each turn
+    # extends the previous request's prefix, so cached tokens carry over.
+    system_prompt = get_static_prompt("chat_system", "plain_text" if news_mode else "default", build_chat_system_prompt)
     messages = [{"role": "system", "content": system_prompt}]
     for row in history:
         messages.append({"role": row["role"], "content": row["content"]})
     messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+def log_generate_answer(chat_id, lang, news_mode, use_history, history, user_message):
     gen_msg = (
         "Generate answer "
         f"chat_id={chat_id} lang={lang} news_mode={news_mode} "
@@ -2788,71 +4708,138 @@ def generate_answer(chat_id, user_message, lang="ru", use_history=True, news_mod
     logger.info(gen_msg)
     print(gen_msg, flush=True)
 
+
+def mentions_access_limitation(content):
+    content_l = content.lower()
+    return (
+        "нет доступа" in content_l
+        or "no access" in content_l
+        or "don't have access" in content_l
+        or "do not have access" in content_l
+    )
+
+
+def get_access_retry_rule(lang):
+    return (
+        "Пожалуйста, используй web_search и не упоминай ограничения доступа."
+        if lang == "ru"
+        else "Please use web_search and do not mention access limitations."
+    )
+
+
+def get_news_retry_rule(lang):
+    return (
+        "Не используй Wikipedia/вики-источники. Дай только релевантные миграционные новости "
+        "для релокантов из РФ и не включай нерелевантный общий новостной шум."
+        if lang == "ru"
+        else "Do not use Wikipedia/wiki sources. Only return migration news relevant to "
+             "Russian relocators and exclude generic news noise."
+    )
+
+
+def finalize_answer_text(content, news_mode=False):
+    return sanitize_plain_text(content, preserve_urls=news_mode) if news_mode else content
+
+
+def get_answer_fallback_models(news_mode=False, plan=None):
+    if plan and plan.get("model"):
+        # Degraded answers already run on the cheap model; skip the large fallback chain.
+        return []
+    response_models = get_response_models(news_mode=news_mode)
+    return response_models[1:] if len(response_models) > 1 else response_models
+
+
+def get_answer_error_text(err_text, lang):
+    if "rate_limit" in err_text or "token" in err_text.lower():
+        return TEXTS[lang]["rate_limited"]
+    return TEXTS[lang]["error"]
+
+
+def get_answer_history_limit(plan=None):
+    if plan and plan.get("history_limit"):
+        return min(plan["history_limit"], MAX_HISTORY_MESSAGES)
+    return MAX_HISTORY_MESSAGES
+
+
+def generate_answer(chat_id, user_message, lang="ru", use_history=True, news_mode=False, plan=None):
+    history = load_history(chat_id, limit=get_answer_history_limit(plan)) if use_history else []
+    messages = build_answer_messages(history, user_message, news_mode=news_mode)
+    log_generate_answer(chat_id, lang, news_mode, use_history, history, user_message)
+
     try:
-        response, model_used = create_response(messages, lang=lang, news_mode=news_mode)
+        started = time.perf_counter()
+        try:
+            response, model_used = create_response(messages, lang=lang, news_mode=news_mode, plan=plan)
+        finally:
+            # Timeouts and errors are the slow calls admission most needs to see.
+            admission.controller.record_latency(time.perf_counter() - started)
         content = extract_response_text(response, news_mode=news_mode)
-        content_l = content.lower()
 
-        if (
-            "нет доступа" in content_l
-            or "no access" in content_l
-            or "don't have access" in content_l
-            or "do not have access" in content_l
-        ):
-            retry_rule = (
-                "Пожалуйста, используй web_search и не упоминай ограничения доступа."
-                if lang == "ru"
-                else "Please use web_search and do not mention access limitations."
-            )
-            retry_messages = messages + [{"role": "user", "content": retry_rule}]
-            retry, _ = create_response(retry_messages, lang=lang, news_mode=news_mode)
+        if mentions_access_limitation(content):
+            retry_messages = messages + [{"role": "user", "content": get_access_retry_rule(lang)}]
+            retry, _ = create_response(retry_messages, lang=lang, news_mode=news_mode, plan=plan)
             return extract_response_text(retry, news_mode=news_mode)
 
         if news_mode and needs_news_retry(content):
-            retry_rule = (
-                "Не используй Wikipedia/вики-источники. Дай только релевантные миграционные новости "
-                "для релокантов из РФ и не включай нерелевантный общий новостной шум."
-                if lang == "ru"
-                else "Do not use Wikipedia/wiki sources. Only return migration news relevant to "
-                     "Russian relocators and exclude generic news noise."
-            )
-            retry_messages = messages + [{"role": "user", "content": retry_rule}]
-            retry, _ = create_response(retry_messages, lang=lang, news_mode=news_mode)
+            retry_messages = messages + [{"role": "user", "content": get_news_retry_rule(lang)}]
+            retry, _ = create_response(retry_messages, lang=lang, news_mode=news_mode, plan=plan)
             content = extract_response_text(retry, news_mode=news_mode)
 
-        logger.info("OpenAI response completed with model=%s news_mode=%s", model_used, news_mode)
-        return sanitize_plain_text(content, preserve_urls=news_mode) if news_mode else content
+        logger.info(
+            "OpenAI response completed with model=%s news_mode=%s admission=%s",
+            model_used, news_mode, plan["mode"] if plan else "normal",
+        )
+        return finalize_answer_text(content, news_mode=news_mode)
 
     except Exception as e:
         err_text = str(e)
         logger.exception("Error OpenAI (Responses API): %s", err_text)
         print(f"Error OpenAI (Responses API): {err_text}", flush=True)
 
-        last_fb_error = None
-        response_models = get_response_models(news_mode=news_mode)
-        fallback_candidates = response_models[1:] if len(response_models) > 1 else response_models
-        for fallback_model in fallback_candidates:
+        for fallback_model in get_answer_fallback_models(news_mode=news_mode, plan=plan):
             try:
-                fb = client.responses.create(model=fallback_model, input=messages)
+                fb = call_openai_responses("fallback", model=fallback_model, input=messages)
                 fb_text = extract_response_text(fb, news_mode=news_mode)
-                return sanitize_plain_text(fb_text, preserve_urls=news_mode) if news_mode else fb_text
+                return finalize_answer_text(fb_text, news_mode=news_mode)
             except Exception as fb_err:
-                last_fb_error = fb_err
                 logger.exception("Fallback error model=%s: %s", fallback_model, fb_err)
                 print(f"Fallback error model={fallback_model}: {fb_err}", flush=True)
 
-        if "rate_limit" in err_text or "token" in err_text.lower():
-            return TEXTS[lang]["rate_limited"]
-        if last_fb_error:
-            return TEXTS[lang]["error"]
-        return TEXTS[lang]["error"]
+        return get_answer_error_text(err_text, lang)
 
 # ---------------------------------------------
 # Отправка сообщений (с клавиатурой)
 # ---------------------------------------------
+# One session keeps Telegram connections (and their TLS handshakes) alive across
+# calls; sized for the broadcast sender threads.
+telegram_session = requests.Session()
+telegram_session.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(10, NEWS_BROADCAST_WORKERS)),
+)
+
+
+def post_telegram(method, payload, timeout=REQUEST_TIMEOUT_SEC):
+    try:
+        with metrics.timer("grs_telegram_request_seconds", method=method):
+            resp = telegram_session.post(
+                f"{TELEGRAM_API_BASE_URL}/bot{TELEGRAM_TOKEN}/{method}",
+                json=payload,
+                timeout=timeout,
+            )
+    except Exception:
+        metrics.inc("grs_telegram_errors_total", method=method, status="exception")
+        raise
+
+    if resp.status_code == 429:
+        metrics.inc("grs_telegram_rate_limited_total", method=method)
+    elif not resp.ok:
+        metrics.inc("grs_telegram_errors_total", method=method, status=resp.status_code)
+    return resp
+
+
 def send_message(chat_id, text, keyboard=None, parse_mode=None, disable_web_page_preview=False):
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
         chunks = split_message_chunks(text)
 
         for index, chunk in enumerate(chunks):
@@ -2865,7 +4852,7 @@ def send_message(chat_id, text, keyboard=None, parse_mode=None, disable_web_page
             if disable_web_page_preview:
                 payload["disable_web_page_preview"] = True
 
-            resp = requests.post(url, json=payload, timeout=REQUEST_TIMEOUT_SEC)
+            resp = post_telegram("sendMessage", payload)
             if not resp.ok:
                 logger.error("Send Error: %s %s", resp.status_code, resp.text)
                 break
@@ -2874,9 +4861,8 @@ def send_message(chat_id, text, keyboard=None, parse_mode=None, disable_web_page
 
 def send_chat_action(chat_id, action="typing"):
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendChatAction"
         payload = {"chat_id": chat_id, "action": action}
-        resp = requests.post(url, json=payload, timeout=REQUEST_TIMEOUT_SEC)
+        resp = post_telegram("sendChatAction", payload)
         if not resp.ok:
             if resp.status_code == 429:
                 logger.warning("Chat Action rate limited: %s", resp.text)
@@ -2900,6 +4886,17 @@ def is_news_job_active(chat_id, lang):
         return make_news_job_key(chat_id, lang) in active_news_jobs
 
 
+def reserve_news_job(chat_id, lang):
+    job_key = make_news_job_key(chat_id, lang)
+    with active_news_jobs_lock:
+        if job_key in active_news_jobs:
+            logger.info("News refresh job already active for %s", job_key)
+            print(f"News refresh job already active for {job_key}", flush=True)
+            return False
+        active_news_jobs.add(job_key)
+    return True
+
+
 def is_news_refresh_command(text):
     parts = (text or "").strip().split(maxsplit=1)
     if not parts:
@@ -2910,6 +4907,22 @@ def is_news_refresh_command(text):
     return command in {"refresh_news", "refresh_news_digest"}
 
 
+def is_subscribe_command(text):
+    parts = (text or "").strip().split(maxsplit=1)
+    if not parts:
+        return False
+
+    command = parts[0].lower()
+    command = command.split("@", 1)[0].lstrip("/")
+    return command in {"subscribe", "unsubscribe"}
+
+
+def get_subscription_reply(subscribed, lang):
+    if subscribed is None:
+        return TEXTS[lang]["error"]
+    return TEXTS[lang]["news_subscribed" if subscribed else "news_unsubscribed"]
+
+
 def is_news_status_command(text):
     parts = (text or "").strip().split(maxsplit=1)
     if not parts:
@@ -2931,9 +4944,19 @@ def normalize_snapshot_items(row):
     if not isinstance(items, list):
         return []
 
-    normalized_items = [normalize_digest_item(item) for item in items]
-    normalized_items = [item for item in normalized_items if item]
-    return dedupe_digest_items(normalized_items)
+    loaded = (load_snapshot_item(item) for item in items)
+    return dedupe_digest_items([item for item in loaded if item])
+
+
+def load_snapshot_item(data):
+    if not isinstance(data, dict):
+        return None
+    if not str(data.get("title") or "").strip() or not str(data.get("summary") or "").strip():
+        return None
+    if not data.get("normalized_title_key"):
+        # Stored before DigestItem: it never went through the current normalization.
+        return normalize_digest_item(data)
+    return DigestItem.from_json(data)
 
 
 def format_digest_age(age_sec, lang):
@@ -2960,6 +4983,34 @@ def check_database_health():
         return False
 
 
+def format_digest_stage_timings(stage_timings, lang, limit=6):
+    if isinstance(stage_timings, str):
+        try:
+            stage_timings = json.loads(stage_timings)
+        except json.JSONDecodeError:
+            stage_timings = None
+    if not isinstance(stage_timings, dict) or not stage_timings.get("stages"):
+        return "нет данных" if lang == "ru" else "no data"
+
+    seconds_label = "с" if lang == "ru" else "s"
+    tokens_label = "токенов" if lang == "ru" else "tokens"
+    lines = [
+        f"{stage_timings.get('total_seconds', 0):.1f} {seconds_label}, "
+        f"{tokens_label}: {stage_timings.get('tokens', 0)}"
+    ]
+    slowest = sorted(stage_timings["stages"], key=lambda stage: stage.get("seconds", 0), reverse=True)
+    for stage in slowest[:limit]:
+        details = [f"{stage.get('seconds', 0):.1f} {seconds_label}"]
+        if stage.get("calls", 1) > 1:
+            details.append(f"x{stage['calls']}")
+        if stage.get("items") is not None:
+            details.append(f"items={stage['items']}")
+        if stage.get("tokens"):
+            details.append(f"{tokens_label}={stage['tokens']}")
+        lines.append(f"- {stage.get('name')}: {' '.join(details)}")
+    return "\n".join(lines)
+
+
 def get_news_digest_status(lang, chat_id=None):
     db_ok = check_database_health()
     active_rows = get_news_pool_rows(lang, active_only=True)
@@ -2968,11 +5019,12 @@ def get_news_digest_status(lang, chat_id=None):
     active_items = dedupe_digest_items(active_items)
     active_quality = evaluate_digest_quality(active_items, lang=lang)
 
-    ready_digest = get_latest_news_digest(lang, allow_stale=True)
+    ready_digest = get_latest_news_digest(lang, allow_stale=True, projection="status")
     ready_items = normalize_snapshot_items(ready_digest)
     ready_quality = evaluate_digest_quality(ready_items, lang=lang)
     ready_age_sec = ready_digest.get("age_sec") if ready_digest else None
     ready_created_at = ready_digest.get("created_at") if ready_digest else None
+    ready_timings = format_digest_stage_timings(ready_digest.get("stage_timings") if ready_digest else None, lang)
 
     if lang == "ru":
         ready_time = ready_created_at.isoformat() if ready_created_at else "нет"
@@ -2989,7 +5041,8 @@ def get_news_digest_status(lang, chat_id=None):
             f"неоригинальных URL: {ready_quality['generic_urls']}, "
             f"языковых ошибок: {ready_quality['language_mismatches']}\n"
             f"Возраст snapshot: {format_digest_age(ready_age_sec, lang)}\n"
-            f"Создан: {ready_time}"
+            f"Создан: {ready_time}\n\n"
+            f"Время сборки snapshot: {ready_timings}"
         )
 
     ready_time = ready_created_at.isoformat() if ready_created_at else "none"
@@ -3006,7 +5059,8 @@ def get_news_digest_status(lang, chat_id=None):
         f"generic URLs: {ready_quality['generic_urls']}, "
         f"language mismatches: {ready_quality['language_mismatches']}\n"
         f"Snapshot age: {format_digest_age(ready_age_sec, lang)}\n"
-        f"Created: {ready_time}"
+        f"Created: {ready_time}\n\n"
+        f"Snapshot build time: {ready_timings}"
     )
 
 
@@ -3031,7 +5085,9 @@ def process_news_refresh_request(chat_id, lang, trigger_text, force=False):
                     f"Пунктов в подборке: {result.get('item_count', 0)}\n"
                     f"Доменов: {result.get('domains', 0)}\n"
                     f"Неоригинальных URL: {result.get('generic_urls', 0)}\n"
-                    f"Языковых ошибок: {result.get('language_mismatches', 0)}"
+                    f"Языковых ошибок: {result.get('language_mismatches', 0)}\n"
+                    f"Кэш перевода: {result.get('translation_cache', {}).get('hit_rate', 0.0):.0%}\n"
+                    f"Пустых запросов поиска: {result.get('extraction', {}).get('wasted_calls', 0)}"
                 )
             else:
                 ans = (
@@ -3041,7 +5097,9 @@ def process_news_refresh_request(chat_id, lang, trigger_text, force=False):
                     f"Items in digest: {result.get('item_count', 0)}\n"
                     f"Domains: {result.get('domains', 0)}\n"
                     f"Generic URLs: {result.get('generic_urls', 0)}\n"
-                    f"Language mismatches: {result.get('language_mismatches', 0)}"
+                    f"Language mismatches: {result.get('language_mismatches', 0)}\n"
+                    f"Translation cache hit rate: {result.get('translation_cache', {}).get('hit_rate', 0.0):.0%}\n"
+                    f"Wasted search calls: {result.get('extraction', {}).get('wasted_calls', 0)}"
                 )
         except Exception:
             logger.exception("Unhandled error in process_news_refresh_request chat_id=%s lang=%s", chat_id, lang)
@@ -3075,6 +5133,115 @@ def get_lang_keyboard():
     }
 
 
+def match_language_choice(text):
+    if text == TEXTS["ru"]["btn_ru"] or text == "🇷🇺 Русский":
+        return "ru"
+    if text == TEXTS["en"]["btn_en"] or text == "🇬🇧 English":
+        return "en"
+    return None
+
+
+def get_menu_reply(text, lang, user):
+    ru_t = TEXTS["ru"]
+    en_t = TEXTS["en"]
+    t = TEXTS[lang]
+
+    if text in [ru_t["btn_contact"], en_t["btn_contact"]]:
+        return t["contact_info"]
+    if text in [ru_t["btn_help"], en_t["btn_help"]]:
+        return t["help_info"]
+    if text in [ru_t["btn_limit"], en_t["btn_limit"]]:
+        return t["limit_info"].format(count=user['request_count'], max=MAX_FREE_REQUESTS)
+    return None
+
+
+def is_news_button(text):
+    return text in [TEXTS["ru"]["btn_news"], TEXTS["en"]["btn_news"]]
+
+
+def get_user_lang(user):
+    lang = user.get("language_code", "ru")
+    return lang if lang in ["ru", "en"] else "ru"
+
+
+def is_request_limit_reached(user):
+    return user['request_count'] >= MAX_FREE_REQUESTS and not user.get('is_premium')
+
+
+def get_news_button_reply(lang):
+    active_digest = get_active_news_digest(lang)
+    if active_digest and active_digest.get("rendered_html"):
+        return active_digest["rendered_html"]
+
+    ready_digest = get_latest_news_digest(lang, allow_stale=True, projection="render")
+    return render_news_digest_snapshot(ready_digest, lang)
+
+
+def warm_up():
+    """Gets a serving process ready before its first update: DB pool, OpenAI client,
+    live Telegram/OpenAI connections and the background workers.
+
+    Called from gunicorn's post_fork (gunicorn.conf.py); /ready retries it until it
+    succeeds. Returns True once the process is ready.
+    """
+    with startup_lock:
+        if startup_state["ready"]:
+            return True
+        startup_state["attempts"] += 1
+        log_startup_config()
+        trace = metrics.SpanTracer("grs_startup_stage_seconds")
+        try:
+            with trace.span("db_pool"):
+                DatabasePool.initialize()
+            with trace.span("openai_client"):
+                get_openai_client()
+            if STARTUP_WARM_CONNECTIONS:
+                # Failures here only cost the first request a handshake; they do not block readiness.
+                with trace.span("telegram_connection"):
+                    try:
+                        post_telegram("getMe", {}, timeout=STARTUP_WARM_TIMEOUT_SEC)
+                    except Exception as e:
+                        logger.warning(f"Telegram warm-up failed: {e}")
+                with trace.span("openai_connection"):
+                    try:
+                        get_openai_client().with_options(
+                            timeout=STARTUP_WARM_TIMEOUT_SEC, max_retries=0
+                        ).models.retrieve(OPENAI_MODEL)
+                    except Exception as e:
+                        logger.warning(f"OpenAI warm-up failed: {e}")
+            with trace.span("background_workers"):
+                ensure_background_workers()
+        except Exception as e:
+            startup_state["error"] = f"{e.__class__.__name__}: {e}"
+            logger.error(f"Warm-up failed attempt={startup_state['attempts']}: {e}")
+            return False
+        finally:
+            startup_state["timings"] = trace.as_dict()
+
+        startup_state["ready"] = True
+        startup_state["error"] = None
+        logger.info("Warm-up finished pid=%s timings=%s", os.getpid(), startup_state["timings"])
+        return True
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    if not startup_state["ready"]:
+        warm_up()
+    return jsonify({
+        "ok": startup_state["ready"],
+        "attempts": startup_state["attempts"],
+        "error": startup_state["error"],
+        "timings": startup_state["timings"],
+    }), 200 if startup_state["ready"] else 503
+
+
+@app.before_request
+def start_background_workers():
+    # Started lazily so they only run in serving processes (not in scripts that import this module).
+    ensure_background_workers()
+
+
 @app.route("/tasks/refresh-news-digest", methods=["POST", "GET"])
 def refresh_news_digest_task():
     token = request.headers.get("X-News-Cron-Token") or request.args.get("token")
@@ -3083,13 +5250,45 @@ def refresh_news_digest_task():
 
     lang = request.args.get("lang", "ru")
     force = request.args.get("force", "0").lower() in {"1", "true", "yes"}
-    result = refresh_news_digest(lang=lang, force=force)
-    return jsonify({"ok": True, **result})
+    # The build outlives the gunicorn worker timeout, so it runs as a background job.
+    job = enqueue_news_digest_job(lang, force=force)
+    if not job:
+        return jsonify({"ok": False, "error": "enqueue_failed"}), 503
+    news_job_wakeup.set()
+    return jsonify({
+        "ok": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "created": job["created"],
+        "status_url": f"/tasks/news-digest-jobs/{job['id']}",
+    }), 202
+
+
+@app.route("/tasks/news-digest-jobs/<int:job_id>", methods=["GET"])
+def news_digest_job_status(job_id):
+    token = request.headers.get("X-News-Cron-Token") or request.args.get("token")
+    if not NEWS_CRON_TOKEN or token != NEWS_CRON_TOKEN:
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+
+    job = get_news_digest_job(job_id)
+    if not job:
+        return jsonify({"ok": False, "error": "not_found"}), 404
+    return jsonify({"ok": True, **serialize_news_digest_job(job)})
 
 # ---------------------------------------------
 # Webhook
 # ---------------------------------------------
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    if METRICS_TOKEN:
+        token = request.headers.get("X-Metrics-Token") or request.args.get("token")
+        if token != METRICS_TOKEN:
+            return jsonify({"ok": False, "error": "forbidden"}), 403
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route(f"/webhook/{TELEGRAM_TOKEN}", methods=["POST"])
+@metrics.timed("grs_webhook_seconds")
 def webhook():
     if TELEGRAM_WEBHOOK_SECRET:
         secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token")
@@ -3122,12 +5321,9 @@ def webhook():
         send_message(chat_id, TEXTS["ru"]["welcome"], get_lang_keyboard())
         return "ok"
 
-    lang = user.get("language_code", "ru")
-    if lang not in ["ru", "en"]: lang = "ru" # fallback
+    lang = get_user_lang(user)
 
     t = TEXTS[lang]
-    ru_t = TEXTS["ru"]
-    en_t = TEXTS["en"]
     skip_search_notice = False
 
     # 2. Обработка команд и кнопок
@@ -3140,14 +5336,9 @@ def webhook():
             send_message(chat_id, pending_news_message(lang))
             return "ok"
 
-        job_key = make_news_job_key(chat_id, lang)
-        with active_news_jobs_lock:
-            if job_key in active_news_jobs:
-                logger.info("News refresh job already active for %s", job_key)
-                print(f"News refresh job already active for {job_key}", flush=True)
-                send_message(chat_id, pending_news_message(lang))
-                return "ok"
-            active_news_jobs.add(job_key)
+        if not reserve_news_job(chat_id, lang):
+            send_message(chat_id, pending_news_message(lang))
+            return "ok"
 
         send_message(chat_id, t["searching"])
         worker = threading.Thread(
@@ -3166,52 +5357,33 @@ def webhook():
         send_message(chat_id, get_news_digest_status(lang, chat_id=chat_id))
         return "ok"
 
-    # Смена языка
-    if text == TEXTS["ru"]["btn_ru"] or text == "🇷🇺 Русский":
-        update_user_language(chat_id, "ru")
-        send_message(chat_id, TEXTS["ru"]["lang_selected"], get_main_keyboard("ru"))
-        return "ok"
-    
-    if text == TEXTS["en"]["btn_en"] or text == "🇬🇧 English":
-        update_user_language(chat_id, "en")
-        send_message(chat_id, TEXTS["en"]["lang_selected"], get_main_keyboard("en"))
+    if is_subscribe_command(text):
+        send_message(chat_id, get_subscription_reply(toggle_news_subscription(chat_id), lang))
         return "ok"
 
-    # Кнопки меню (проверяем оба языка, чтобы избежать рассинхрона)
-    if text in [ru_t["btn_contact"], en_t["btn_contact"]]:
-        send_message(chat_id, t["contact_info"])
+    # Смена языка
+    selected_lang = match_language_choice(text)
+    if selected_lang:
+        update_user_language(chat_id, selected_lang)
+        send_message(chat_id, TEXTS[selected_lang]["lang_selected"], get_main_keyboard(selected_lang))
         return "ok"
 
-    if text in [ru_t["btn_help"], en_t["btn_help"]]:
-        send_message(chat_id, t["help_info"])
-        return "ok"
-    
-    if text in [ru_t["btn_limit"], en_t["btn_limit"]]:
-        limit_msg = t["limit_info"].format(count=user['request_count'], max=MAX_FREE_REQUESTS)
-        send_message(chat_id, limit_msg)
+    # Кнопки меню (проверяем оба языка, чтобы избежать рассинхрона)
+    menu_reply = get_menu_reply(text, lang, user)
+    if menu_reply:
+        send_message(chat_id, menu_reply)
         return "ok"
 
-    if text in [ru_t["btn_news"], en_t["btn_news"]]:
+    if is_news_button(text):
         if is_news_job_active(chat_id, lang):
             send_message(chat_id, pending_news_message(lang))
             return "ok"
 
-        active_digest = get_active_news_digest(lang)
-        if active_digest and active_digest.get("rendered_html"):
-            send_message(
-                chat_id,
-                active_digest["rendered_html"],
-                parse_mode="HTML",
-                disable_web_page_preview=True,
-            )
-            return "ok"
-
-        ready_digest = get_latest_news_digest(lang, allow_stale=True)
-        ready_digest_html = render_news_digest_snapshot(ready_digest, lang)
-        if ready_digest_html:
+        digest_html = get_news_button_reply(lang)
+        if digest_html:
             send_message(
                 chat_id,
-                ready_digest_html,
+                digest_html,
                 parse_mode="HTML",
                 disable_web_page_preview=True,
             )
@@ -3222,20 +5394,32 @@ def webhook():
     # 3. Обработка обычного текстового запроса (ChatGPT)
     
     # Проверка лимита
-    if user['request_count'] >= MAX_FREE_REQUESTS and not user.get('is_premium'):
+    if is_request_limit_reached(user):
         send_message(chat_id, format_limit_reached_message(lang))
         return "ok"
 
+    # Под нагрузкой OpenAI ответ упрощается по шагам, на последнем шаге — откладывается
+    plan = admission.controller.admit(queue_age_sec=get_update_age(msg))
+    if plan["defer"]:
+        if enqueue_deferred_answer(chat_id, text, lang) is None:
+            send_message(chat_id, t["rate_limited"])
+            return "ok"
+        increment_request_count(chat_id)
+        save_message(chat_id, "user", text)
+        send_message(chat_id, t["busy_queued"])
+        return "ok"
+
     increment_request_count(chat_id)
     save_message(chat_id, "user", text)
     
     # Можно отправить "печатает..." или уведомление
-    ans = generate_answer(chat_id, text, lang)
+    with admission.controller.track():
+        ans = generate_answer(chat_id, text, lang, plan=plan)
     save_message(chat_id, "assistant", ans)
     send_message(chat_id, ans)
 
     return "ok"
 
 if __name__ == "__main__":
-    DatabasePool.initialize()
+    warm_up()
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
@@ -0,0 +1,305 @@
+import gzip
+import json
+import logging
+import re
+from datetime import date, datetime, timezone
+
+from dotenv import load_dotenv
+
+import metrics
+from database import get_db_connection, get_number_env
+
+load_dotenv()
+
+logger = logging.getLogger("grs-history")
+
+# chat_history is range-partitioned by month. Partitions older than the retention
+# window are compressed per chat into chat_history_archive and dropped.
+#
+#   python chat_history_maintenance.py      # run from cron, e.g. daily
+
+CHAT_HISTORY_RETENTION_DAYS = max(31, get_number_env("CHAT_HISTORY_RETENTION_DAYS", 180))
+CHAT_HISTORY_PARTITIONS_AHEAD = get_number_env("CHAT_HISTORY_PARTITIONS_AHEAD", 2)
+CHAT_HISTORY_ARCHIVE_BATCH_ROWS = max(100, get_number_env("CHAT_HISTORY_ARCHIVE_BATCH_ROWS", 5000))
+# Arbitrary constant shared by all replicas so only one runs maintenance at a time.
+CHAT_HISTORY_MAINTENANCE_LOCK_ID = 724_001
+
+PARTITION_NAME_PATTERN = re.compile(r"^chat_history_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(start):
+    return f"chat_history_p{start.year:04d}{start.month:02d}"
+
+
+def create_partitioned_chat_history(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id BIGSERIAL,
+            chat_id BIGINT NOT NULL,
+            role VARCHAR(16) NOT NULL CHECK (role IN ('user','assistant','system')),
+            content TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+    """)
+    # load_history walks this index newest-first inside the recent partitions only.
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS chat_history_chat_created_idx
+        ON chat_history (chat_id, created_at DESC) INCLUDE (role);
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history_default
+        PARTITION OF chat_history DEFAULT;
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history_archive (
+            id BIGSERIAL PRIMARY KEY,
+            chat_id BIGINT NOT NULL,
+            period_start DATE NOT NULL,
+            period_end DATE NOT NULL,
+            message_count INT NOT NULL,
+            payload BYTEA NOT NULL,
+            archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            UNIQUE (chat_id, period_start)
+        );
+    """)
+
+
+def get_chat_history_kind(cur):
+    cur.execute(
+        """
+        SELECT c.relkind
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = 'chat_history' AND n.nspname = current_schema()
+        """
+    )
+    row = cur.fetchone()
+    return row["relkind"] if row else None
+
+
+def list_chat_history_partitions(cur):
+    cur.execute(
+        """
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'chat_history'
+        """
+    )
+    partitions = {}
+    for row in cur.fetchall():
+        match = PARTITION_NAME_PATTERN.match(row["name"])
+        if match:
+            partitions[date(int(match.group("year")), int(match.group("month")), 1)] = row["name"]
+    return partitions
+
+
+def get_default_partition_first_month(cur):
+    cur.execute("SELECT MIN(created_at) AS first_created_at FROM chat_history_default")
+    row = cur.fetchone()
+    return month_start(row["first_created_at"]) if row and row["first_created_at"] else None
+
+
+def default_partition_has_rows(cur, start):
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM chat_history_default WHERE created_at >= %s AND created_at < %s) AS has_rows",
+        (start, add_months(start, 1)),
+    )
+    return cur.fetchone()["has_rows"]
+
+
+def create_chat_history_partition(cur, start):
+    """Creates the month's partition, first moving any of its rows out of the DEFAULT partition.
+
+    Postgres refuses to create a partition whose range already has rows in DEFAULT,
+    so DEFAULT is detached while those rows are re-routed, then attached again.
+    """
+    name = partition_name(start)
+    end = add_months(start, 1)
+    has_rows = default_partition_has_rows(cur, start)
+    if has_rows:
+        cur.execute("ALTER TABLE chat_history DETACH PARTITION chat_history_default")
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {name}
+        PARTITION OF chat_history
+        FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+        """
+    )
+    if has_rows:
+        cur.execute(
+            """
+            WITH moved AS (
+                DELETE FROM chat_history_default
+                WHERE created_at >= %s AND created_at < %s
+                RETURNING id, chat_id, role, content, created_at
+            )
+            INSERT INTO chat_history (id, chat_id, role, content, created_at)
+            SELECT id, chat_id, role, content, created_at FROM moved
+            """,
+            (start, end),
+        )
+        logger.warning("Moved %s chat_history rows from DEFAULT into %s", cur.rowcount, name)
+        cur.execute("ALTER TABLE chat_history ATTACH PARTITION chat_history_default DEFAULT")
+    return name
+
+
+def ensure_chat_history_partitions(cur, first_month=None, months_ahead=CHAT_HISTORY_PARTITIONS_AHEAD):
+    today = datetime.now(timezone.utc).date()
+    existing = list_chat_history_partitions(cur)
+    first = month_start(first_month or today)
+    # Rows only reach DEFAULT when maintenance fell behind; their earlier months get a
+    # partition too, but only where DEFAULT actually holds rows.
+    current = min(first, get_default_partition_first_month(cur) or first)
+    last = add_months(month_start(today), months_ahead)
+    created = []
+
+    while current <= last:
+        if current not in existing and (current >= first or default_partition_has_rows(cur, current)):
+            created.append(create_chat_history_partition(cur, current))
+        current = add_months(current, 1)
+    return created
+
+
+def migrate_unpartitioned_chat_history(cur):
+    logger.warning("Migrating chat_history to a partitioned table")
+    cur.execute("ALTER TABLE chat_history RENAME TO chat_history_unpartitioned")
+    cur.execute("ALTER TABLE chat_history_unpartitioned RENAME CONSTRAINT chat_history_pkey TO chat_history_unpartitioned_pkey")
+    cur.execute("ALTER INDEX IF EXISTS chat_history_chat_created_idx RENAME TO chat_history_unpartitioned_chat_created_idx")
+
+    create_partitioned_chat_history(cur)
+    cur.execute("SELECT MIN(created_at) AS first_created_at FROM chat_history_unpartitioned")
+    first_created_at = cur.fetchone()["first_created_at"]
+    ensure_chat_history_partitions(cur, first_month=first_created_at.date() if first_created_at else None)
+
+    cur.execute(
+        """
+        INSERT INTO chat_history (id, chat_id, role, content, created_at)
+        SELECT id, chat_id, role, content, created_at FROM chat_history_unpartitioned
+        """
+    )
+    cur.execute(
+        """
+        SELECT setval(
+            pg_get_serial_sequence('chat_history', 'id'),
+            COALESCE((SELECT MAX(id) FROM chat_history), 0) + 1,
+            false
+        )
+        """
+    )
+    cur.execute("DROP TABLE chat_history_unpartitioned")
+
+
+def init_chat_history(cur):
+    kind = get_chat_history_kind(cur)
+    if kind == "r":
+        migrate_unpartitioned_chat_history(cur)
+    else:
+        create_partitioned_chat_history(cur)
+        ensure_chat_history_partitions(cur)
+
+
+def archive_chat_history_partition(cur, start, name):
+    end = add_months(start, 1)
+    archived_chats = 0
+    archived_messages = 0
+
+    def flush(chat_id, messages):
+        cur.execute(
+            """
+            INSERT INTO chat_history_archive (chat_id, period_start, period_end, message_count, payload)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (chat_id, period_start) DO NOTHING
+            """,
+            (
+                chat_id,
+                start,
+                end,
+                len(messages),
+                gzip.compress(json.dumps(messages, ensure_ascii=False).encode("utf-8")),
+            ),
+        )
+
+    # A named (server-side) cursor streams the partition instead of loading it into memory.
+    with cur.connection.cursor(name=f"archive_{name}") as reader:
+        reader.itersize = CHAT_HISTORY_ARCHIVE_BATCH_ROWS
+        reader.execute(f"SELECT chat_id, role, content, created_at FROM {name} ORDER BY chat_id, created_at")
+        current_chat_id = None
+        messages = []
+        for row in reader:
+            if row["chat_id"] != current_chat_id and messages:
+                flush(current_chat_id, messages)
+                archived_chats += 1
+                messages = []
+            current_chat_id = row["chat_id"]
+            messages.append({
+                "role": row["role"],
+                "content": row["content"],
+                "created_at": row["created_at"].isoformat(),
+            })
+            archived_messages += 1
+        if messages:
+            flush(current_chat_id, messages)
+            archived_chats += 1
+
+    cur.execute(f"DROP TABLE {name}")
+    return archived_chats, archived_messages
+
+
+def try_maintenance_lock(cur):
+    cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked", (CHAT_HISTORY_MAINTENANCE_LOCK_ID,))
+    return cur.fetchone()["locked"]
+
+
+def run_chat_history_maintenance():
+    today = datetime.now(timezone.utc).date()
+    cutoff = month_start(date.fromordinal(today.toordinal() - CHAT_HISTORY_RETENTION_DAYS))
+    result = {"created_partitions": [], "archived_partitions": [], "archived_messages": 0, "skipped": False}
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            if not try_maintenance_lock(cur):
+                result["skipped"] = True
+                return result
+
+            # Its own transaction: a failure here must not roll back archiving, and vice versa.
+            try:
+                result["created_partitions"] = ensure_chat_history_partitions(cur)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error creating chat_history partitions: {e}")
+                result["partition_error"] = f"{e.__class__.__name__}: {e}"
+
+            # The transaction-scoped lock was released by the commit/rollback above.
+            if not try_maintenance_lock(cur):
+                result["skipped"] = True
+                return result
+            for start, name in sorted(list_chat_history_partitions(cur).items()):
+                # Only whole months that ended before the retention cutoff.
+                if add_months(start, 1) > cutoff:
+                    continue
+                chats, messages = archive_chat_history_partition(cur, start, name)
+                logger.info("Archived %s messages from %s chats and dropped %s", messages, chats, name)
+                result["archived_partitions"].append(name)
+                result["archived_messages"] += messages
+        conn.commit()
+
+    metrics.inc("grs_chat_history_archived_messages_total", result["archived_messages"])
+    return result
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    print(json.dumps(run_chat_history_maintenance(), ensure_ascii=False))
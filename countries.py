@@ -0,0 +1,166 @@
+import re
+
+# Gazetteer for digest items: country names, their Russian case forms and common
+# aliases, all mapped to ISO 3166-1 alpha-2 codes. The index is built once at
+# import; a lookup is one dict probe per token prefix.
+#
+# "EU" (ISO-reserved) stands for EU-wide and Schengen news.
+
+# code: (Russian nominative, English name, extra aliases)
+COUNTRIES = {
+    "AD": ("Андорра", "Andorra", []),
+    "AE": ("ОАЭ", "UAE", ["объединенные арабские эмираты", "объединенных арабских эмиратов", "эмираты", "эмиратах", "united arab emirates", "emirates", "дубай", "dubai"]),
+    "AL": ("Албания", "Albania", []),
+    "AM": ("Армения", "Armenia", []),
+    "AR": ("Аргентина", "Argentina", []),
+    "AT": ("Австрия", "Austria", []),
+    "AU": ("Австралия", "Australia", []),
+    "AZ": ("Азербайджан", "Azerbaijan", []),
+    "BA": ("Босния и Герцеговина", "Bosnia and Herzegovina", ["боснии и герцеговине", "боснии и герцеговины", "босния", "боснии", "bosnia"]),
+    "BE": ("Бельгия", "Belgium", []),
+    "BG": ("Болгария", "Bulgaria", []),
+    "BR": ("Бразилия", "Brazil", []),
+    "BY": ("Беларусь", "Belarus", ["белоруссия", "белоруссии", "белоруссию"]),
+    "CA": ("Канада", "Canada", []),
+    "CH": ("Швейцария", "Switzerland", []),
+    "CL": ("Чили", "Chile", []),
+    "CN": ("Китай", "China", ["кнр", "prc"]),
+    "CO": ("Колумбия", "Colombia", []),
+    "CR": ("Коста-Рика", "Costa Rica", ["коста рика", "коста рике", "коста рики"]),
+    "CY": ("Кипр", "Cyprus", []),
+    "CZ": ("Чехия", "Czechia", ["czech republic", "чешская республика", "чешской республике"]),
+    "DE": ("Германия", "Germany", ["фрг"]),
+    "DK": ("Дания", "Denmark", []),
+    "EE": ("Эстония", "Estonia", []),
+    "EG": ("Египет", "Egypt", ["египта", "египте", "египту"]),
+    "ES": ("Испания", "Spain", []),
+    "EU": ("Евросоюз", "EU", ["ес", "европейский союз", "европейского союза", "европейском союзе", "european union", "шенген", "шенгенская зона", "шенгенской зоне", "шенгенской зоны", "schengen", "schengen area"]),
+    "FI": ("Финляндия", "Finland", []),
+    "FR": ("Франция", "France", []),
+    "GB": ("Великобритания", "United Kingdom", ["британия", "британии", "англия", "англии", "uk", "britain", "great britain", "england"]),
+    "GE": ("Грузия", "Georgia", []),
+    "GR": ("Греция", "Greece", []),
+    "HR": ("Хорватия", "Croatia", []),
+    "HU": ("Венгрия", "Hungary", []),
+    "ID": ("Индонезия", "Indonesia", ["бали", "bali"]),
+    "IE": ("Ирландия", "Ireland", []),
+    "IL": ("Израиль", "Israel", []),
+    "IN": ("Индия", "India", []),
+    "IS": ("Исландия", "Iceland", []),
+    "IT": ("Италия", "Italy", []),
+    "JP": ("Япония", "Japan", []),
+    "KG": ("Киргизия", "Kyrgyzstan", ["кыргызстан", "кыргызстане", "кыргызстана"]),
+    "KP": ("Северная Корея", "North Korea", ["северной корее", "северной кореи", "северную корею", "кндр", "dprk"]),
+    "KR": ("Южная Корея", "South Korea", ["южной корее", "южной кореи", "южную корею", "republic of korea"]),
+    "KZ": ("Казахстан", "Kazakhstan", []),
+    "LT": ("Литва", "Lithuania", []),
+    "LU": ("Люксембург", "Luxembourg", []),
+    "LV": ("Латвия", "Latvia", []),
+    "MA": ("Марокко", "Morocco", []),
+    "MD": ("Молдова", "Moldova", ["молдавия", "молдавии"]),
+    "ME": ("Черногория", "Montenegro", []),
+    "MK": ("Северная Македония", "North Macedonia", ["северной македонии", "македония", "македонии", "macedonia"]),
+    "MT": ("Мальта", "Malta", []),
+    "MX": ("Мексика", "Mexico", []),
+    "MY": ("Малайзия", "Malaysia", []),
+    "NL": ("Нидерланды", "Netherlands", ["нидерландов", "нидерландах", "нидерландам", "голландия", "голландии", "holland", "the netherlands"]),
+    "NO": ("Норвегия", "Norway", []),
+    "NZ": ("Новая Зеландия", "New Zealand", ["новой зеландии", "новую зеландию"]),
+    "PA": ("Панама", "Panama", []),
+    "PE": ("Перу", "Peru", []),
+    "PH": ("Филиппины", "Philippines", ["филиппинах", "филиппин"]),
+    "PL": ("Польша", "Poland", []),
+    "PT": ("Португалия", "Portugal", []),
+    "PY": ("Парагвай", "Paraguay", []),
+    "RO": ("Румыния", "Romania", []),
+    "RS": ("Сербия", "Serbia", []),
+    "RU": ("Россия", "Russia", ["рф", "российская федерация", "российской федерации", "russian federation"]),
+    "SE": ("Швеция", "Sweden", []),
+    "SG": ("Сингапур", "Singapore", []),
+    "SI": ("Словения", "Slovenia", []),
+    "SK": ("Словакия", "Slovakia", []),
+    "TH": ("Таиланд", "Thailand", ["тайланд", "тайланде", "тайланда"]),
+    "TR": ("Турция", "Turkey", ["turkiye"]),
+    "UA": ("Украина", "Ukraine", []),
+    "US": ("США", "USA", ["соединенные штаты", "соединенных штатах", "соединенных штатов", "united states", "u s"]),
+    "UY": ("Уругвай", "Uruguay", []),
+    "UZ": ("Узбекистан", "Uzbekistan", []),
+    "VN": ("Вьетнам", "Vietnam", ["viet nam"]),
+}
+
+# Bare names that are ambiguous inside a title ("Латинской Америки", "Северная
+# Корея"); they only count when the text starts with them.
+LEADING_ONLY_ALIASES = {
+    "KR": ["корея", "корее", "кореи", "korea"],
+    "US": ["америка", "америке", "америки", "america"],
+}
+
+TOKEN_PATTERN = re.compile(r"[a-zа-я0-9]+")
+
+
+def tokenize_country_text(text):
+    return TOKEN_PATTERN.findall(str(text or "").lower().replace("ё", "е"))
+
+
+def get_russian_case_forms(name):
+    """Nominative plus the oblique case forms that show up in news titles."""
+    if name.endswith("ия"):
+        stem, endings = name[:-2], ["ия", "ии", "ию", "ией"]
+    elif name.endswith("я"):
+        stem, endings = name[:-1], ["я", "и", "ю", "ей", "е"]
+    elif name.endswith("а"):
+        stem, endings = name[:-1], ["а", "ы", "и", "е", "у", "ой"]
+    elif name.endswith("ь"):
+        stem, endings = name[:-1], ["ь", "я", "ю", "е", "ем", "и", "ью"]
+    elif name.endswith("й"):
+        stem, endings = name[:-1], ["й", "я", "ю", "е", "ем"]
+    elif name[-1] in "бвгджзклмнпрстфхцчшщ":
+        stem, endings = name, ["", "а", "у", "е", "ом"]
+    else:
+        # Indeclinable: Чили, Перу, Марокко, США.
+        return [name]
+    return [stem + ending for ending in endings]
+
+
+def build_country_index():
+    index = {}
+    for code, (ru_name, en_name, aliases) in COUNTRIES.items():
+        forms = [en_name.lower(), *aliases]
+        ru_tokens = tokenize_country_text(ru_name)
+        if len(ru_tokens) == 1 and not ru_name.isupper():
+            forms.extend(get_russian_case_forms(ru_tokens[0]))
+        else:
+            forms.append(ru_name)
+        for form in forms:
+            tokens = tuple(tokenize_country_text(form))
+            if tokens:
+                index.setdefault(tokens, code)
+    return index
+
+
+COUNTRY_INDEX = build_country_index()
+LEADING_COUNTRY_INDEX = {
+    tuple(tokenize_country_text(alias)): code
+    for code, aliases in LEADING_ONLY_ALIASES.items()
+    for alias in aliases
+}
+COUNTRY_INDEX_MAX_TOKENS = max(len(tokens) for tokens in COUNTRY_INDEX)
+
+
+def find_country_code(text, prefix_only=False):
+    """ISO code of the first country named in text (longest alias wins), or ""."""
+    tokens = tokenize_country_text(text)
+    for start in range(1 if prefix_only else len(tokens)):
+        for length in range(min(COUNTRY_INDEX_MAX_TOKENS, len(tokens) - start), 0, -1):
+            key = tuple(tokens[start:start + length])
+            code = COUNTRY_INDEX.get(key) or (LEADING_COUNTRY_INDEX.get(key) if start == 0 else None)
+            if code:
+                return code
+    return ""
+
+
+def get_country_name(code, lang="ru"):
+    entry = COUNTRIES.get(code)
+    if not entry:
+        return ""
+    return entry[0] if lang == "ru" else entry[1]
@@ -1,11 +1,20 @@
+import json
 import logging
 import os
+import re
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 
 import psycopg2
 from dotenv import load_dotenv
+from psycopg2 import errors
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
 from psycopg2.extras import RealDictCursor
-from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.pool import PoolError
+
+import metrics
 
 logger = logging.getLogger("grs-db")
 
@@ -18,37 +27,432 @@ def get_database_url():
         raise RuntimeError("DATABASE_URL is not set")
     return database_url
 
+
+def get_replica_database_url():
+    return DATABASE_REPLICA_URL
+
+
+def get_number_env(name, default, cast=int):
+    try:
+        return max(0, cast(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        logger.warning("Invalid %s=%r, using default=%s", name, os.getenv(name), default)
+        return default
+
+
+DB_POOL_MIN_SIZE = get_number_env("DB_POOL_MIN_SIZE", 1)
+DB_POOL_MAX_SIZE = max(1, get_number_env("DB_POOL_MAX_SIZE", 20))
+DB_POOL_CHECKOUT_TIMEOUT_SEC = get_number_env("DB_POOL_CHECKOUT_TIMEOUT_SEC", 10.0, float)
+# Connections idle longer than this are pinged before reuse; 0 pings on every checkout.
+DB_POOL_PRE_PING_IDLE_SEC = get_number_env("DB_POOL_PRE_PING_IDLE_SEC", 30.0, float)
+# Connections older than this are closed and reopened; 0 disables recycling.
+DB_POOL_RECYCLE_SEC = get_number_env("DB_POOL_RECYCLE_SEC", 30 * 60, float)
+
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+# Write positions older than this are dropped from the read-your-writes guard.
+DB_REPLICA_GUARD_TTL_SEC = get_number_env("DB_REPLICA_GUARD_TTL_SEC", 300.0, float)
+# After a failed replica checkout, reads go to the primary for this long.
+DB_REPLICA_RETRY_SEC = get_number_env("DB_REPLICA_RETRY_SEC", 30.0, float)
+# Disable behind PgBouncer transaction pooling, where session-level PREPARE is not safe.
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() == "true"
+
+# Handed to a waiter instead of a connection when a pool slot frees up.
+_NEW_CONNECTION = object()
+
+_statements = {}
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def estimate_value_bytes(value):
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (dict, list)):
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    return len(str(value))
+
+
+def record_fetched_bytes(query, rows):
+    """Observe the approximate payload size of fetched rows (text size of each column value)."""
+    total = sum(estimate_value_bytes(value) for row in rows for value in row.values())
+    metrics.observe("grs_db_fetched_bytes", total, query=query)
+    return total
+
+
+def prepared_statement(name, sql):
+    """Register a hot query written with %s placeholders and return its statement name."""
+    counter = iter(range(1, sql.count("%s") + 1))
+    _statements[name] = {
+        "sql": sql,
+        "prepare": f"PREPARE {name} AS " + re.sub(r"%s", lambda _match: f"${next(counter)}", sql),
+        "execute": f"EXECUTE {name}" + (" (" + ", ".join(["%s"] * sql.count("%s")) + ")" if "%s" in sql else ""),
+    }
+    return name
+
+
+def execute_statement(cur, name, params=()):
+    statement = _statements[name]
+    conn = cur.connection
+    prepared = getattr(conn, "prepared", None)
+    if not DB_PREPARED_STATEMENTS or prepared is None:
+        cur.execute(statement["sql"], params)
+        return
+
+    fresh_transaction = conn.get_transaction_status() == TRANSACTION_STATUS_IDLE
+    try:
+        if name not in prepared:
+            cur.execute(statement["prepare"])
+            prepared.add(name)
+        cur.execute(statement["execute"], params)
+    except (errors.InvalidSqlStatementName, errors.FeatureNotSupported) as e:
+        # The session lost its statements (DISCARD ALL, pooler) or a schema change
+        # invalidated the cached plan. Retry once if nothing else ran in this transaction.
+        prepared.clear()
+        if not fresh_transaction:
+            raise
+        logger.warning("Re-preparing statement %s: %s", name, e)
+        conn.rollback()
+        cur.execute("DEALLOCATE ALL")
+        cur.execute(statement["prepare"])
+        prepared.add(name)
+        cur.execute(statement["execute"], params)
+
+
+class PoolTimeoutError(PoolError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, role, get_dsn):
+        self.role = role
+        self.get_dsn = get_dsn
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._idle = deque()
+        self._waiters = deque()
+        self._size = 0
+        self._in_use = 0
+
+    def initialize(self):
+        with self._lock:
+            if self._initialized:
+                return
+            self._initialized = True
+
+        try:
+            for _ in range(min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)):
+                with self._lock:
+                    self._size += 1
+                self._checkin(self._connect())
+            logger.info(
+                "Database connection pool initialized role=%s min=%s max=%s checkout_timeout=%ss",
+                self.role,
+                DB_POOL_MIN_SIZE,
+                DB_POOL_MAX_SIZE,
+                DB_POOL_CHECKOUT_TIMEOUT_SEC,
+            )
+        except Exception as e:
+            with self._lock:
+                self._initialized = False
+            logger.error(f"Error initializing connection pool: {e}")
+            raise
+
+    def _connect(self):
+        try:
+            conn = psycopg2.connect(
+                self.get_dsn(),
+                connection_factory=PooledConnection,
+                cursor_factory=RealDictCursor,
+            )
+        except Exception:
+            self._release_slot()
+            raise
+        return {"conn": conn, "created_at": time.monotonic(), "last_used": time.monotonic()}
+
+    def _publish(self):
+        metrics.set_gauge("grs_db_pool_size", self._size, role=self.role)
+        metrics.set_gauge("grs_db_pool_in_use", self._in_use, role=self.role)
+        metrics.set_gauge("grs_db_pool_idle", len(self._idle), role=self.role)
+        metrics.set_gauge("grs_db_pool_waiting", len(self._waiters), role=self.role)
+
+    def _release_slot(self):
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter["entry"] = _NEW_CONNECTION
+                waiter["ready"].set()
+            else:
+                self._size -= 1
+            self._publish()
+
+    def _checkin(self, entry):
+        entry["last_used"] = time.monotonic()
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter["entry"] = entry
+                waiter["ready"].set()
+            else:
+                self._idle.append(entry)
+            self._publish()
+
+    def _discard(self, entry):
+        try:
+            entry["conn"].close()
+        except Exception:
+            pass
+        self._release_slot()
+
+    def _checkout(self, timeout):
+        waiter = None
+        with self._lock:
+            if self._idle:
+                entry = self._idle.pop()
+            elif self._size < DB_POOL_MAX_SIZE:
+                self._size += 1
+                entry = _NEW_CONNECTION
+            else:
+                # FIFO hand-off: released connections go to the longest waiting thread.
+                waiter = {"ready": threading.Event(), "entry": None}
+                self._waiters.append(waiter)
+                entry = None
+            self._publish()
+
+        if waiter is not None:
+            waiter["ready"].wait(timeout)
+            with self._lock:
+                entry = waiter["entry"]
+                if entry is None:
+                    self._waiters.remove(waiter)
+                    self._publish()
+            if entry is None:
+                metrics.inc("grs_db_pool_timeouts_total", role=self.role)
+                raise PoolTimeoutError(
+                    f"Timed out after {timeout}s waiting for a {self.role} database connection "
+                    f"(pool size {DB_POOL_MAX_SIZE})"
+                )
+
+        if entry is _NEW_CONNECTION:
+            return self._connect()
+        return self._validate(entry)
+
+    def _validate(self, entry):
+        now = time.monotonic()
+        conn = entry["conn"]
+        stale = conn.closed or (DB_POOL_RECYCLE_SEC and now - entry["created_at"] > DB_POOL_RECYCLE_SEC)
+
+        if not stale and now - entry["last_used"] >= DB_POOL_PRE_PING_IDLE_SEC:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except Exception as e:
+                logger.warning("Dropping dead pooled connection: %s", e)
+                stale = True
+
+        if not stale:
+            return entry
+
+        metrics.inc("grs_db_pool_reconnects_total", role=self.role)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        return self._connect()
+
+    def _reset(self, entry):
+        conn = entry["conn"]
+        if conn.closed:
+            return False
+        try:
+            status = conn.get_transaction_status()
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning("Dropping pooled connection that failed to reset: %s", e)
+            return False
+
+    def acquire(self, timeout=None):
+        if not self._initialized:
+            self.initialize()
+
+        started = time.perf_counter()
+        entry = self._checkout(DB_POOL_CHECKOUT_TIMEOUT_SEC if timeout is None else timeout)
+        metrics.observe("grs_db_checkout_wait_seconds", time.perf_counter() - started, role=self.role)
+        with self._lock:
+            self._in_use += 1
+            self._publish()
+        return entry
+
+    def release(self, entry):
+        with self._lock:
+            self._in_use -= 1
+        # Rolls back whatever the caller left open, including read-only transactions.
+        if self._reset(entry):
+            self._checkin(entry)
+        else:
+            self._discard(entry)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        entry = self.acquire(timeout)
+        try:
+            yield entry["conn"]
+        finally:
+            self.release(entry)
+
+
 class DatabasePool:
-    _pool = None
+    primary = ConnectionPool("primary", get_database_url)
+    replica = ConnectionPool("replica", get_replica_database_url) if DATABASE_REPLICA_URL else None
 
     @classmethod
     def initialize(cls):
-        if cls._pool is None:
+        cls.primary.initialize()
+        if cls.replica is not None:
             try:
-                cls._pool = ThreadedConnectionPool(
-                    1, 20,
-                    dsn=get_database_url(),
-                    cursor_factory=RealDictCursor
-                )
-                logger.info("Database connection pool initialized.")
-            except Exception as e:
-                logger.error(f"Error initializing connection pool: {e}")
-                raise
+                cls.replica.initialize()
+            except Exception:
+                logger.warning("Read replica unavailable at startup; reads will use the primary.")
 
     @classmethod
-    @contextmanager
-    def get_connection(cls):
-        if cls._pool is None:
-            cls.initialize()
+    def get_connection(cls, timeout=None):
+        return cls.primary.connection(timeout)
+
 
-        conn = cls._pool.getconn()
+# Read-your-writes guard: the primary WAL position of the last write per key
+# (a chat id or a digest language). Replica reads for that key wait until the
+# replica has replayed past it, otherwise they go to the primary.
+_write_positions = {}
+_write_positions_lock = threading.Lock()
+_replica_retry_at = 0.0
+
+
+def remember_write_position(conn, consistency_key):
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_current_wal_lsn()::text AS lsn")
+            lsn = cur.fetchone()["lsn"]
+    except Exception as e:
+        logger.warning("Could not read WAL position for %s: %s", consistency_key, e)
+        lsn = None
+
+    now = time.monotonic()
+    with _write_positions_lock:
+        _write_positions[consistency_key] = {"lsn": lsn, "written_at": now}
+        if len(_write_positions) > 10000:
+            cutoff = now - DB_REPLICA_GUARD_TTL_SEC
+            for key in [key for key, value in _write_positions.items() if value["written_at"] < cutoff]:
+                _write_positions.pop(key, None)
+
+
+def get_pending_write_position(consistency_key):
+    if consistency_key is None:
+        return None
+    with _write_positions_lock:
+        position = _write_positions.get(consistency_key)
+        if position and time.monotonic() - position["written_at"] > DB_REPLICA_GUARD_TTL_SEC:
+            _write_positions.pop(consistency_key, None)
+            return None
+        return position
+
+
+def forget_write_position(consistency_key, position):
+    with _write_positions_lock:
+        if _write_positions.get(consistency_key) is position:
+            _write_positions.pop(consistency_key, None)
+
+
+def has_replayed(conn, lsn):
+    with conn.cursor() as cur:
+        # COALESCE keeps a replica URL that points at a primary usable in local setups.
+        cur.execute(
+            "SELECT COALESCE(pg_last_wal_replay_lsn(), pg_current_wal_lsn()) >= %s::pg_lsn AS caught_up",
+            (lsn,),
+        )
+        caught_up = cur.fetchone()["caught_up"]
+    conn.rollback()
+    return caught_up
+
+
+@contextmanager
+def get_db_connection(consistency_key=None):
+    with DatabasePool.get_connection() as conn:
+        yield conn
+        if consistency_key is not None and DatabasePool.replica is not None:
+            remember_write_position(conn, consistency_key)
+
+
+@contextmanager
+def get_read_connection(consistency_key=None):
+    """Replica connection for read-only helpers; falls back to the primary when needed."""
+    global _replica_retry_at
+    replica = DatabasePool.replica
+    if replica is None:
+        with DatabasePool.get_connection() as conn:
+            yield conn
+        return
+
+    position = get_pending_write_position(consistency_key)
+    entry = None
+    reason = "ok"
+    if time.monotonic() < _replica_retry_at:
+        reason = "unavailable"
+    else:
         try:
+            entry = replica.acquire()
+            if position is not None:
+                if position["lsn"] is None or not has_replayed(entry["conn"], position["lsn"]):
+                    reason = "lagging"
+                else:
+                    forget_write_position(consistency_key, position)
+        except Exception as e:
+            logger.warning("Read replica checkout failed, using primary for %ss: %s", DB_REPLICA_RETRY_SEC, e)
+            _replica_retry_at = time.monotonic() + DB_REPLICA_RETRY_SEC
+            reason = "error"
+
+    if reason != "ok":
+        if entry is not None:
+            replica.release(entry)
+        metrics.inc("grs_db_reads_total", target="primary", reason=reason)
+        with DatabasePool.get_connection() as conn:
             yield conn
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            cls._pool.putconn(conn)
+        return
+
+    metrics.inc("grs_db_reads_total", target="replica", reason=reason)
+    try:
+        yield entry["conn"]
+    finally:
+        replica.release(entry)
+
+
+def open_advisory_lock_session(lock_id):
+    """Dedicated connection holding a session-level advisory lock, or None if another session holds it.
 
-def get_db_connection():
-    return DatabasePool.get_connection()
+    The lock lives as long as the connection, so it is kept out of the pool and
+    released automatically by Postgres if the process dies.
+    """
+    conn = psycopg2.connect(get_database_url(), cursor_factory=RealDictCursor)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s) AS locked", (lock_id,))
+            locked = cur.fetchone()["locked"]
+    except Exception:
+        conn.close()
+        raise
+    if not locked:
+        conn.close()
+        return None
+    return conn
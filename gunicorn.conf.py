@@ -0,0 +1,37 @@
+# gunicorn -c gunicorn.conf.py bot_grs:app
+#
+# The app (and the OpenAI SDK, the slowest import) is loaded once in the master and
+# shared by forked workers. Each worker then opens its own DB pool and client
+# connections in post_fork, before it accepts requests, so the first update
+# after a deploy or scale-up does not pay for them. /ready reports 200 once a
+# worker is warm.
+#
+# Workers are the default single-threaded sync class, so each answers one update at
+# a time: ADMISSION_IN_FLIGHT_LEVELS (sized for bot_async) never fires here, and the
+# admission level follows OpenAI latency and update queue age instead.
+
+preload_app = True
+
+
+def when_ready(server):
+    import openai  # noqa: F401
+
+    import bot_grs
+
+    bot_grs.log_startup_config()
+
+
+def post_fork(server, worker):
+    import bot_grs
+
+    if not bot_grs.warm_up():
+        # Not fatal: /ready keeps answering 503 and retries the warm-up.
+        server.log.warning("Worker %s started cold: %s", worker.pid, bot_grs.startup_state["error"])
+
+
+def worker_exit(server, worker):
+    import bot_grs
+
+    # Questions deferred under load are stored in deferred_answers; requeue the one
+    # this worker was answering so another worker picks it up.
+    bot_grs.release_deferred_answers(bot_grs.get_news_job_worker_id())
@@ -5,6 +5,9 @@ import psycopg2
 from dotenv import load_dotenv
 from psycopg2.extras import RealDictCursor
 
+from chat_history_maintenance import init_chat_history
+from countries import find_country_code
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
@@ -12,6 +15,27 @@ logger = logging.getLogger("grs-init")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+
+def backfill_news_pool_country_codes(cur):
+    """Fills country_code for pool rows written before the column existed (one UPDATE per distinct country)."""
+    cur.execute("""
+        SELECT DISTINCT country FROM news_digest_pool
+        WHERE country_code IS NULL AND country IS NOT NULL AND country <> '';
+    """)
+    updated = 0
+    for row in cur.fetchall():
+        code = find_country_code(row["country"])
+        if not code:
+            continue
+        cur.execute(
+            "UPDATE news_digest_pool SET country_code = %s WHERE country = %s AND country_code IS NULL",
+            (code, row["country"]),
+        )
+        updated += cur.rowcount
+    if updated:
+        logger.info(f"news_digest_pool: country_code заполнен для {updated} строк.")
+
+
 def init_db():
     if not DATABASE_URL:
         raise RuntimeError("❌ DATABASE_URL не задан")
@@ -20,22 +44,8 @@ def init_db():
         conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
         cur = conn.cursor()
 
-        # Таблица истории
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS chat_history (
-                id BIGSERIAL PRIMARY KEY,
-                chat_id BIGINT NOT NULL,
-                role VARCHAR(16) NOT NULL CHECK (role IN ('user','assistant','system')),
-                content TEXT NOT NULL,
-                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            );
-        """)
-
-        # Индекс для быстрых выборок
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS chat_history_chat_created_idx
-            ON chat_history (chat_id, created_at DESC);
-        """)
+        # Таблица истории: помесячные партиции, старые партиции архивируются
+        init_chat_history(cur)
 
         # Таблица пользователей
         cur.execute("""
@@ -48,6 +58,20 @@ def init_db():
             );
         """)
 
+        # Подписка на ежедневный дайджест (/subscribe)
+        cur.execute("""
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS news_subscribed BOOLEAN NOT NULL DEFAULT FALSE;
+        """)
+
+        cur.execute("""
+            ALTER TABLE users ADD COLUMN IF NOT EXISTS news_subscribed_at TIMESTAMPTZ;
+        """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS users_news_subscribers_idx
+            ON users (language_code, chat_id) WHERE news_subscribed;
+        """)
+
         # Кэш новостей (по языку)
         cur.execute("""
             CREATE TABLE IF NOT EXISTS news_cache (
@@ -77,6 +101,10 @@ def init_db():
             );
         """)
 
+        cur.execute("""
+            ALTER TABLE news_digests ADD COLUMN IF NOT EXISTS stage_timings JSONB;
+        """)
+
         cur.execute("""
             CREATE INDEX IF NOT EXISTS news_digests_lang_created_idx
             ON news_digests (language_code, created_at DESC);
@@ -104,11 +132,153 @@ def init_db():
             ON news_digest_pool (language_code, source_url);
         """)
 
+        # ISO code from the countries gazetteer, for diversity and per-country lookups
+        cur.execute("""
+            ALTER TABLE news_digest_pool ADD COLUMN IF NOT EXISTS country_code VARCHAR(8);
+        """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS news_digest_pool_country_idx
+            ON news_digest_pool (language_code, country_code, article_date DESC);
+        """)
+        backfill_news_pool_country_codes(cur)
+
         cur.execute("""
             CREATE INDEX IF NOT EXISTS news_digest_pool_active_idx
             ON news_digest_pool (language_code, is_active, article_date DESC, discovered_at DESC);
         """)
 
+        # Persistent cache of digest item translations
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS news_translation_cache (
+                id BIGSERIAL PRIMARY KEY,
+                language_code VARCHAR(10) NOT NULL,
+                content_hash CHAR(64) NOT NULL,
+                model VARCHAR(64) NOT NULL,
+                translated_json JSONB NOT NULL,
+                tokens INT NOT NULL DEFAULT 0,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+        """)
+
+        cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS news_translation_cache_lang_hash_model_uidx
+            ON news_translation_cache (language_code, content_hash, model);
+        """)
+
+        # Language-neutral discovery results shared by all digest languages
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS news_candidates (
+                id BIGSERIAL PRIMARY KEY,
+                source_url TEXT NOT NULL UNIQUE,
+                source_domain VARCHAR(255) NOT NULL,
+                title TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                country VARCHAR(255),
+                article_date_raw TEXT,
+                article_date DATE,
+                content_language VARCHAR(10) NOT NULL,
+                model_used VARCHAR(64),
+                discovered_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+        """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS news_candidates_updated_idx
+            ON news_candidates (updated_at DESC);
+        """)
+
+        # Durable queue for digest refreshes requested via /tasks/refresh-news-digest
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS news_digest_jobs (
+                id BIGSERIAL PRIMARY KEY,
+                language_code VARCHAR(10) NOT NULL,
+                force BOOLEAN NOT NULL DEFAULT FALSE,
+                status VARCHAR(20) NOT NULL DEFAULT 'queued'
+                    CHECK (status IN ('queued','running','succeeded','failed')),
+                attempts INT NOT NULL DEFAULT 0,
+                max_attempts INT NOT NULL DEFAULT 3,
+                run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                locked_by VARCHAR(128),
+                heartbeat_at TIMESTAMPTZ,
+                progress JSONB,
+                result JSONB,
+                last_error TEXT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                started_at TIMESTAMPTZ,
+                finished_at TIMESTAMPTZ,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+        """)
+
+        # At most one pending job per language; repeated cron calls join it.
+        cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS news_digest_jobs_lang_pending_uidx
+            ON news_digest_jobs (language_code) WHERE status IN ('queued','running');
+        """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS news_digest_jobs_pending_idx
+            ON news_digest_jobs (run_after, id) WHERE status IN ('queued','running');
+        """)
+
+        # Questions deferred by admission control under load; answered by the deferred-answer
+        # worker of any serving process, so they survive restarts and deploys.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS deferred_answers (
+                id BIGSERIAL PRIMARY KEY,
+                chat_id BIGINT NOT NULL,
+                language_code VARCHAR(10) NOT NULL,
+                text TEXT NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'queued'
+                    CHECK (status IN ('queued','running','answered','failed')),
+                attempts INT NOT NULL DEFAULT 0,
+                locked_by VARCHAR(128),
+                last_error TEXT,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                started_at TIMESTAMPTZ,
+                finished_at TIMESTAMPTZ
+            );
+        """)
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS deferred_answers_pending_idx
+            ON deferred_answers (created_at, id) WHERE status IN ('queued','running');
+        """)
+
+        # One push of a ready digest to its subscribers; last_chat_id is the resume checkpoint
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS news_broadcasts (
+                id BIGSERIAL PRIMARY KEY,
+                digest_id BIGINT NOT NULL UNIQUE,
+                language_code VARCHAR(10) NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'running'
+                    CHECK (status IN ('running','completed','failed')),
+                locked_by VARCHAR(128),
+                heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                last_chat_id BIGINT,
+                chunk_count INT NOT NULL DEFAULT 0,
+                sent_count INT NOT NULL DEFAULT 0,
+                blocked_count INT NOT NULL DEFAULT 0,
+                failed_count INT NOT NULL DEFAULT 0,
+                last_error TEXT,
+                started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                finished_at TIMESTAMPTZ
+            );
+        """)
+
+        # Group and supergroup chat ids are negative, so "nothing sent yet" is NULL, not 0.
+        cur.execute("""
+            ALTER TABLE news_broadcasts ALTER COLUMN last_chat_id DROP NOT NULL;
+            ALTER TABLE news_broadcasts ALTER COLUMN last_chat_id DROP DEFAULT;
+        """)
+        cur.execute("""
+            UPDATE news_broadcasts SET last_chat_id = NULL
+            WHERE status = 'running' AND last_chat_id = 0
+              AND sent_count + blocked_count + failed_count = 0;
+        """)
+
         conn.commit()
         cur.close()
         conn.close()
@@ -0,0 +1,53 @@
+import re
+
+# Keyword profiles are checked against every message and digest item. Each named
+# set is compiled once into a single regex whose alternation is factored as a
+# trie ("виз(?:а|ы)" rather than "виза|визы"), so a scan costs one pass over the
+# text no matter how many keywords the set grows to.
+
+
+def build_trie_pattern(keywords):
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if "" in node:
+            # Branches are tried before the empty match, so the longest keyword wins.
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return render(trie)
+
+
+class KeywordMatcher:
+    """Named keyword sets; callers pass already lower-cased text."""
+
+    def __init__(self, **keyword_sets):
+        self.patterns = {}
+        for name, keywords in keyword_sets.items():
+            normalized = {keyword.lower() for keyword in keywords if keyword}
+            if not normalized:
+                raise ValueError(f"Keyword set {name!r} is empty")
+            self.patterns[name] = re.compile(build_trie_pattern(normalized))
+
+    def find(self, name, text):
+        """First keyword of the set found anywhere in text, or None."""
+        match = self.patterns[name].search(text)
+        return match.group(0) if match else None
+
+    def contains(self, name, text):
+        return self.patterns[name].search(text) is not None
+
+    def prefix(self, name, text):
+        """Longest keyword of the set that text starts with, or None."""
+        match = self.patterns[name].match(text)
+        return match.group(0) if match else None
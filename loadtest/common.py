@@ -0,0 +1,78 @@
+import json
+import math
+import random
+import threading
+from http.server import BaseHTTPRequestHandler
+
+
+def parse_latency(spec):
+    """Parse 'fixed:0.5', 'uniform:0.2,1.5', 'normal:1.0,0.3' or 'lognormal:0.0,0.5' (seconds)."""
+    kind, _, raw_args = (spec or "fixed:0").partition(":")
+    args = [float(value) for value in raw_args.split(",") if value.strip()]
+    kind = kind.strip().lower()
+
+    if kind == "fixed":
+        return lambda rng: args[0] if args else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(args[0], args[1])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[int(position)]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class FakeServerState:
+    def __init__(self, seed=None):
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.counters = {}
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def sample(self, distribution):
+        with self.lock:
+            return distribution(self.rng)
+
+
+class JsonRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return {}
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,168 @@
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from common import percentile
+
+# Replays a mix of Telegram updates against the bot webhook at a target rate.
+# Latency is measured from the scheduled send time, so queueing inside the
+# driver counts against the bot instead of hiding overload.
+#
+#   cd loadtest
+#   python fake_openai.py --port 8091 --latency lognormal:0.5,0.6 --failure-rate 0.02 &
+#   python fake_telegram.py --port 8092 --rate-limit-ratio 0.01 &
+#   OPENAI_BASE_URL=http://127.0.0.1:8091/v1 TELEGRAM_API_BASE_URL=http://127.0.0.1:8092 \
+#       TELEGRAM_TOKEN=loadtest gunicorn --bind 127.0.0.1:8080 --chdir .. bot_grs:app &
+#   (or: ... uvicorn --port 8080 --app-dir .. bot_async:app & for the asyncio mode)
+#   python driver.py --webhook-url http://127.0.0.1:8080/webhook/loadtest --rate 20 --duration 120 \
+#       --telegram-stats-url http://127.0.0.1:8092/stats --openai-stats-url http://127.0.0.1:8091/stats
+
+QUESTIONS = [
+    "Какие документы нужны для ВНЖ в Испании?",
+    "Сколько сейчас рассматривают заявление на гражданство Португалии?",
+    "Можно ли получить визу цифрового кочевника в Грузии?",
+    "What is the current income requirement for the Spanish digital nomad visa?",
+    "Какие последние новости по золотой визе в Греции?",
+    "Как продлить ВНЖ в Сербии?",
+]
+ROUTE_TEXTS = {
+    "news": ["📰 Актуальные новости", "📰 Latest News"],
+    "lang": ["🇷🇺 Русский", "🇬🇧 English"],
+    "start": ["/start"],
+    "help": ["ℹ️ Как пользоваться", "ℹ️ How to use"],
+}
+
+
+def parse_mix(raw_mix):
+    mix = []
+    for part in raw_mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+class RouteStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, latency, ok):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(latency)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, elapsed):
+        report = {}
+        with self.lock:
+            for route, values in sorted(self.latencies.items()):
+                ordered = sorted(values)
+                errors = self.errors.get(route, 0)
+                report[route] = {
+                    "requests": len(ordered),
+                    "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+                    "error_rate": round(errors / len(ordered), 4) if ordered else 0.0,
+                    "p50_ms": round(percentile(ordered, 0.50) * 1000, 1),
+                    "p95_ms": round(percentile(ordered, 0.95) * 1000, 1),
+                    "p99_ms": round(percentile(ordered, 0.99) * 1000, 1),
+                    "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+                }
+        return report
+
+
+def build_update(update_id, chat_id, route, rng):
+    if route == "question":
+        text = rng.choice(QUESTIONS)
+    else:
+        text = rng.choice(ROUTE_TEXTS[route])
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+            "text": text,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Telegram updates against the bot webhook.")
+    parser.add_argument("--webhook-url", required=True, help="e.g. http://127.0.0.1:8080/webhook/<TELEGRAM_TOKEN>")
+    parser.add_argument("--secret", default="", help="TELEGRAM_WEBHOOK_SECRET of the bot under test")
+    parser.add_argument("--rate", type=float, default=5.0, help="updates per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--chats", type=int, default=200, help="number of distinct chat ids")
+    parser.add_argument("--chat-id-base", type=int, default=900000000)
+    parser.add_argument("--mix", default="question=70,news=20,lang=6,help=2,start=2")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--telegram-stats-url", help="fake Telegram /stats URL to include in the report")
+    parser.add_argument("--openai-stats-url", help="fake OpenAI /stats URL to include in the report")
+    parser.add_argument("--output", help="write the JSON report to this path")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    routes = [name for name, _weight in mix]
+    weights = [weight for _name, weight in mix]
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+    stats = RouteStats()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=args.max_in_flight, pool_maxsize=args.max_in_flight)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    update_ids = itertools.count(int(time.time() * 1000))
+
+    def send(update, route, scheduled_at):
+        try:
+            resp = session.post(args.webhook_url, json=update, headers=headers, timeout=args.timeout)
+            ok = resp.status_code == 200
+        except requests.RequestException:
+            ok = False
+        stats.record(route, time.perf_counter() - scheduled_at, ok)
+
+    interval = 1.0 / args.rate
+    started = time.perf_counter()
+    total = int(args.duration * args.rate)
+    with ThreadPoolExecutor(max_workers=args.max_in_flight) as executor:
+        for index in range(total):
+            scheduled_at = started + index * interval
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            route = rng.choices(routes, weights=weights)[0]
+            chat_id = args.chat_id_base + rng.randrange(args.chats)
+            executor.submit(send, build_update(next(update_ids), chat_id, route, rng), route, scheduled_at)
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "target_rate": args.rate,
+        "duration_sec": round(elapsed, 2),
+        "routes": stats.report(elapsed),
+    }
+    for key, url in [("telegram", args.telegram_stats_url), ("openai", args.openai_stats_url)]:
+        if url:
+            try:
+                report[key] = requests.get(url, timeout=10).json()
+            except (requests.RequestException, ValueError) as exc:
+                report[key] = {"error": str(exc)}
+
+    print(json.dumps(report, ensure_ascii=False, indent=1))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
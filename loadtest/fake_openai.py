@@ -0,0 +1,249 @@
+import argparse
+import json
+import time
+import uuid
+from http.server import ThreadingHTTPServer
+
+from common import FakeServerState, JsonRequestHandler, parse_latency
+
+# Stand-in for the OpenAI Responses API. Point the bot at it with
+# OPENAI_BASE_URL=http://127.0.0.1:<port>/v1
+
+FAKE_COUNTRIES = ["Испания", "Португалия", "Сербия", "Грузия", "Латвия", "Германия", "Кипр", "Чехия"]
+FAKE_DOMAINS = ["rbc.ru", "dw.com", "rus.err.ee", "kommersant.ru", "pravo.ru", "migron.ru", "yle.fi", "lsm.lv"]
+
+
+def estimate_tokens(value):
+    return max(1, len(json.dumps(value, ensure_ascii=False)) // 4)
+
+
+def get_system_text(payload):
+    messages = payload.get("input")
+    if isinstance(messages, list) and messages and isinstance(messages[0], dict):
+        return str(messages[0].get("content", ""))
+    return ""
+
+
+def get_last_user_text(payload):
+    messages = payload.get("input")
+    if isinstance(messages, str):
+        return messages
+    for message in reversed(messages or []):
+        if isinstance(message, dict) and message.get("role") == "user":
+            return str(message.get("content", ""))
+    return ""
+
+
+def build_digest_items(state, count):
+    items = []
+    for index in range(count):
+        country = FAKE_COUNTRIES[index % len(FAKE_COUNTRIES)]
+        domain = FAKE_DOMAINS[(index + int(state.random() * 100)) % len(FAKE_DOMAINS)]
+        items.append({
+            "country": country,
+            "title": f"{country} меняет правила выдачи ВНЖ, выпуск {uuid.uuid4().hex[:6]}",
+            "date": f"{1 + index % 27} мая 2025",
+            "summary": (
+                f"Власти страны {country} объявили об изменении требований к заявителям на ВНЖ. "
+                "Новые правила касаются граждан России, подающих документы через консульства. "
+                "Сроки рассмотрения заявлений увеличатся на несколько недель."
+            ),
+            "source_domain": domain,
+            "source_url": f"https://{domain}/news/2025/{uuid.uuid4().hex[:10]}",
+        })
+    return items
+
+
+def build_text_and_annotations(payload, state, web_search):
+    system_text = get_system_text(payload)
+    text_format = (payload.get("text") or {}).get("format") or {}
+
+    if system_text.startswith("You translate migration digest items"):
+        try:
+            request_items = json.loads(get_last_user_text(payload)).get("items", [])
+        except (json.JSONDecodeError, AttributeError):
+            request_items = []
+        translated = [
+            {
+                "index": item.get("index"),
+                "country": f"[tr] {item.get('country', '')}",
+                "title": f"[tr] {item.get('title', '')}",
+                "date": item.get("date", ""),
+                "summary": f"[tr] {item.get('summary', '')}",
+            }
+            for item in request_items
+        ]
+        return json.dumps(translated, ensure_ascii=False), []
+
+    if text_format.get("type") == "json_schema" or "JSON" in system_text:
+        items = build_digest_items(state, 16)
+        body = {"items": items} if text_format.get("type") == "json_schema" else items
+        text = json.dumps(body, ensure_ascii=False)
+        annotations = []
+        for item in items:
+            start = text.find(item["title"])
+            annotations.append({
+                "type": "url_citation",
+                "url": item["source_url"],
+                "title": item["title"],
+                "start_index": start,
+                "end_index": start + len(item["title"]),
+            })
+        return text, annotations if web_search else []
+
+    question = get_last_user_text(payload)[:120]
+    text = (
+        f"Ответ на вопрос «{question}»: для ВНЖ обычно нужны паспорт, подтверждение дохода, "
+        "страховка и справка об отсутствии судимости. Сроки рассмотрения — от 30 до 90 дней."
+    )
+    annotations = []
+    if web_search:
+        domain = FAKE_DOMAINS[int(state.random() * len(FAKE_DOMAINS))]
+        annotations.append({
+            "type": "url_citation",
+            "url": f"https://{domain}/article/{uuid.uuid4().hex[:8]}",
+            "title": "source",
+            "start_index": 0,
+            "end_index": min(len(text), 20),
+        })
+    return text, annotations
+
+
+def build_response(payload, state):
+    tools = payload.get("tools") or []
+    web_search = any(tool.get("type") == "web_search" for tool in tools if isinstance(tool, dict))
+    text, annotations = build_text_and_annotations(payload, state, web_search)
+
+    output = []
+    if web_search:
+        output.append({
+            "type": "web_search_call",
+            "id": f"ws_{uuid.uuid4().hex}",
+            "status": "completed",
+            "action": {"type": "search", "query": get_last_user_text(payload)[:80]},
+        })
+    output.append({
+        "type": "message",
+        "id": f"msg_{uuid.uuid4().hex}",
+        "role": "assistant",
+        "status": "completed",
+        "content": [{"type": "output_text", "text": text, "annotations": annotations}],
+    })
+
+    input_tokens = estimate_tokens(payload.get("input"))
+    output_tokens = estimate_tokens(text)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": payload.get("model", "fake"),
+        "status": "completed",
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": tools,
+        "output": output,
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+class FakeOpenAIHandler(JsonRequestHandler):
+    config = None
+    state = None
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self.send_json(200, {"counters": dict(self.state.counters)})
+            return
+        self.send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        payload = self.read_json()
+        if not self.path.rstrip("/").endswith("/responses"):
+            self.send_json(404, {"error": {"message": "not found"}})
+            return
+
+        model = payload.get("model", "unknown")
+        self.state.count(f"requests:{model}")
+        time.sleep(self.state.sample(self.config["latency"]))
+
+        if self.state.random() < self.config["failure_rate"]:
+            self.state.count(f"failures:{model}")
+            status = self.config["failure_status"]
+            self.send_json(
+                status,
+                {"error": {"message": "injected failure", "type": "fake_error", "code": str(status)}},
+                headers={"Retry-After": "1"} if status == 429 else None,
+            )
+            return
+
+        response = build_response(payload, self.state)
+        if payload.get("stream"):
+            self.stream_response(response)
+        else:
+            self.send_json(200, response)
+
+    def stream_response(self, response):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        sequence = 0
+
+        def emit(event_type, data):
+            nonlocal sequence
+            data = {"type": event_type, "sequence_number": sequence, **data}
+            sequence += 1
+            self.wfile.write(f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        emit("response.created", {"response": {**response, "status": "in_progress", "output": []}})
+        message = response["output"][-1]
+        text = message["content"][0]["text"]
+        chunk_size = self.config["stream_chunk_chars"]
+        for start in range(0, len(text), chunk_size):
+            time.sleep(self.config["stream_chunk_delay"])
+            emit("response.output_text.delta", {
+                "item_id": message["id"],
+                "output_index": len(response["output"]) - 1,
+                "content_index": 0,
+                "delta": text[start:start + chunk_size],
+                "logprobs": [],
+            })
+        emit("response.completed", {"response": response})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI Responses API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--latency", default="lognormal:0.0,0.5", help="seconds distribution, see common.parse_latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=429)
+    parser.add_argument("--stream-chunk-chars", type=int, default=40)
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.02)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    FakeOpenAIHandler.config = {
+        "latency": parse_latency(args.latency),
+        "failure_rate": args.failure_rate,
+        "failure_status": args.failure_status,
+        "stream_chunk_chars": args.stream_chunk_chars,
+        "stream_chunk_delay": args.stream_chunk_delay,
+    }
+    FakeOpenAIHandler.state = FakeServerState(seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), FakeOpenAIHandler)
+    print(f"Fake OpenAI listening on http://{args.host}:{args.port}/v1", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
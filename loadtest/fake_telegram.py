@@ -0,0 +1,107 @@
+import argparse
+import re
+import threading
+import time
+from collections import deque
+from http.server import ThreadingHTTPServer
+
+from common import FakeServerState, JsonRequestHandler, parse_latency
+
+# Stand-in for the Telegram Bot API. Point the bot at it with
+# TELEGRAM_API_BASE_URL=http://127.0.0.1:<port>
+
+BOT_METHOD_PATH = re.compile(r"^/bot(?P<token>[^/]+)/(?P<method>[A-Za-z]+)$")
+
+
+class FakeTelegramHandler(JsonRequestHandler):
+    config = None
+    state = None
+    sent = deque(maxlen=10000)
+    sent_lock = threading.Lock()
+    message_id = 0
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/stats":
+            self.send_json(200, {"counters": dict(self.state.counters)})
+            return
+        if path == "/sent":
+            with self.sent_lock:
+                self.send_json(200, {"messages": list(self.sent)})
+            return
+        self.send_json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+    def do_POST(self):
+        match = BOT_METHOD_PATH.match(self.path.split("?", 1)[0])
+        if not match:
+            self.send_json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            return
+
+        method = match.group("method")
+        payload = self.read_json()
+        self.state.count(f"requests:{method}")
+        time.sleep(self.state.sample(self.config["latency"]))
+
+        if self.state.random() < self.config["rate_limit_ratio"]:
+            self.state.count(f"rate_limited:{method}")
+            retry_after = self.config["retry_after"]
+            self.send_json(
+                429,
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                },
+                headers={"Retry-After": str(retry_after)},
+            )
+            return
+
+        if method == "sendMessage":
+            with self.sent_lock:
+                FakeTelegramHandler.message_id += 1
+                message_id = FakeTelegramHandler.message_id
+                self.sent.append({
+                    "message_id": message_id,
+                    "chat_id": payload.get("chat_id"),
+                    "chars": len(str(payload.get("text", ""))),
+                    "parse_mode": payload.get("parse_mode"),
+                    "ts": time.time(),
+                })
+            self.send_json(200, {
+                "ok": True,
+                "result": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": payload.get("chat_id"), "type": "private"},
+                    "text": payload.get("text", ""),
+                },
+            })
+            return
+
+        self.send_json(200, {"ok": True, "result": True})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8092)
+    parser.add_argument("--latency", default="uniform:0.02,0.08")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    FakeTelegramHandler.config = {
+        "latency": parse_latency(args.latency),
+        "rate_limit_ratio": args.rate_limit_ratio,
+        "retry_after": args.retry_after,
+    }
+    FakeTelegramHandler.state = FakeServerState(seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), FakeTelegramHandler)
+    print(f"Fake Telegram listening on http://{args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
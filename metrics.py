@@ -0,0 +1,315 @@
+import inspect
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import wraps
+
+# Counters and histograms are written to a per-thread shard without taking a lock;
+# shards are only merged when /metrics is scraped. A histogram entry keeps one
+# count per bucket plus an overflow slot, and its total count is derived from a
+# single copy of those slots, so a scrape racing an observe() never reports a
+# bucket above _count or a +Inf that disagrees with it.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_definitions = {}
+_shards = []
+_shards_lock = threading.Lock()
+_retired = {"counters": {}, "histograms": {}}
+_gauges = {}
+_gauges_lock = threading.Lock()
+_local = threading.local()
+
+
+def describe(name, metric_type, help_text, buckets=None):
+    _definitions[name] = {
+        "type": metric_type,
+        "help": help_text,
+        "buckets": tuple(buckets or DEFAULT_BUCKETS) if metric_type == "histogram" else None,
+    }
+
+
+def _label_key(labels):
+    if not labels:
+        return ()
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _get_shard():
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = {"counters": {}, "histograms": {}}
+        _local.shard = shard
+        with _shards_lock:
+            _shards.append((weakref.ref(threading.current_thread()), shard))
+    return shard
+
+
+def inc(name, amount=1, **labels):
+    counters = _get_shard()["counters"]
+    key = (name, _label_key(labels))
+    counters[key] = counters.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    histograms = _get_shard()["histograms"]
+    key = (name, _label_key(labels))
+    entry = histograms.get(key)
+    if entry is None:
+        definition = _definitions.get(name)
+        buckets = definition["buckets"] if definition and definition["buckets"] else DEFAULT_BUCKETS
+        entry = [buckets, [0] * (len(buckets) + 1), 0.0]
+        histograms[key] = entry
+
+    buckets, bucket_counts = entry[0], entry[1]
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            bucket_counts[index] += 1
+            break
+    else:
+        bucket_counts[-1] += 1
+    entry[2] += value
+
+
+def set_gauge(name, value, **labels):
+    with _gauges_lock:
+        _gauges[(name, _label_key(labels))] = value
+
+
+def add_gauge(name, amount, **labels):
+    key = (name, _label_key(labels))
+    with _gauges_lock:
+        _gauges[key] = _gauges.get(key, 0) + amount
+
+
+@contextmanager
+def timer(name, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def timed(name, **labels):
+    """Decorator observing call duration with a `function` label set to the wrapped name.
+
+    Coroutine functions are timed until the awaited call completes.
+    """
+    def decorator(func):
+        call_labels = {"function": func.__name__, **labels}
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(name, time.perf_counter() - started, **call_labels)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - started, **call_labels)
+
+        return wrapper
+
+    return decorator
+
+
+class SpanTracer:
+    """Collects per-stage durations, item counts and tokens for one pipeline run."""
+
+    def __init__(self, stage_metric=None, **labels):
+        self.stage_metric = stage_metric
+        self.labels = labels
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.order = []
+        self.active = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        record = {"items": None, "tokens": 0}
+        started = time.perf_counter()
+        with self.lock:
+            self.active.append(name)
+        try:
+            yield record
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.active.remove(name)
+                stage = self.stages.get(name)
+                if stage is None:
+                    stage = {"seconds": 0.0, "calls": 0, "items": None, "tokens": 0}
+                    self.stages[name] = stage
+                    self.order.append(name)
+                stage["seconds"] += elapsed
+                stage["calls"] += 1
+                stage["tokens"] += record["tokens"] or 0
+                if record["items"] is not None:
+                    stage["items"] = (stage["items"] or 0) + record["items"]
+            if self.stage_metric:
+                observe(self.stage_metric, elapsed, stage=name, **self.labels)
+
+    def as_dict(self):
+        with self.lock:
+            stages = [
+                {
+                    "name": name,
+                    "seconds": round(self.stages[name]["seconds"], 3),
+                    "calls": self.stages[name]["calls"],
+                    "items": self.stages[name]["items"],
+                    "tokens": self.stages[name]["tokens"],
+                }
+                for name in self.order
+            ]
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 3),
+            "tokens": sum(stage["tokens"] for stage in stages),
+            "stages": stages,
+        }
+
+    def progress(self):
+        """as_dict() plus the stages still running, for status reporting mid-run."""
+        with self.lock:
+            active = list(self.active)
+        return {**self.as_dict(), "active_stages": active}
+
+
+def _merge_shard(target, shard):
+    for key, value in shard["counters"].copy().items():
+        target["counters"][key] = target["counters"].get(key, 0) + value
+    for key, entry in shard["histograms"].copy().items():
+        # One list copy is atomic under the GIL; _sum may be one observation off.
+        buckets, bucket_counts, total = entry[0], list(entry[1]), entry[2]
+        current = target["histograms"].get(key)
+        if current is None:
+            target["histograms"][key] = [buckets, bucket_counts, total]
+        else:
+            current[1] = [left + right for left, right in zip(current[1], bucket_counts)]
+            current[2] += total
+
+
+def snapshot():
+    merged = {"counters": {}, "histograms": {}}
+    with _shards_lock:
+        alive = []
+        for thread_ref, shard in _shards:
+            if thread_ref() is None or not thread_ref().is_alive():
+                _merge_shard(_retired, shard)
+            else:
+                alive.append((thread_ref, shard))
+        _shards[:] = alive
+        _merge_shard(merged, _retired)
+        for _thread_ref, shard in alive:
+            _merge_shard(merged, shard)
+    with _gauges_lock:
+        merged["gauges"] = dict(_gauges)
+    return merged
+
+
+def _format_labels(label_key, extra=None):
+    pairs = list(label_key) + list(extra or [])
+    if not pairs:
+        return ""
+    rendered = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in pairs
+    )
+    return "{" + rendered + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    data = snapshot()
+    series = {}
+    for (name, label_key), value in data["counters"].items():
+        series.setdefault(name, []).append(("counter", label_key, value))
+    for (name, label_key), value in data["gauges"].items():
+        series.setdefault(name, []).append(("gauge", label_key, value))
+    for (name, label_key), entry in data["histograms"].items():
+        series.setdefault(name, []).append(("histogram", label_key, entry))
+
+    lines = []
+    for name in sorted(series):
+        definition = _definitions.get(name) or {}
+        metric_type = definition.get("type") or series[name][0][0]
+        if definition.get("help"):
+            lines.append(f"# HELP {name} {definition['help']}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        for kind, label_key, value in sorted(series[name], key=lambda entry: entry[1]):
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(label_key)} {_format_value(value)}")
+                continue
+
+            buckets, bucket_counts, total = value
+            count = sum(bucket_counts)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{name}_bucket{_format_labels(label_key, [('le', _format_value(float(bound)))])} {cumulative}"
+                )
+            lines.append(f"{name}_bucket{_format_labels(label_key, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(label_key)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(label_key)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+describe("grs_webhook_seconds", "histogram", "Telegram webhook handling time.")
+describe("grs_db_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled Postgres connection.")
+describe("grs_db_pool_size", "gauge", "Open Postgres connections owned by the pool.")
+describe("grs_db_pool_in_use", "gauge", "Postgres connections currently checked out.")
+describe("grs_db_pool_idle", "gauge", "Idle Postgres connections in the pool.")
+describe("grs_db_pool_waiting", "gauge", "Threads waiting for a Postgres connection.")
+describe("grs_db_pool_timeouts_total", "counter", "Checkouts that gave up waiting for a Postgres connection.")
+describe("grs_db_pool_reconnects_total", "counter", "Stale or dead pooled connections that were reopened.")
+describe("grs_db_reads_total", "counter", "Read-only DB helper calls by target (replica or primary fallback) and reason.")
+describe(
+    "grs_db_fetched_bytes",
+    "histogram",
+    "Approximate payload size of rows fetched per DB call.",
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+describe("grs_db_call_seconds", "histogram", "Duration of DB helper calls, including checkout.")
+describe("grs_openai_request_seconds", "histogram", "OpenAI Responses API latency.")
+describe("grs_openai_tokens_total", "counter", "OpenAI tokens reported in response usage; kind=cached_input is the prompt-cache hit part of input.")
+describe("grs_openai_errors_total", "counter", "Failed OpenAI Responses API calls.")
+describe("grs_telegram_request_seconds", "histogram", "Telegram Bot API request latency.")
+describe("grs_telegram_rate_limited_total", "counter", "Telegram Bot API 429 responses.")
+describe("grs_telegram_errors_total", "counter", "Failed Telegram Bot API requests.")
+describe("grs_digest_refresh_seconds", "histogram", "News digest refresh duration.")
+describe("grs_news_scheduler_decisions_total", "counter", "Scheduler ticks per language: fresh, backoff, enqueued, pending or error.")
+describe("grs_news_scheduler_leader", "gauge", "1 if this process holds the scheduler leader lock.")
+describe("grs_news_discovery_total", "counter", "Digest candidate discovery by source: search (web_search) or shared (translated).")
+describe("grs_news_broadcast_recipients_total", "counter", "Digest broadcast recipients by outcome: sent, blocked or failed.")
+describe("grs_admission_level", "gauge", "Current degradation level: 0 normal .. 4 defer.")
+describe("grs_admission_signal", "gauge", "Admission inputs: in_flight, model_latency_p90_seconds, queue_age_p90_seconds.")
+describe("grs_admission_decisions_total", "counter", "Chat answers admitted per degradation mode and the signal that triggered it.")
+describe("grs_admission_deferred", "gauge", "Questions waiting in deferred_answers (queued or running).")
+describe("grs_admission_deferred_oldest_seconds", "gauge", "Age of the oldest question in deferred_answers; reported only, it does not set the level.")
+describe("grs_news_jobs_total", "counter", "News digest jobs by outcome (succeeded, queued for retry, failed, reclaimed, lost).")
+describe("grs_digest_stage_seconds", "histogram", "News digest refresh stage duration.")
+describe("grs_cache_requests_total", "counter", "Cache lookups by cache and result.")
+describe("grs_chat_history_archived_messages_total", "counter", "chat_history rows compressed into the archive.")
+describe("grs_async_updates_in_flight", "gauge", "Telegram updates being processed by the asyncio server.")
+describe("grs_startup_stage_seconds", "histogram", "Per-process warm-up stage duration (DB pool, clients, connections).")
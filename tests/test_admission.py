@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import admission  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_controller(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+    return admission.AdmissionController(), clock
+
+
+def test_only_overdue_questions_are_released_under_pressure(monkeypatch):
+    controller, _clock = make_controller(monkeypatch)
+    controller.record_latency(90.0)
+    assert controller.admit()["defer"]
+
+    release_all, plan = controller.release_deferred()
+    assert not release_all
+    assert plan["mode"] == admission.LEVEL_NAMES[admission.DEFER_LEVEL - 1]
+    assert not plan["defer"]
+
+
+def test_backlog_drains_once_pressure_clears(monkeypatch):
+    controller, clock = make_controller(monkeypatch)
+    controller.record_latency(90.0)
+    assert controller.admit()["defer"]
+
+    # The slow sample leaves the window; nothing else is in flight.
+    clock.now += admission.ADMISSION_WINDOW_SEC + 1
+    release_all, plan = controller.release_deferred()
+    assert release_all
+    assert plan["mode"] == "normal"
+    assert "deferred_oldest_seconds" not in controller.signals()
+
+
+def test_defer_level_from_latency(monkeypatch):
+    controller, _clock = make_controller(monkeypatch)
+    controller.record_latency(90.0)
+    plan = controller.admit()
+    assert plan["defer"]
+    assert plan["mode"] == "defer"